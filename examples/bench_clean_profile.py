@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2020, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+import sys
+import time
+import resource
+
+import numpy         as np
+
+import radical.utils as ru
+
+
+# ------------------------------------------------------------------------------
+#
+# Compare `clean_profile` on a row based and on a columnar profile.  The
+# synthetic profile contains `n_events` events of tasks which advance through
+# a number of states (with some duplicated and some canceled transitions), plus
+# some non-state events and session events.
+#
+#   usage: bench_clean_profile.py [n_events] [rows|cols|both]
+#
+n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 10 * 1000 * 1000
+mode     = sys.argv[2]      if len(sys.argv) > 2 else 'both'
+
+sid      = 'rp.session.bench'
+states   = ['NEW', 'SCHEDULING', 'EXECUTING', 'DONE', 'CANCELED']
+finals   = ['DONE', 'FAILED', 'CANCELED']
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ------------------------------------------------------------------------------
+#
+def make_columns(n):
+
+    # eight events per task: five state transitions (one of which is
+    # a duplicate, and one a CANCELED after DONE), and three other events
+    per_task = 8
+    n_tasks  = n // per_task
+    n        = n_tasks * per_task
+
+    symbols = ru.ProfileSymbols()
+    enc     = symbols.encode
+    uids    = np.array([enc('task.%06d' % i) for i in range(n_tasks)],
+                       dtype=np.int32)
+
+    c_adv   = enc('advance')
+    c_state = [enc(s) for s in states]
+    c_other = [enc(e) for e in ['exec_start', 'exec_stop', 'sync']]
+    c_empty = enc('')
+
+    # per task event pattern: (event, state)
+    pattern = [(c_adv,      c_state[0]),
+               (c_adv,      c_state[1]),
+               (c_adv,      c_state[1]),      # duplicate
+               (c_other[0], c_empty),
+               (c_adv,      c_state[2]),
+               (c_other[1], c_empty),
+               (c_adv,      c_state[3]),
+               (c_adv,      c_state[4])]      # CANCELED after DONE
+
+    # interleave the tasks: tasks start staggered, so events of different
+    # tasks are mixed in time
+    time_  = (np.repeat(np.arange(n_tasks) * 0.01, per_task)
+              + np.tile(np.arange(per_task) * 1.0, n_tasks))
+    order  = np.argsort(time_, kind='mergesort')
+
+    codes  = dict()
+    codes[ru.EVENT ] = np.tile([p[0] for p in pattern], n_tasks)
+    codes[ru.STATE ] = np.tile([p[1] for p in pattern], n_tasks)
+    codes[ru.UID   ] = np.repeat(uids, per_task)
+    codes[ru.COMP  ] = np.full(n, enc('agent'), dtype=np.int32)
+    codes[ru.TID   ] = np.full(n, enc('MainThread'), dtype=np.int32)
+    codes[ru.MSG   ] = np.full(n, c_empty, dtype=np.int32)
+    codes[ru.ENTITY] = np.full(n, enc('task'), dtype=np.int32)
+
+    # some session events
+    codes[ru.UID][::1000] = c_empty
+    codes[ru.EVENT][::1000] = c_other[2]
+    codes[ru.STATE][::1000] = c_empty
+
+    codes = {f: c.astype(np.int32)[order] for f, c in codes.items()}
+
+    return ru.ProfileColumns(time_[order], codes, symbols)
+
+
+# ------------------------------------------------------------------------------
+#
+cols = make_columns(n_events)
+print('events      : %12d' % len(cols))
+print('max rss     : %12.1f MB' % rss())
+
+if mode in ['cols', 'both']:
+
+    t0    = time.time()
+    clean = ru.clean_profile(cols, sid, finals, 'CANCELED')
+    print('columnar    : %12.2f s  (%d events left)' % (time.time() - t0,
+                                                        len(clean)))
+    print('max rss     : %12.1f MB' % rss())
+    del clean
+
+if mode in ['rows', 'both']:
+
+    # convert to rows column by column (much faster than iterating `cols`)
+    fields = [cols.time.tolist()] + [cols.column(f).tolist()
+                                     for f in range(ru.EVENT, ru.PROF_KEY_MAX)]
+    rows   = [list(row) for row in zip(*fields)]
+    del fields
+    print('max rss     : %12.1f MB  (rows)' % rss())
+
+    t0    = time.time()
+    clean = ru.clean_profile(rows, sid, finals, 'CANCELED')
+    print('rows        : %12.2f s  (%d events left)' % (time.time() - t0,
+                                                        len(clean)))
+    print('max rss     : %12.1f MB' % rss())
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2020, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+import sys
+import timeit
+import logging
+
+import radical.utils as ru
+
+
+# ------------------------------------------------------------------------------
+#
+# Measure the cost of a suppressed `debug()` call (log level `INFO`) on
+#
+#   - a native python logger,
+#   - an `ru.Logger`, with lazy arguments,
+#   - an `ru.Logger`, with a message formatted by the caller,
+#   - an `ru.Logger`, guarded by `isEnabledFor()`.
+#
+#   usage: bench_logger.py [n_calls]
+#
+n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000 * 1000
+
+log = ru.Logger('bench_logger', targets='null', level='INFO')
+nat = logging.getLogger('bench_logger')
+uid = 'task.000001'
+val = 42
+
+tests = [('logging.Logger', lambda: nat.debug('%s: %d', uid, val)),
+         ('ru.Logger'     , lambda: log.debug('%s: %d', uid, val)),
+         ('ru.Logger, %'  , lambda: log.debug('%s: %d' % (uid, val))),
+         ('isEnabledFor'  , lambda: log.isEnabledFor(ru.DEBUG) and
+                                    log.debug('%s: %d', uid, val))]
+
+for name, call in tests:
+    t = min(timeit.repeat(call, number=n_calls, repeat=3))
+    print('%-16s: %8.1f ns / call' % (name, t / n_calls * 1e9))
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2020, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+import sys
+import time
+
+import threading     as mt
+
+import radical.utils as ru
+
+
+# ------------------------------------------------------------------------------
+#
+# Measure message latency and throughput of a `ru.zmq.Queue` bridge:
+#
+#   - latency   : one message in flight at any time, measure the round trip
+#                 put -> bridge -> get
+#   - throughput: push `n` messages as fast as possible, and pull them on the
+#                 other end
+#
+#   usage: bench_queue.py [n_msgs] [bulk_size] [prefetch]
+#
+n_msgs    = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+bulk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+prefetch  = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+cfg = ru.Config(cfg={'uid'      : 'bench_queue',
+                     'channel'  : 'bench',
+                     'kind'     : 'queue',
+                     'log_level': 'error',
+                     'path'     : '/tmp/',
+                     'bulk_size': bulk_size,
+                     'stall_hwm': 0})
+
+bridge = ru.zmq.Queue(cfg)
+bridge.start()
+
+putter = ru.zmq.Putter(channel=cfg.channel, url=str(bridge.addr_put))
+getter = ru.zmq.Getter(channel=cfg.channel, url=str(bridge.addr_get),
+                       prefetch=prefetch)
+
+
+# ------------------------------------------------------------------------------
+# latency
+#
+n_lat = min(n_msgs, 1000)
+start = time.time()
+for i in range(n_lat):
+    putter.put({'idx': i})
+    getter.get()
+stop  = time.time()
+
+print('latency   : %8.3f ms / msg  (%d msgs)'
+      % ((stop - start) * 1000 / n_lat, n_lat))
+
+
+# ------------------------------------------------------------------------------
+# throughput
+#
+def work_get():
+    n = 0
+    while n < n_msgs:
+        n += len(getter.get_bulk())
+
+
+thread = mt.Thread(target=work_get)
+thread.daemon = True
+
+start = time.time()
+thread.start()
+for i in range(n_msgs):
+    putter.put({'idx': i})
+thread.join()
+stop  = time.time()
+
+print('throughput: %8.0f msg / s   (%d msgs, bulk_size %d, prefetch %d)'
+      % (n_msgs / (stop - start), n_msgs, bulk_size, prefetch))
+
+bridge.stop()
+
+
+# ------------------------------------------------------------------------------
+
@@ -228,6 +228,8 @@ setup_args = {
                             'bin/radical-utils-mongodb.py',
                             'bin/radical-utils-version',
                             'bin/radical-utils-pwatch',
+                            'bin/radical-utils-prof-convert',
+                            'bin/radical-log-render',
                             'bin/radical-utils-pylint.sh',
                           # 'bin/radical-utils-gtod',
                             'bin/radical-bridge',
@@ -44,11 +44,19 @@ from .zmq            import PubSub, Publisher, Subscriber
 
 from .logger         import DEBUG, INFO, WARNING, WARN, ERROR, CRITICAL, OFF
 from .logger         import Logger
+from .log_struct     import read_log, render_log
 from .reporter       import Reporter
 from .profile        import Profiler, timestamp, event_to_label
 from.profile        import read_profiles, combine_profiles, clean_profile
+from .profile        import merge_profiles
 from .profile        import TIME, EVENT, COMP, TID, UID, STATE, MSG, ENTITY
 from .profile        import PROF_KEY_MAX
+from .profile_bin    import read_bprof, bprof_to_csv, csv_to_bprof
+from .profile_columns import ProfileColumns, ProfileSymbols
+from .profile_filter  import ProfileFilter
+from .profile_cache   import read_session_profile
+from .profile_index   import ProfileIndex
+from .profile_tail    import ProfileTail
 
 from .json_io        import read_json, read_json_str, write_json
 from .json_io        import parse_json, parse_json_str
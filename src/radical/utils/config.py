@@ -483,14 +483,20 @@ class DefaultConfig(Config, metaclass=Singleton):
 
     def __init__(self):
 
-        cfg = {'log_lvl'    : '${RADICAL_DEFAULT_LOG_LVL:ERROR}',
-               'log_tgt'    : '${RADICAL_DEFAULT_LOG_TGT:.}',
-               'log_dir'    : '${RADICAL_DEFAULT_LOG_DIR:$PWD}',
-               'report'     : '${RADICAL_DEFAULT_REPORT:TRUE}',
-               'report_tgt' : '${RADICAL_DEFAULT_REPORT_TGT:stderr}',
-               'report_dir' : '${RADICAL_DEFAULT_REPORT_DIR:$PWD}',
-               'profile'    : '${RADICAL_DEFAULT_PROFILE:TRUE}',
-               'profile_dir': '${RADICAL_DEFAULT_PROFILE_DIR:$PWD}',
+        cfg = {'log_lvl'     : '${RADICAL_DEFAULT_LOG_LVL:ERROR}',
+               'log_tgt'     : '${RADICAL_DEFAULT_LOG_TGT:.}',
+               'log_dir'     : '${RADICAL_DEFAULT_LOG_DIR:$PWD}',
+               'log_async'   : '${RADICAL_DEFAULT_LOG_ASYNC:FALSE}',
+               'log_max_size': '${RADICAL_DEFAULT_LOG_MAX_SIZE:0}',
+               'log_max_age' : '${RADICAL_DEFAULT_LOG_MAX_AGE:0}',
+               'log_compress': '${RADICAL_DEFAULT_LOG_COMPRESS:gzip}',
+               'log_keep'    : '${RADICAL_DEFAULT_LOG_KEEP:0}',
+               'report'      : '${RADICAL_DEFAULT_REPORT:TRUE}',
+               'report_tgt'  : '${RADICAL_DEFAULT_REPORT_TGT:stderr}',
+               'report_dir'  : '${RADICAL_DEFAULT_REPORT_DIR:$PWD}',
+               'profile'     : '${RADICAL_DEFAULT_PROFILE:TRUE}',
+               'profile_dir' : '${RADICAL_DEFAULT_PROFILE_DIR:$PWD}',
+               'profile_fmt' : '${RADICAL_DEFAULT_PROFILE_FMT:csv}',
                }
 
         super(DefaultConfig, self).__init__(module='radical.utils', cfg=cfg)
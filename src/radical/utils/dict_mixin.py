@@ -163,13 +163,13 @@ def dict_merge(a, b, policy=None, wildcards=False, log=None, _path=None):
         else:
             if  policy == PRESERVE:
                 if  log:
-                    log.debug('preserving key %s:%s \t(%s)'
-                              % (':'.join(_path), key_b, b[key_b]))
+                    log.debug('preserving key %s:%s \t(%s)',
+                              ':'.join(_path), key_b, b[key_b])
 
             elif policy == OVERWRITE:
                 if  log:
-                    log.debug('overwriting key %s:%s \t(%s)'
-                              % (':'.join(_path), key_b, b[key_b]))
+                    log.debug('overwriting key %s:%s \t(%s)',
+                              ':'.join(_path), key_b, b[key_b])
                 a[key_a] = b[key_b]  # use new value
             else:
                 raise ValueError('Conflict at %s (%s : %s)'
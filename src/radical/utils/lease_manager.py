@@ -134,8 +134,8 @@ class LeaseManager(object):
 
             if pool_id not in self._pools:
 
-                self._log.debug('lm create  pool   for %s (%s) (%s)'
-                        % (pool_id, type(pool_id), self))
+                self._log.debug('lm create  pool   for %s (%s) (%s)',
+                                pool_id, type(pool_id), self)
 
                 self._pools[pool_id] = dict()
                 self._pools[pool_id]['objects'] = list()
@@ -156,7 +156,7 @@ class LeaseManager(object):
 
         with self:
 
-            self._log.debug('lm create  object for %s' % pool_id)
+            self._log.debug('lm create  object for %s', pool_id)
 
             if  pool_id not in self._pools:
                 raise RuntimeError('internal error: no pool for %s' % pool_id)
@@ -0,0 +1,313 @@
+
+import os
+import json
+import logging
+import msgpack
+
+
+# ------------------------------------------------------------------------------
+#
+# Structured log files
+#
+# Next to text log files, `ru.Logger` can write log records in a structured
+# form (log targets `bin:[<file>]` and `jsonl:[<file>]`), which is cheaper to
+# write and can be filtered without parsing text.  The message is stored as
+# template plus arguments, and is only rendered when reading the log.
+#
+# A binary log (`*.log.bin`) is a stream of msgpack encoded records:
+#
+#     template : [0, pid, template id, template]
+#     event    : [1, time, name, pid, tid, level, template, args, exc]
+#
+# Template ids are defined once per process, before their first use.  In
+# event records, `template` is either a template id, or the message itself
+# (for messages without arguments, and for messages which are rendered when
+# logged, see below).  `exc` is the formatted exception info or `None`.
+#
+# A JSON log (`*.log.jsonl`) contains one JSON object per event:
+#
+#     {"time": ..., "name": ..., "pid": ..., "tid": ..., "level": ...,
+#      "msg": <template>, "args": [...], "exc": ...}
+#
+# Only scalar arguments (strings, numbers, booleans and `None`) are stored as
+# such - messages with other arguments are rendered when logged, as the
+# arguments may not be serializable, and their representation may change.
+#
+LOG_FORMAT     = '%(created).3f : '  \
+                 '%(name)-20s : '    \
+                 '%(process)-5d : '  \
+                 '%(thread)-5d : '   \
+                 '%(levelname)-8s : ' \
+                 '%(message)s'
+
+LOG_FMT_BIN    = 'bin'
+LOG_FMT_JSON   = 'jsonl'
+
+_SCALARS       = (str, int, float, bool, type(None))
+
+_TAG_TEMPLATE  = 0
+_TAG_EVENT     = 1
+
+
+# ------------------------------------------------------------------------------
+#
+def _scalar_args(args):
+
+    # `record.args` is a tuple, or a dict for a single mapping argument
+    return isinstance(args, tuple) and \
+           all([isinstance(arg, _SCALARS) for arg in args])
+
+
+# ------------------------------------------------------------------------------
+#
+class StructHandler(logging.Handler):
+    '''
+    Write log records to `path`, in the binary (`fmt='bin'`) or JSON
+    (`fmt='jsonl'`) log format.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, path, fmt=LOG_FMT_BIN):
+
+        if fmt not in [LOG_FMT_BIN, LOG_FMT_JSON]:
+            raise ValueError('invalid log format %s' % fmt)
+
+        logging.Handler.__init__(self)
+
+        try:
+            os.makedirs(os.path.abspath(os.path.dirname(path)))
+        except:
+            pass  # exists
+
+        self.path       = path
+        self._fmt       = fmt
+        self._pid       = None
+        self._templates = dict()
+        self._formatter = logging.Formatter()
+        self._fout      = open(path, 'ab')
+        self._packer    = msgpack.Packer(use_bin_type=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _encode(self, record):
+
+        if self._pid != os.getpid():
+            # forked child: template ids need to be defined again
+            self._pid       = os.getpid()
+            self._templates = dict()
+
+        if record.args and _scalar_args(record.args) and \
+           isinstance(record.msg, str):
+            msg  = record.msg
+            args = list(record.args)
+        else:
+            msg  = record.getMessage()
+            args = list()
+
+        exc = record.exc_text
+        if record.exc_info and not exc:
+            exc = self._formatter.formatException(record.exc_info)
+        if record.stack_info:
+            exc = '%s\n%s' % (exc, record.stack_info) if exc \
+                                                     else record.stack_info
+
+        if self._fmt == LOG_FMT_JSON:
+            data = json.dumps({'time' : record.created,
+                               'name' : record.name,
+                               'pid'  : record.process,
+                               'tid'  : record.thread,
+                               'level': record.levelno,
+                               'msg'  : msg,
+                               'args' : args,
+                               'exc'  : exc}) + '\n'
+            data = data.encode('utf-8')
+
+        else:
+            data = b''
+            if args:
+                tmpl = self._templates.get(msg)
+                if tmpl is None:
+                    tmpl  = len(self._templates)
+                    data += self._packer.pack([_TAG_TEMPLATE, self._pid,
+                                               tmpl, msg])
+                    self._templates[msg] = tmpl
+            else:
+                tmpl = msg
+
+            data += self._packer.pack([_TAG_EVENT, record.created,
+                                       record.name, record.process,
+                                       record.thread, record.levelno,
+                                       tmpl, args, exc])
+
+        return data
+
+
+    # --------------------------------------------------------------------------
+    #
+    def emit(self, record):
+
+        try:
+            # write each record (including its template) at once
+            self._fout.write(self._encode(record))
+            self._fout.flush()
+
+        except Exception:
+            self.handleError(record)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def emit_all(self, records):
+        '''
+        write a batch of records (used by the async log writer)
+        '''
+
+        data = list()
+        for record in records:
+            try:
+                data.append(self._encode(record))
+            except Exception:
+                self.handleError(record)
+
+        try:
+            self._fout.write(b''.join(data))
+            self._fout.flush()
+
+        except Exception:
+            self.handleError(records[0])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+
+        self.acquire()
+        try:
+            if not self._fout.closed:
+                self._fout.flush()
+        finally:
+            self.release()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        self.acquire()
+        try:
+            self._fout.close()
+        finally:
+            self.release()
+
+        logging.Handler.close(self)
+
+
+# ------------------------------------------------------------------------------
+#
+def _read_bin(fname):
+
+    templates = dict()
+
+    with open(fname, 'rb') as fin:
+
+        # an incomplete last record (of a log still written to) is ignored
+        for rec in msgpack.Unpacker(fin, raw=False, use_list=True):
+
+            if rec[0] == _TAG_TEMPLATE:
+                _, pid, tmpl, msg = rec
+                templates[(pid, tmpl)] = msg
+                continue
+
+            _, t, name, pid, tid, level, tmpl, args, exc = rec
+            if not isinstance(tmpl, str):
+                tmpl = templates[(pid, tmpl)]
+
+            yield {'time' : t,
+                   'name' : name,
+                   'pid'  : pid,
+                   'tid'  : tid,
+                   'level': level,
+                   'msg'  : tmpl,
+                   'args' : args,
+                   'exc'  : exc}
+
+
+def _read_json(fname):
+
+    with open(fname, 'r') as fin:
+        for line in fin:
+            if line.endswith('\n'):
+                yield json.loads(line)
+
+
+# ------------------------------------------------------------------------------
+#
+def read_log(fname, t0=None, t1=None, level=None, name=None):
+    '''
+    Iterate over the records of a structured log file.  Records are dicts with
+    the keys `time`, `name`, `pid`, `tid`, `level` (numeric), `msg` (the
+    message template), `args` and `exc` (formatted exception or `None`).
+    JSON logs are recognized by the file extension `.jsonl`.
+
+    Only records with `t0 <= time <= t1` are returned, with a log level of at
+    least `level` (numeric or name, like `'INFO'`), and of the logger `name`
+    or its children (`name` can also be a list of logger names).
+    '''
+
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            raise ValueError('invalid log level')
+
+    if isinstance(name, str):
+        name = [name]
+
+    if name:
+        prefixes = tuple(['%s.' % n for n in name])
+        names    = set(name)
+
+    if fname.endswith('.%s' % LOG_FMT_JSON): records = _read_json(fname)
+    else                                   : records = _read_bin(fname)
+
+    for rec in records:
+
+        if t0    is not None and rec['time']  <  t0   : continue
+        if t1    is not None and rec['time']  >  t1   : continue
+        if level is not None and rec['level'] <  level: continue
+
+        if name and rec['name'] not in names \
+                and not rec['name'].startswith(prefixes):
+            continue
+
+        yield rec
+
+
+# ------------------------------------------------------------------------------
+#
+_render_formatter = logging.Formatter(LOG_FORMAT)
+
+
+def render_log(rec):
+    '''
+    Render a record returned by `read_log` in the format of text log files
+    (without trailing newline).
+    '''
+
+    record = logging.makeLogRecord({'created'  : rec['time'],
+                                    'name'     : rec['name'],
+                                    'process'  : rec['pid'],
+                                    'thread'   : rec['tid'],
+                                    'levelno'  : rec['level'],
+                                    'levelname': logging.getLevelName(
+                                                                rec['level']),
+                                    'msg'      : rec['msg'],
+                                    'args'     : tuple(rec['args']) or None,
+                                    'exc_text' : rec['exc']})
+
+    return _render_formatter.format(record)
+
+
+# ------------------------------------------------------------------------------
+
@@ -36,11 +36,20 @@ many times.  We use a shortcut, and create a new, unlocked lock.
 #
 import os
 import sys
+import glob
+import gzip
+import time
+import atexit
+import shutil
+import weakref
 import threading
 import colorama
 import logging
 
+from   collections import deque
+
 from   .atfork    import atfork
+from   .log_struct import StructHandler, LOG_FORMAT, _scalar_args
 from   .misc      import get_env_ns       as ru_get_env_ns
 from   .debug     import import_module    as ru_import_module
 from   .config    import DefaultConfig
@@ -55,6 +64,21 @@ INFO     = logging.INFO
 DEBUG    = logging.DEBUG
 OFF      = -1
 
+# log methods bound on `ru.Logger` instances, the native methods they are bound
+# to, and their log levels (`logging.Logger.warn` is removed in Python 3.13)
+_LOG_METHODS = {'debug'    : ['debug',     DEBUG   ],
+                'info'     : ['info',      INFO    ],
+                'warning'  : ['warning',   WARNING ],
+                'warn'     : ['warning',   WARNING ],
+                'error'    : ['error',     ERROR   ],
+                'exception': ['exception', ERROR   ],
+                'critical' : ['critical',  CRITICAL],
+                'fatal'    : ['critical',  CRITICAL]}
+
+
+def _log_noop(*args, **kwargs):
+    pass
+
 
 # ------------------------------------------------------------------------------
 #
@@ -73,6 +97,8 @@ class _LoggerRegistry(object, metaclass=Singleton):
             while logger:
                 for handler in logger.handlers:
                     handler.lock = threading.RLock()
+                    for h in getattr(handler, 'handlers', []):
+                        h.lock = threading.RLock()
                   # handler.reset()
                 logger = logger.parent
 
@@ -92,9 +118,233 @@ class _LoggerRegistry(object, metaclass=Singleton):
 _logger_registry = _LoggerRegistry()
 
 
+# ------------------------------------------------------------------------------
+#
+# In async mode, log records are not written by the logging thread, but are
+# queued and written in bulk by a writer thread (one per process).
+#
+_LOG_FLUSH = 0.1     # seconds between writes of queued log records
+_LOG_BULK  = 1024    # number of queued records which trigger a write
+
+
+class _LogWriter(object):
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self):
+
+        self._pid    = None
+        self._lock   = threading.Lock()     # protects (re)start
+        self._wlock  = threading.Lock()     # serializes writes
+        self._queue  = deque()
+        self._wake   = threading.Event()
+        self._thread = None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _start(self):
+
+        with self._lock:
+
+            if self._pid == os.getpid():
+                return
+
+            # records queued by the parent process are not ours to write
+            self._pid    = os.getpid()
+            self._wlock  = threading.Lock()
+            self._queue  = deque()
+            self._wake   = threading.Event()
+            self._thread = threading.Thread(target=self._run,
+                                            name='radical.utils.log_writer')
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def reset(self):
+
+        # called in forked children: restart on next use
+        self._pid  = None
+        self._lock = threading.Lock()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put(self, handlers, record):
+
+        if self._pid != os.getpid():
+            self._start()
+
+        # `deque.append` is thread safe and does not block
+        self._queue.append((handlers, record))
+
+        if len(self._queue) >= _LOG_BULK:
+            self._wake.set()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run(self):
+
+        while True:
+            self._wake.wait(timeout=_LOG_FLUSH)
+            self._wake.clear()
+            self.flush()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+
+        if self._pid != os.getpid():
+            return
+
+        with self._wlock:
+
+            # collect all queued records per handler, in order
+            batches = dict()
+            queue   = self._queue
+            while queue:
+                handlers, record = queue.popleft()
+                for handler in handlers:
+                    if handler in batches: batches[handler].append(record)
+                    else                 : batches[handler] = [record]
+
+            for handler, records in batches.items():
+                self._write(handler, records)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _write(self, handler, records):
+
+        records = [r for r in records if r.levelno >= handler.level
+                                      and handler.filter(r)]
+        if not records:
+            return
+
+        # write the records to streams at once, and flush once.  Colored
+        # output and other handlers write record by record.
+        if isinstance(handler, StructHandler):
+            handler.acquire()
+            try:
+                handler.emit_all(records)
+            finally:
+                handler.release()
+            return
+
+        if not isinstance(handler, logging.StreamHandler) or \
+           getattr(handler, '_tty', False) or \
+           getattr(handler, 'stream', None) is None:
+            for record in records:
+                handler.handle(record)
+            return
+
+        handler.acquire()
+        try:
+            if isinstance(handler, FSHandler):
+                handler.check_rotation()
+
+            stream = handler.stream
+            term   = getattr(handler, 'terminator', '\n')
+            try:
+                data = ''.join([handler.format(r) + term for r in records])
+
+            except Exception:
+                # handle the faulty record(s) individually
+                for record in records:
+                    handler.handle(record)
+
+            else:
+                stream.write(data)
+                stream.flush()
+
+        except Exception:
+            handler.handleError(records[0])
+
+        finally:
+            handler.release()
+
+
+_log_writer = _LogWriter()
+atexit.register(_log_writer.flush)
+
+
+# ------------------------------------------------------------------------------
+#
+class _AsyncHandler(logging.Handler):
+    '''
+    Hand log records to the log writer thread.  Messages with arguments other
+    than scalars are rendered before queuing (the arguments may change later
+    on), but all other formatting and writing is left to the writer thread.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, handlers):
+
+        logging.Handler.__init__(self)
+
+        self.handlers   = handlers
+        self._formatter = logging.Formatter()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def handle(self, record):
+
+        # no handler lock needed
+        ret = self.filter(record)
+        if ret:
+            self.emit(record)
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def emit(self, record):
+
+        try:
+            if record.args and not _scalar_args(record.args):
+                record.msg  = record.getMessage()
+                record.args = None
+
+            if record.exc_info:
+                record.exc_text = self._formatter.formatException(
+                                                               record.exc_info)
+                record.exc_info = None
+
+            _log_writer.put(self.handlers, record)
+
+        except Exception:
+            self.handleError(record)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+
+        _log_writer.flush()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        _log_writer.flush()
+
+        for handler in self.handlers:
+            handler.close()
+
+        logging.Handler.close(self)
+
+
 # ------------------------------------------------------------------------------
 def _after_fork():
 
+    _log_writer.reset()
     _logger_registry.release_all()
     logging._lock = threading.RLock()         # pylint: disable=protected-access
 
@@ -162,17 +412,276 @@ class ColorStreamHandler(logging.StreamHandler):
 
 # ------------------------------------------------------------------------------
 #
-class FSHandler(logging.FileHandler):
+_SIZE_UNITS = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+_AGE_UNITS  = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
 
-    def __init__(self, target):
+
+def _parse_unit(val, units):
+    '''
+    parse values like `100`, `1.5h` or `10M` (case insensitive)
+    '''
+
+    val = str(val).strip().lower()
+
+    if units is _SIZE_UNITS and val.endswith('b'):
+        val = val[:-1]
+
+    if not val:
+        return 0
+
+    if val[-1] in units:
+        return float(val[:-1]) * units[val[-1]]
+
+    return float(val)
+
+
+def _import_zstd():
+
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+_LOG_COMPRESS_DELAY = 1.0   # seconds before rotated segments are compressed
+_LOG_CHECK_TIME     = 1.0   # max seconds between log file checks
+
+
+def _log_compress(fname, compress, base, keep):
+
+    # compress a rotated log segment, and remove old segments.  This runs in
+    # a separate thread, errors can't be logged and are ignored.  Other
+    # processes may still write to the segment until they notice the rotation
+    # on their next write, so we wait a bit.
+    time.sleep(_LOG_COMPRESS_DELAY)
+
+    try:
+        if compress:
+            tgt = '%s.%s' % (fname, 'zst' if compress == 'zstd' else 'gz')
+            tmp = '%s.tmp' % tgt
+
+            with open(fname, 'rb') as fin:
+                if compress == 'zstd':
+                    with open(tmp, 'wb') as fout:
+                        _import_zstd().ZstdCompressor().copy_stream(fin, fout)
+                else:
+                    with gzip.open(tmp, 'wb') as fout:
+                        shutil.copyfileobj(fin, fout, 1024 * 1024)
+
+            os.rename(tmp, tgt)
+            os.unlink(fname)
+
+        if keep:
+            # segment names sort by rotation time.  A segment may exist both
+            # compressed and uncompressed while being compressed.
+            segs = dict()
+            for seg in glob.glob('%s.[0-9]*' % glob.escape(base)):
+                name = seg
+                for ext in ['.tmp', '.gz', '.zst']:
+                    if name.endswith(ext):
+                        name = name[:-len(ext)]
+                segs.setdefault(name, list()).append(seg)
+
+            for name in sorted(segs)[:-keep]:
+                for seg in segs[name]:
+                    try:
+                        os.unlink(seg)
+                    except OSError:
+                        pass
+
+    except Exception:
+        pass
+
+
+class FSHandler(logging.FileHandler):
+    '''
+    Log file handler.  If `max_size` (in bytes) or `max_age` (in seconds) are
+    set, the log file is rotated when it grows larger or older than that: it is
+    renamed to `<target>.<date>-<time>.<usec>`, and a new log file is started.
+    Rotated segments are compressed in the background (`compress` is `gzip`,
+    `zstd` or `None` - `zstd` requires the `zstandard` module, and falls back to
+    `gzip` otherwise).  If `keep` is set, only the last `keep` segments are
+    retained.
+
+    Several processes can write to (and rotate) the same log file: a process
+    which finds the log file rotated by another one just reopens it.  The log
+    file is only checked when the records written by this handler are expected
+    to exceed `max_size`, when `max_age` is reached, or once per second (to
+    notice writes and rotations of other processes).
+
+    Compression runs in daemon threads: `close()` waits for pending
+    compressions, which are otherwise lost when the process exits.
+    '''
+
+    def __init__(self, target, max_size=0, max_age=0, compress=None, keep=0):
 
         try:
             os.makedirs(os.path.abspath(os.path.dirname(target)))
         except:
             pass  # exists
 
+        if compress == 'zstd' and not _import_zstd():
+            compress = 'gzip'
+
+        if compress not in [None, 'gzip', 'zstd']:
+            raise ValueError('invalid log compression %s' % compress)
+
+        self._max_size = max_size
+        self._max_age  = max_age
+        self._compress = compress
+        self._keep     = int(keep)
+        self._threads  = list()
+
         logging.FileHandler.__init__(self, target)
 
+        self._opened()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def check_rotation(self):
+        '''
+        rotate the log file if needed (the caller holds the handler lock)
+        '''
+
+        if not self._max_size and not self._max_age:
+            return
+
+        if self.stream is None:
+            return
+
+        # avoid a `stat()` call per record: only check the log file when it is
+        # due for rotation, or when another process may have changed it
+        now = time.time()
+        if  now < self._t_check                                           and \
+            (not self._max_size or
+                 self._size + self._written < self._max_size)             and \
+            (not self._max_age  or now - self._t_open < self._max_age):
+            return
+
+        self._t_check = now + _LOG_CHECK_TIME
+
+        # the log file may have been rotated by another process
+        try:
+            st = os.stat(self.baseFilename)
+        except OSError:
+            st = None
+
+        if not st or st.st_ino != self._ino:
+            self._reopen()
+
+        elif self._max_size and st.st_size >= self._max_size:
+            self._rotate()
+
+        elif self._max_age and now - self._t_open >= self._max_age:
+            self._rotate()
+
+        else:
+            self._size    = st.st_size
+            self._written = 0
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _opened(self):
+
+        st = os.fstat(self.stream.fileno())
+
+        self._ino     = st.st_ino
+        self._size    = st.st_size      # log file size at the last check
+        self._written = 0               # characters written since then
+        self._t_open  = time.time()
+        self._t_check = self._t_open + _LOG_CHECK_TIME
+
+
+    def _reopen(self):
+
+        self.stream.close()
+        self.stream = self._open()
+        self._opened()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _rotate(self):
+
+        base = self.baseFilename
+        now  = time.time()
+        seg  = '%s.%s.%06d' % (base, time.strftime('%Y%m%d-%H%M%S',
+                                                   time.localtime(now)),
+                               int((now % 1) * 1000000))
+        try:
+            os.rename(base, seg)
+
+        except OSError:
+            # rotated by another process in the meantime
+            self._reopen()
+            return
+
+        self._reopen()
+
+        if self._compress or self._keep:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            thread = threading.Thread(target=_log_compress,
+                                      args=(seg, self._compress, base,
+                                            self._keep),
+                                      name='radical.utils.log_compress')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def format(self, record):
+
+        # all written records are formatted here: count their size
+        msg = logging.FileHandler.format(self, record)
+        self._written += len(msg) + len(self.terminator)
+
+        return msg
+
+
+    # --------------------------------------------------------------------------
+    #
+    def emit(self, record):
+
+        try:
+            self.check_rotation()
+        except Exception:
+            self.handleError(record)
+
+        logging.FileHandler.emit(self, record)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        logging.FileHandler.close(self)
+
+        # wait for pending compressions
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+        self._threads = list()
+
+
+# ------------------------------------------------------------------------------
+#
+def _struct_handler(target, path, name):
+
+    fmt, fname = target.split(':', 1)
+
+    if not fname:
+        fname = '%s.log.%s' % (name, fmt)
+
+    if not fname.startswith('/'):
+        fname = '%s/%s' % (path, fname)
+
+    return StructHandler(fname, fmt)
+
 
 # ------------------------------------------------------------------------------
 #
@@ -201,6 +710,14 @@ class Logger(object):
                     `stderr` : stderr
                     `.`      : logfile named ./<name>.log
                     <string> : logfile named <string>
+                    `bin:`   : binary log, named ./<name>.log.bin
+                    `jsonl:` : JSON log, named ./<name>.log.jsonl
+                    `bin:<string>`, `jsonl:<string>`:
+                               binary / JSON log named <string>
+
+                  Binary and JSON logs are structured log files (see
+                  `log_struct.py`), which can be filtered with `ru.read_log()`
+                  and rendered as text with `radical-log-render`.
 
         `path`    file system location to write logfiles to (created as needed)
         `level`   log level (DEBUG, INFO, WARNING, ERROR, CRITICAL, OFF)
@@ -214,8 +731,24 @@ class Logger(object):
             RADICAL_UTILS_LOG_TGT
             RADICAL_LOG_TGT
 
+            RADICAL_UTILS_LOG_ASYNC
+            RADICAL_LOG_ASYNC
+
         The first found variable of each pair is then used for the respective
-        settings.
+        settings.  If `LOG_ASYNC` is set to `TRUE`, log records are queued and
+        written in bulk by a separate thread.
+
+        Log files are rotated according to the settings `LOG_MAX_SIZE` (like
+        `100M`), `LOG_MAX_AGE` (in seconds, or like `12h`), `LOG_COMPRESS`
+        (`gzip`, `zstd` or `none`) and `LOG_KEEP` (number of rotated log
+        files to keep, `0` for all), which are evaluated in the same way (see
+        `FSHandler`).  Rotation is disabled by default.
+
+        The log methods (`debug()`, `info()` etc.) are bound to the instance,
+        and are replaced by no-ops for disabled log levels, so that suppressed
+        log calls are cheap.  The log level must thus be changed via
+        `setLevel()` on any `ru.Logger` instance of that name, not on the
+        native logger.
         """
 
         self._logger = logging.getLogger(name)
@@ -223,6 +756,9 @@ class Logger(object):
         self._logger.name      = name
 
         if self._logger.handlers:
+            self._name  = name
+            self._level = logging.getLevelName(self._logger.level)
+            self._bind()
             return
 
         # otherwise configure this logger
@@ -254,6 +790,41 @@ class Logger(object):
         if level in [OFF, 'OFF']:
             targets = ['null']
 
+        def _setting(key):
+            val = ru_get_env_ns(key, ns)
+            if val is None:
+                val = ru_def[key]
+            return val
+
+        def _enabled(val):
+            return str(val).lower() not in ['0', 'false', 'off', 'no',
+                                            'none', '']
+
+        log_async = _enabled(_setting('log_async'))
+
+        # log file rotation
+        warnings = list()
+        rotation = dict()
+        try:
+            rotation['max_size'] = _parse_unit(_setting('log_max_size'),
+                                               _SIZE_UNITS)
+            rotation['max_age']  = _parse_unit(_setting('log_max_age'),
+                                               _AGE_UNITS)
+            rotation['keep']     = int(_setting('log_keep') or 0)
+        except ValueError:
+            warnings.append('invalid log rotation settings, ignored')
+            rotation = dict()
+
+        compress = _setting('log_compress')
+        if not _enabled(compress):
+            rotation['compress'] = None
+        elif compress.lower() in ['gzip', 'zstd']:
+            rotation['compress'] = compress.lower()
+        else:
+            warnings.append("invalid log compression '%s', use gzip"
+                            % compress)
+            rotation['compress'] = 'gzip'
+
         # translate numeric levels into upper case symbolic ones
         levels  = {'50' : 'CRITICAL',
                    '40' : 'ERROR',
@@ -263,38 +834,47 @@ class Logger(object):
                     '0' :  ru_def['log_lvl'],
                    '-1' : 'OFF'}
         level   = levels.get(str(level), str(level)).upper()
-        warning = None
         if level not in list(levels.values()):
-            warning = "invalid loglevel '%s', use '%s'" \
-                                      % (level, ru_def['log_lvl'])
-            level   = ru_def['log_lvl']
+            warnings.append("invalid loglevel '%s', use '%s'"
+                            % (level, ru_def['log_lvl']))
+            level = ru_def['log_lvl']
 
-        formatter = logging.Formatter('%(created).3f : '
-                                      '%(name)-20s : '
-                                      '%(process)-5d : '
-                                      '%(thread)-5d : '
-                                      '%(levelname)-8s : '
-                                      '%(message)s')
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        def _fs(fname):
+            return FSHandler(fname, **rotation)
 
         # add a handler for each targets (using the same format)
         p = path
         n = name
+        handlers = list()
         for t in targets:
             if   t in ['0', 'null']       : h = logging.NullHandler()
             elif t in ['-', '1', 'stdout']: h = ColorStreamHandler(sys.stdout)
             elif t in ['=', '2', 'stderr']: h = ColorStreamHandler(sys.stderr)
-            elif t in ['.']               : h = FSHandler("%s/%s.log" % (p, n))
-            elif t.startswith('/')        : h = FSHandler(t)
-            else                          : h = FSHandler("%s/%s"     % (p, t))
+            elif t in ['.']               : h = _fs("%s/%s.log" % (p, n))
+            elif t.startswith('bin:')     : h = _struct_handler(t, p, n)
+            elif t.startswith('jsonl:')   : h = _struct_handler(t, p, n)
+            elif t.startswith('/')        : h = _fs(t)
+            else                          : h = _fs("%s/%s"     % (p, t))
 
             h.setFormatter(formatter)
             h.name = self._logger.name
+            handlers.append(h)
+
+        # in async mode, all handlers are served by the log writer thread
+        if log_async and not all([isinstance(h, logging.NullHandler)
+                                  for h in handlers]):
+            handlers = [_AsyncHandler(handlers)]
+            handlers[0].name = self._logger.name
+
+        for h in handlers:
             self._logger.addHandler(h)
 
         if level != 'OFF':
             self._logger.setLevel(level)
 
-        if warning:
+        for warning in warnings:
             self._logger.warning(warning)
 
         # if `name` points to module, try to log its version info
@@ -334,6 +914,52 @@ class Logger(object):
         # backward compatibility
         self._logger.warn = self._logger.warning
 
+        self._bind()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _bind(self):
+
+        # all `ru.Logger` instances of a native logger are rebound when the
+        # log level changes
+        loggers = getattr(self._logger, '_ru_loggers', None)
+        if loggers is None:
+            loggers = weakref.WeakSet()
+            self._logger._ru_loggers = loggers
+        loggers.add(self)
+
+        self._enabled = dict()
+        for method, (native, level) in _LOG_METHODS.items():
+            if self.isEnabledFor(level):
+                setattr(self, method, getattr(self._logger, native))
+            else:
+                setattr(self, method, _log_noop)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def isEnabledFor(self, level):
+
+        try:
+            return self._enabled[level]
+
+        except KeyError:
+            ret = self._logger.isEnabledFor(level)
+            self._enabled[level] = ret
+            return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def setLevel(self, level):
+
+        self._logger.setLevel(level)
+
+        for logger in list(self._logger._ru_loggers):
+            logger._level = logging.getLevelName(self._logger.level)
+            logger._bind()
+
 
     # --------------------------------------------------------------------------
     #
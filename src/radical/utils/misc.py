@@ -598,25 +598,63 @@ def get_env_ns(key, ns, default=None):
 
     (ie. without an explicit, non-empty value) will be returned as an empty
     string.
+
+    The names of the variables to check are cached per `(key, ns)` pair, but
+    the variables are looked up in `os.environ` on each call, so that changes
+    to the environment are always observed.
     '''
 
-    ns     = name2env(ns)
-    key    = name2env(key)
-    base   = ''
-    checks = list()
-    for elem in ns.split('_'):
-        base += elem + '_'
-        check = base + key
-        checks.append(check)
+    try:
+        names = _env_ns_names[(key, ns)]
+    except KeyError:
+        names = _env_ns_cache(key, ns)
 
-    for check in reversed(checks):
-        if check in os.environ:
-            val = os.environ[check]
-            return val
+    env = os.environ
+    for name in names:
+        if name in env:
+            return env[name]
 
     return default
 
 
+# ------------------------------------------------------------------------------
+#
+_env_ns_names = dict()
+_ENV_NS_CACHE = 10000     # max number of cached entries
+
+
+def _env_ns_cache(key, ns):
+
+    # the entry for a namespace extends the entry of its parent namespace, so
+    # that new (e.g. uid based) namespaces are cheap to add
+    try:
+        return _env_ns_names[(key, ns)]
+    except KeyError:
+        pass
+
+    env_key = name2env(key)
+    env_ns  = name2env(ns)
+
+    if (env_key, env_ns) != (key, ns):
+        names = _env_ns_cache(env_key, env_ns)
+
+    else:
+        if '_' in env_ns:
+            parent = _env_ns_cache(env_key, env_ns.rsplit('_', 1)[0])
+        else:
+            parent = ()
+
+        names = ('%s_%s' % (env_ns, env_key),) + parent
+
+    # namespaces are often derived from unique names: limit the cache size
+    if len(_env_ns_names) >= _ENV_NS_CACHE:
+        _env_ns_names.clear()
+
+    _env_ns_names[(key, ns)] = names
+
+    return names
+
+
 # ------------------------------------------------------------------------------
 #
 def expand_env(data, env=None, ignore_missing=True):
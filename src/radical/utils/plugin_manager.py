@@ -124,7 +124,7 @@ class PluginManager(object):
         # start wish a fresh plugin registry
         self._plugins = dict()
 
-        self._log.info('loading plugins for namespace %s' % self._namespace)
+        self._log.info('loading plugins for namespace %s', self._namespace)
 
         # avoid to load plugins twice in case of redundant sys paths
         seen = list()
@@ -198,19 +198,19 @@ class PluginManager(object):
 
                     # make sure details are complete
                     if not ptype:
-                        self._log.error('no plugin type in %s' % pshort)
+                        self._log.error('no plugin type in %s', pshort)
                         continue
 
                     if not pname:
-                        self._log.error('no plugin name in %s' % pshort)
+                        self._log.error('no plugin name in %s', pshort)
                         continue
 
                     if not pvers:
-                        self._log.error('no plugin version in %s' % pshort)
+                        self._log.error('no plugin version in %s', pshort)
                         continue
 
                     if not pdescr:
-                        self._log.error('no plugin description in %s' % pshort)
+                        self._log.error('no plugin description in %s', pshort)
                         continue
 
                     # now put the plugin and plugin info into the plugin
@@ -219,7 +219,7 @@ class PluginManager(object):
                         self._plugins[ptype] = {}
 
                     if pname in self._plugins[ptype]:
-                        self._log.warn('overloading plugin %s' % pshort)
+                        self._log.warn('overloading plugin %s', pshort)
 
                     self._plugins[ptype][pname] = {
                         'class'      : plugin.PLUGIN_CLASS,
@@ -230,11 +230,11 @@ class PluginManager(object):
                         'instance'   : None
                     }
 
-                    self._log.debug('loading plugin %s' % pfile)
-                    self._log.info ('loading plugin %s' % pshort)
+                    self._log.debug('loading plugin %s', pfile)
+                    self._log.info('loading plugin %s', pshort)
 
                 except Exception:
-                    self._log.exception('loading plugin %s failed' % pshort)
+                    self._log.exception('loading plugin %s failed', pshort)
 
 
     # --------------------------------------------------------------------------
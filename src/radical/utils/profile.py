@@ -2,6 +2,13 @@
 import os
 import csv
 import time
+import heapq
+import bisect
+import operator
+import itertools
+import warnings
+
+import threading as mt
 
 from   .ids     import get_radical_base
 from   .misc    import as_string
@@ -11,6 +18,10 @@ from   .misc    import get_hostip      as ru_get_hostip
 from   .threads import get_thread_name as ru_get_thread_name
 from   .config  import DefaultConfig
 
+from   .profile_bin import BinaryWriter, read_bprof, BPROF_EXT
+from   .profile_columns import ProfileColumns, ProfileSymbols
+from   .profile_filter  import ProfileFilter
+
 
 # ------------------------------------------------------------------------------
 #
@@ -126,13 +137,28 @@ class Profiler(object):
 
     If either is present in the environemnt, the profile is enabled (the value
     of the setting is ignored).
+
+    The profile format is selected by `fmt`, or else by the env variables
+
+        RADICAL_UTILS_PROFILE_FMT
+        RADICAL_PROFILE_FMT
+
+    or else by the `profile_fmt` default config setting:
+
+        csv: one CSV line per event in `<name>.prof` (default)
+        bin: binary records in `<name>.bprof`, buffered per thread and written
+             in bulk (see `profile_bin.py`).  Use `bprof_to_csv()` to convert
+             the result into the CSV format.
+
+    The thread name recorded for events is determined on the first event of
+    each thread.
     """
 
     fields  = ['time', 'event', 'comp', 'thread', 'uid', 'state', 'msg']
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, name, ns=None, path=None):
+    def __init__(self, name, ns=None, path=None, fmt=None):
         """
         Open the file handle, sync the clock, and write timestam_zero
         """
@@ -159,10 +185,28 @@ class Profiler(object):
         self._enabled = True
         self._path    = path
         self._name    = name
+        self._fmt     = fmt
+        self._tls     = mt.local()
+        self._handle  = None
+        self._writer  = None
 
         if not self._path:
             self._path = ru_def['profile_dir']
 
+        if not self._fmt:
+            self._fmt = ru_get_env_ns('profile_fmt', ns)
+
+        if not self._fmt:
+            self._fmt = ru_def.get('profile_fmt', 'csv')
+
+        # like invalid log settings, an invalid format should not break the
+        # component which is profiled
+        self._fmt = self._fmt.lower()
+        if self._fmt not in ['csv', 'bin']:
+            warnings.warn("invalid profile format '%s', use 'csv'" % self._fmt,
+                          RuntimeWarning)
+            self._fmt = 'csv'
+
         self._ts_zero, self._ts_abs, self._ts_mode = self._timestamp_init()
 
         try:
@@ -170,24 +214,25 @@ class Profiler(object):
         except OSError:
             pass  # already exists
 
-        # we set `buffering` to `1` to force line buffering.  That is not idea
-        # performance wise - but will not do an `fsync()` after writes, so OS
-        # level buffering should still apply.  This is supposed to shield
-        # against incomplete profiles.
-        self._handle = open("%s/%s.prof" % (self._path, self._name), 'a',
-                            buffering=1)
+        if self._fmt == 'bin':
+            self._writer = BinaryWriter("%s/%s.%s" % (self._path, self._name,
+                                                      BPROF_EXT))
 
-        # write header and time normalization info
-        if self._handle:
+        else:
+            # we set `buffering` to `1` to force line buffering.  That is not
+            # ideal performance wise - but will not do an `fsync()` after
+            # writes, so OS level buffering should still apply.  This is
+            # supposed to shield against incomplete profiles.
+            self._handle = open("%s/%s.prof" % (self._path, self._name), 'a',
+                                buffering=1)
             self._handle.write("#%s\n" % (','.join(Profiler.fields)))
-            self._handle.write("%.7f,%s,%s,%s,%s,%s,%s\n" %
-                           (self.timestamp(), 'sync_abs', self._name,
-                            ru_get_thread_name(), '', '',
-                            "%s:%s:%s:%s:%s" % (ru_get_hostname(),
-                                                ru_get_hostip(),
-                                                self._ts_zero,
-                                                self._ts_abs,
-                                                self._ts_mode)))
+
+        # write time normalization info
+        self.prof('sync_abs', msg="%s:%s:%s:%s:%s" % (ru_get_hostname(),
+                                                      ru_get_hostip(),
+                                                      self._ts_zero,
+                                                      self._ts_abs,
+                                                      self._ts_mode))
 
 
     # --------------------------------------------------------------------------
@@ -220,12 +265,17 @@ class Profiler(object):
             if not self._enabled:
                 return
 
-            if self._enabled and self._handle:
+            if self._handle:
                 self.prof("END")
                 self.flush(verbose=False)
                 self._handle.close()
                 self._handle = None
 
+            if self._writer:
+                self.prof("END")
+                self._writer.close()
+                self._writer = None
+
         except:
             pass
 
@@ -235,9 +285,8 @@ class Profiler(object):
     def flush(self, verbose=True):
 
         if not self._enabled: return
-        if not self._handle : return
 
-        if self._enabled:
+        if self._handle:
 
             if verbose:
                 self.prof("flush")
@@ -246,6 +295,14 @@ class Profiler(object):
             self._handle.flush()
             os.fsync(self._handle.fileno())
 
+        elif self._writer:
+
+            if verbose:
+                self.prof("flush")
+
+            self._writer.flush()
+            self._writer.fsync()
+
 
     # --------------------------------------------------------------------------
     #
@@ -255,15 +312,20 @@ class Profiler(object):
                    tid=None):
 
         if not self._enabled: return
-        if not self._handle : return
+        if not self._handle and not self._writer: return
 
         if ts    is None: ts    = self.timestamp()
         if comp  is None: comp  = self._name
-        if tid   is None: tid   = ru_get_thread_name()
         if uid   is None: uid   = ''
         if state is None: state = ''
         if msg   is None: msg   = ''
 
+        if tid   is None:
+            try:
+                tid = self._tls.tid
+            except AttributeError:
+                tid = self._tls.tid = ru_get_thread_name()
+
         # if uid is a list, then recursively call self.prof for each uid given
         if isinstance(uid, list):
             for _uid in uid:
@@ -271,6 +333,10 @@ class Profiler(object):
                           ts=ts, comp=comp, tid=tid)
             return
 
+        if self._writer:
+            self._writer.write(ts, event, comp, tid, uid, state, msg)
+            return
+
         data = "%.7f,%s,%s,%s,%s,%s,%s\n" \
                 % (ts, event, comp, tid, uid, state, msg)
         self._handle.write(data)
@@ -315,27 +381,298 @@ def timestamp():
 
 # ------------------------------------------------------------------------------
 #
-def read_profiles(profiles, sid=None, efilter=None):
+# number of rows converted at once when reading columnar profiles
+_COLUMNAR_BATCH = 100000
+
+# reorder window (in seconds) for merging profiles
+_MERGE_WINDOW   = 1.0
+_REORDER_BATCH  = 1024
+
+# events used for time syncing
+_SYNC_EVENTS    = ('sync_abs', 'sync_rel')
+_time_key       = operator.itemgetter(TIME)
+
+
+# ------------------------------------------------------------------------------
+#
+def _read_rows(fname, strings):
+
+    # yield the raw rows of a CSV or binary profile
+    if fname.endswith('.%s' % BPROF_EXT):
+        for row in read_bprof(fname, strings):
+            yield row
+
+    else:
+        with open(fname, 'r') as fin:
+            for row in _split_lines(fin):
+                yield row
+
+
+def _split_lines(lines):
+
+    # profiles are written without quoting, so a plain split yields the same
+    # fields as the (much slower) csv reader.  Once we find a quote, we leave
+    # the remaining lines to the csv reader.
+    lines = iter(lines)
+
+    for line in lines:
+
+        if '"' in line:
+            for row in csv.reader(itertools.chain([line], lines)):
+                yield row
+            break
+
+        line = line.rstrip('\r\n')
+        if line: yield line.split(',')
+        else   : yield []
+
+
+def _legacy():
+
+    # check if profiles should be read in the legacy format
+    legacy = os.environ.get('RADICAL_ANALYTICS_LEGACY_PROFILES', False)
+
+    if legacy and legacy.lower() not in ['no', 'false']:
+        return True
+
+    return False
+
+
+# ------------------------------------------------------------------------------
+#
+def _read_profile(prof, sid, efilter, legacy, strings, symbols, reader=None):
+
+    # read and parse a single profile (or the raw rows from `reader`).  Return
+    # its rows (or `ProfileColumns` if `symbols` is given), and its `sync_abs`
+    # and `sync_rel` rows.
+
+    rows     = list()
+    chunks   = list()    # columnar batches
+    sync_abs = list()
+    sync_rel = list()
+    last     = list()
+    skipped  = 0
+    intern   = strings.setdefault
+
+    if reader is None:
+        reader = _read_rows(prof, strings)
+
+    # fields which are read verbatim can be filtered early (UID and ENTITY are
+    # changed below, and legacy profiles use a different field order)
+    if efilter and not legacy:
+        early, late = efilter.split([EVENT, COMP, TID, STATE, MSG])
+    else:
+        early, late = None, efilter
+
+    try:
+        for raw in reader:
+
+            # apply the filter on fields which are not changed below, before
+            # spending any time on the row.  Incomplete rows are checked later.
+            # Sync events are always parsed, as they are needed to correct the
+            # time stamps of the remaining events.
+            checked = False
+            keep    = True
+            if early:
+                try:
+                    if not early(raw):
+                        if raw[EVENT] not in _SYNC_EVENTS:
+                            continue
+                        keep = False
+                    checked = True
+                except IndexError:
+                    pass
+
+            # we keep the raw data around for error checks
+            row = list(raw)
+
+          # if 'bootstrap_1' in row:
+          #     print()
+          #     print(row)
+
+            # skip header
+            if isinstance(row[TIME], str) and row[TIME].startswith('#'):
+                skipped += 1
+                continue
+
+            # make room in the row for entity type etc.
+            row.extend([None] * (PROF_KEY_MAX - len(row)))
+
+            if early and not checked and not early(row):
+                if row[EVENT] not in _SYNC_EVENTS:
+                    continue
+                keep = False
+
+            row[TIME] = float(row[TIME])
+
+            # we derive entity type from the uid -- but funnel
+            # some cases into 'session' as a catch-all type
+            uid = row[UID]
+            if uid:
+                row[ENTITY] = uid.split('.',1)[0]
+            else:
+                row[ENTITY] = 'session'
+                row[UID]    = sid
+
+            # we should have no unset (ie. None) fields left - otherwise
+            # the profile was likely not correctly closed.
+            if None in row:
+                if legacy:
+                    comp, tid = row[1].split(':', 1)
+                    new_row = [None] * PROF_KEY_MAX
+                    new_row[TIME        ] = row[0]
+                    new_row[EVENT       ] = row[4]
+                    new_row[COMP        ] = comp
+                    new_row[TID         ] = tid
+                    new_row[UID         ] = row[2]
+                    new_row[STATE       ] = row[3]
+                    new_row[MSG         ] = row[5]
+
+                    uid = new_row[UID]
+                    if uid:
+                        new_row[ENTITY] = uid.split('.',1)[0]
+                    else:
+                        new_row[ENTITY] = 'session'
+                        new_row[UID]    = sid
+
+                    row = new_row
+
+            if None in row:
+                print('row invalid [%s]: %s' % (prof, raw))
+                continue
+              # raise ValueError('row invalid [%s]: %s' % (prof, row))
+
+            # apply the remaining filter.  We do that after adding the entity
+            # field above, as the filter might also apply to that.
+            if late and not late(row):
+                if row[EVENT] not in _SYNC_EVENTS:
+                    continue
+                keep = False
+
+            # profiles repeat the same few strings over and over: keep
+            # only one copy of each string (all fields but TIME)
+            row[EVENT:] = [intern(val, val) for val in row[EVENT:]]
+
+            # fix rp issue 1117 (see FIXME above)
+            if row[TIME] == 1.0 and last:
+                row[TIME] = last[TIME]
+
+            last = row
+
+            if   row[EVENT] == 'sync_abs': sync_abs.append(row)
+            elif row[EVENT] == 'sync_rel': sync_rel.append(row)
+
+            if not keep:
+                continue
+
+            rows.append(row)
+
+            # convert to columns in batches to limit memory usage
+            if symbols is not None and len(rows) >= _COLUMNAR_BATCH:
+                chunks.append(ProfileColumns.from_rows(rows, symbols))
+                rows = list()
+
+          # print(' --- %-30s -- %-30s ' % (row[STATE], row[MSG]))
+          # if 'bootstrap_1' in row:
+          #     print(row)
+          #     print()
+          #     print('TIME    : %s' % row[TIME  ])
+          #     print('EVENT   : %s' % row[EVENT ])
+          #     print('COMP    : %s' % row[COMP  ])
+          #     print('TID     : %s' % row[TID   ])
+          #     print('UID     : %s' % row[UID   ])
+          #     print('STATE   : %s' % row[STATE ])
+          #     print('ENTITY  : %s' % row[ENTITY])
+          #     print('MSG     : %s' % row[MSG   ])
+
+    except:
+        raise
+      # print('skip remainder of %s' % prof)
+      # continue
+
+    if symbols is not None:
+        chunks.append(ProfileColumns.from_rows(rows, symbols))
+        rows = ProfileColumns.concat(chunks)
+
+    return rows, sync_abs, sync_rel
+
+
+def _read_profile_worker(args):
+
+    # `_read_profile` in a pool worker: columnar profiles get a symbol table of
+    # their own, which is merged into the shared one by the parent process
+    prof, sid, efilter, legacy, columnar = args
+    symbols = ProfileSymbols() if columnar else None
+
+    return _read_profile(prof, sid, efilter, legacy, dict(), symbols)
+
+
+# ------------------------------------------------------------------------------
+#
+class _Profiles(dict):
+    '''
+    The dict returned by `read_profiles`.  It additionally holds the sync
+    events found while reading each profile, so that `combine_profiles` does
+    not need to scan the profiles for them again.  The sync events of a profile
+    are dropped when the profile is replaced or removed.
+    '''
+
+    def __init__(self, *args, **kwargs):
+
+        dict.__init__(self, *args, **kwargs)
+        self.syncs = dict()
+
+    def __setitem__(self, key, val):
+
+        self.syncs.pop(key, None)
+        dict.__setitem__(self, key, val)
+
+    def __delitem__(self, key):
+
+        self.syncs.pop(key, None)
+        dict.__delitem__(self, key)
+
+
+# ------------------------------------------------------------------------------
+#
+def read_profiles(profiles, sid=None, efilter=None, columnar=False,
+                  workers=None):
     """
-    We read all profiles as CSV files and parse them.  For each profile,
-    we back-calculate global time (epoch) from the synch timestamps.
+    We read all profiles as CSV files (or binary profiles, if the file name ends
+    in `.bprof`) and parse them.  For each profile, we back-calculate global
+    time (epoch) from the synch timestamps.
 
-    The caller can provide a filter of the following structure
+    The caller can provide a filter (`efilter`) as `ProfileFilter` instance, to
+    only read the events of interest.  For backward compatibility, a dict of the
+    following structure is also accepted, and is used to exclude events:
 
         filter = {ru.EVENT: ['event 1', 'event 2', ...],
                   ru.MSG  : ['msg 1',   'msg 2',   ...],
                   ...
                  }
 
-    Filters apply on *substring* matches!
+    As before, an event is excluded by such a dict if the value of a field is
+    a *substring* of one of its patterns.  Patterns of `ProfileFilter` instances
+    are matched against the complete field value instead (see `ProfileFilter`
+    for prefix and regex matches).  Filters are applied while parsing, so
+    reading a small subset of a profile is considerably faster than reading all
+    of it.  Sync events which are filtered out are still used by
+    `combine_profiles` to correct the time stamps of the remaining events.
+
+    Equal strings in the returned rows are represented by the same string
+    object, so that memory consumption is dominated by the number of rows, not
+    by the length of their strings.
+
+    If `columnar` is set, each profile is returned as `ProfileColumns` instance
+    instead of a list of rows (this requires numpy).  All returned profiles then
+    share one symbol table.
+
+    If `workers` is larger than one, the profiles are parsed by a pool of that
+    many processes.  The result is the same as for serial reading, but strings
+    are only shared within each profile.
     """
 
-    legacy = os.environ.get('RADICAL_ANALYTICS_LEGACY_PROFILES', False)
-
-    if legacy and legacy.lower() not in ['no', 'false']:
-        legacy = True
-    else:
-        legacy = False
+    legacy = _legacy()
 
 
   # import resource
@@ -348,189 +685,133 @@ def read_profiles(profiles, sid=None, efilter=None):
     #    [1] https://github.com/radical-cybertools/radical.pilot/issues/1117
 
     if not efilter:
-        efilter = dict()
+        efilter = None
 
-    ret     = dict()
-    last    = list()
-    skipped = 0
-
-    for prof in profiles:
+    else:
+        efilter = ProfileFilter.from_dict(efilter)
 
-        with open(prof, 'r') as csvfile:
+    ret      = _Profiles()
+    symbols  = ProfileSymbols() if columnar else None
+    profiles = list(profiles)
 
-            ret[prof] = list()
-            reader    = csv.reader(csvfile)
+    if workers and workers > 1 and len(profiles) > 1:
 
-            try:
-                for raw in reader:
+        import multiprocessing as mp
 
-                    # we keep the raw data around for error checks
-                    row = list(raw)
+        args = [(prof, sid, efilter, legacy, columnar) for prof in profiles]
+        pool = mp.Pool(min(workers, len(profiles)))
 
-                  # if 'bootstrap_1' in row:
-                  #     print()
-                  #     print(row)
+        try:
+            # `imap` retains the order of profiles
+            results = list(pool.imap(_read_profile_worker, args))
+        finally:
+            pool.close()
+            pool.join()
 
-                    # skip header
-                    if row[TIME].startswith('#'):
-                        skipped += 1
-                        continue
+        for prof, (data, sync_abs, sync_rel) in zip(profiles, results):
+            if columnar:
+                data = data.recode(symbols)
+            ret[prof]       = data
+            ret.syncs[prof] = {'abs': sync_abs, 'rel': sync_rel}
 
-                    # make room in the row for entity type etc.
-                    row.extend([None] * (PROF_KEY_MAX - len(row)))
+        return ret
 
-                    row[TIME] = float(row[TIME])
+    strings = dict()   # interned strings
 
-                    # we derive entity type from the uid -- but funnel
-                    # some cases into 'session' as a catch-all type
-                    uid = row[UID]
-                    if uid:
-                        row[ENTITY] = uid.split('.',1)[0]
-                    else:
-                        row[ENTITY] = 'session'
-                        row[UID]    = sid
-
-                    # we should have no unset (ie. None) fields left - otherwise
-                    # the profile was likely not correctly closed.
-                    if None in row:
-                        if legacy:
-                            comp, tid = row[1].split(':', 1)
-                            new_row = [None] * PROF_KEY_MAX
-                            new_row[TIME        ] = row[0]
-                            new_row[EVENT       ] = row[4]
-                            new_row[COMP        ] = comp
-                            new_row[TID         ] = tid
-                            new_row[UID         ] = row[2]
-                            new_row[STATE       ] = row[3]
-                            new_row[MSG         ] = row[5]
-
-                            uid = new_row[UID]
-                            if uid:
-                                new_row[ENTITY] = uid.split('.',1)[0]
-                            else:
-                                new_row[ENTITY] = 'session'
-                                new_row[UID]    = sid
-
-                            row = new_row
-
-                    if None in row:
-                        print('row invalid [%s]: %s' % (prof, raw))
-                        continue
-                      # raise ValueError('row invalid [%s]: %s' % (prof, row))
-
-                    # apply the filter.  We do that after adding the entity
-                    # field above, as the filter might also apply to that.
-                    skip = False
-                    for field, pats in efilter.items():
-                        for pattern in pats:
-                            if row[field] in pattern:
-                                skip = True
-                                break
-                        if skip:
-                            continue
+    for prof in profiles:
 
-                    # fix rp issue 1117 (see FIXME above)
-                    if row[TIME] == 1.0 and last:
-                        row[TIME] = last[TIME]
-
-                    if not skip:
-                        ret[prof].append(row)
-
-                    last = row
-
-                  # print(' --- %-30s -- %-30s ' % (row[STATE], row[MSG]))
-                  # if 'bootstrap_1' in row:
-                  #     print(row)
-                  #     print()
-                  #     print('TIME    : %s' % row[TIME  ])
-                  #     print('EVENT   : %s' % row[EVENT ])
-                  #     print('COMP    : %s' % row[COMP  ])
-                  #     print('TID     : %s' % row[TID   ])
-                  #     print('UID     : %s' % row[UID   ])
-                  #     print('STATE   : %s' % row[STATE ])
-                  #     print('ENTITY  : %s' % row[ENTITY])
-                  #     print('MSG     : %s' % row[MSG   ])
-
-            except:
-                raise
-              # print('skip remainder of %s' % prof)
-              # continue
+        data, sync_abs, sync_rel = _read_profile(prof, sid, efilter, legacy,
+                                                 strings, symbols)
+        ret[prof]       = data
+        ret.syncs[prof] = {'abs': sync_abs, 'rel': sync_rel}
 
     return ret
 
 
 # ------------------------------------------------------------------------------
 #
-def combine_profiles(profs):
-    """
-    We merge all profiles and sort by time.
+# The helpers below let `combine_profiles` operate on both row based and
+# columnar profiles.
+#
+def _sync_events(prof):
 
-    This routine expects all profiles to have a synchronization time stamp.
-    Two kinds of sync timestamps are supported: absolute (`sync_abs`) and
-    relative (`sync_rel`).
+    # return lists of sync_abs and sync_rel events
+    if isinstance(prof, ProfileColumns):
+        np = prof._np                                    # pylint: disable=W0212
+        return [[prof[idx] for idx in np.flatnonzero(prof.mask(EVENT, name))]
+                for name in ['sync_abs', 'sync_rel']]
 
-    Time syncing is done based on 'sync_abs' timestamps.  We expect one such
-    absolute timestamp to be available per host (the first profile entry will
-    contain host information).  All timestamps from the same host will be
-    corrected by the respectively determined NTP offset.  We define an
-    'accuracy' measure which is the maximum difference of clock correction
-    offsets across all hosts.
+    sync_abs = list()
+    sync_rel = list()
+    for entry in prof:
+        if entry[EVENT] == 'sync_abs': sync_abs.append(entry)
+        if entry[EVENT] == 'sync_rel': sync_rel.append(entry)
 
-    The `sync_rel` timestamps are expected to occur in pairs, one for a profile
-    with no other sync timestamp, and one profile which has
-    a `sync_abs`timestamp.  In that case, the time correction from the latter is
-    transfered to the former (the two time stamps are considered to have been
-    written at the exact same time).
+    return sync_abs, sync_rel
 
-    The method returnes the combined profile and accuracy, as tuple.
-    """
 
-    syncs    = dict()  # profiles which have relative time refs
-    t_host   = dict()  # time offset per host
-    p_glob   = list()  # global profile
-    t_min    = None    # absolute starting point of profiled session
-    c_end    = 0       # counter for profile closing tag
-    accuracy = 0       # max uncorrected clock deviation
+def _shift(prof, offset):
 
-    # first get all absolute and relative timestamp sync from the profiles,
-    # for all hosts
-    for pname, prof in profs.items():
+    # add `offset` to all time stamps
+    if isinstance(prof, ProfileColumns):
+        prof.time += offset
 
-        sync_abs = list()
-        sync_rel = list()
+    else:
+        for event in prof:
+            event[TIME] += offset
 
-        syncs[pname] = {'rel' : sync_rel,
-                        'abs' : sync_abs}
 
-        if not len(prof):
-            continue
+def _count(prof, name):
 
-        for entry in prof:
-            if entry[EVENT] == 'sync_abs': sync_abs.append(entry)
-            if entry[EVENT] == 'sync_rel': sync_rel.append(entry)
+    # count the events with the given name
+    if isinstance(prof, ProfileColumns):
+        return int(prof._np.count_nonzero(prof.mask(EVENT, name)))
 
-        # we can have any number of sync_rel's - but if we find none, we expect
-        # a sync_abs
-        if not sync_rel and not sync_abs:
-            print('unsynced     %s' % pname)
+    return len([row for row in prof if row[EVENT] == name])
 
-        syncs[pname] = {'rel' : sync_rel,
-                        'abs' : sync_abs}
 
-  # for pname, prof in profs.items():
-  #     if prof:
-  #         print('check        %-100s: %s' % (pname, prof[0][TIME:EVENT]))
+def _merge(profs):
 
-    for pname, prof in profs.items():
+    # merge the profiles and sort by time
+    if profs and isinstance(profs[0], ProfileColumns):
+        return ProfileColumns.concat(profs).sort()
 
-        if not len(prof):
-          # print('empty        %s' % pname)
-            continue
+    p_glob = list()
+    for prof in profs:
+        p_glob += prof
+
+    return sorted(p_glob, key=lambda k: k[TIME])
+
+
+# ------------------------------------------------------------------------------
+#
+def _sync_offsets(syncs, verbose=True):
+
+    # Determine the time corrections for all profiles from their sync events,
+    # as described in `combine_profiles`.  `syncs` maps profile names to dicts
+    # with lists of `abs` and `rel` sync events (relative syncs may transplant
+    # absolute sync events between those lists).  Return a dict which maps the
+    # names of all profiles which can be synced to a list
+    #
+    #     [rel_offset, transplanted sync_abs event or None, host offset]
+    #
+    # the absolute starting point of the session, and the accuracy.  Event time
+    # stamps are corrected by `((t + rel_offset) - t_min) - host_offset`.
+
+    t_host   = dict()  # time offset per host
+    t_rel    = dict()  # relative time offset per profile
+    t_event  = dict()  # transplanted sync_abs event per profile
+    t_min    = None    # absolute starting point of profiled session
+    accuracy = 0       # max uncorrected clock deviation
+    ret      = dict()
+
+    for pname in syncs:
 
         # if we have only sync_rel(s), then find the offset by the corresponding
         # sync_rel in the other profiles, and determine the offset to use.  Use
         # the first sync_rel that results in an offset, and only complain if
-        # none is found.
+        # none is found.  Profiles which are already synced contribute their
+        # corrected time stamps.
         offset       = None
         offset_event = None
         if syncs[pname]['abs']:
@@ -545,8 +826,10 @@ def combine_profiles(profs):
 
                     for _sync_rel in syncs[_pname]['rel']:
                         if _sync_rel[MSG] == sync_rel[MSG]:
-                            offset        = _sync_rel[TIME] - sync_rel[TIME]
-                            offset_event  = syncs[_pname]['abs'][0]
+                            t_sync        = _sync_rel[TIME] \
+                                          + t_rel.get(_pname, 0.0)
+                            offset        = t_sync - sync_rel[TIME]
+                            offset_event  = list(syncs[_pname]['abs'][0])
 
                     if offset:
                         break
@@ -555,19 +838,20 @@ def combine_profiles(profs):
                     break
 
         if offset is None:
-            print('no rel sync  %s' % pname)
+            if verbose:
+                print('no rel sync  %s' % pname)
             continue
 
       # print('sync profile %-100s : %20.3fs' % (pname, offset))
-        for event in prof:
-            event[TIME] += offset
+        t_rel[pname] = offset
 
-        # if we have an offset event, we append it to the profile.  This
-        # basically transplants an sync_abs event into a sync_rel profile
+        # if we have an offset event, we transplant that sync_abs event into
+        # the sync_rel profile (as a copy, as the original event is corrected
+        # along with its own profile)
         if offset_event:
           # print('transplant sync_abs to %s: %s' % (pname, offset_event))
-            prof.append(offset_event)
             syncs[pname]['abs'].append(offset_event)
+            t_event[pname] = offset_event
 
     # all profiles are rel-synced here.  Now we look at sync_abs values to align
     # across hosts and to determine accuracy.
@@ -605,58 +889,135 @@ def combine_profiles(profs):
 
                 # we allow for *some* amount of inconsistency before warning
                 if diff > NTP_DIFF_WARN_LIMIT:
-                    print('conflicting time sync for %-45s (%15s): '
-                          '%10.2f - %10.2f = %5.2f'
-                        % (pname.split('/')[-1], host_id, t_off,
-                           t_host[host_id], diff))
+                    if verbose:
+                        print('conflicting time sync for %-45s (%15s): '
+                              '%10.2f - %10.2f = %5.2f'
+                            % (pname.split('/')[-1], host_id, t_off,
+                               t_host[host_id], diff))
                     continue
 
             t_host[host_id] = t_off
 
+    # now that we can align clocks for all hosts, determine the correction for
+    # all profiles
+    for pname in t_rel:
+
+        if not syncs[pname]['abs']:
+            continue
+
+        sync_abs = syncs[pname]['abs'][0]
+        host, ip, _, _, _ = sync_abs[MSG].split(':')
+        host_id = '%s:%s' % (host, ip)
+
+        ret[pname] = [t_rel[pname], t_event.get(pname),
+                      t_host.get(host_id, 0.0)]
+
+    return ret, t_min, accuracy
+
+
+# ------------------------------------------------------------------------------
+#
+def _collect_syncs(profs):
+
+    # get all absolute and relative timestamp syncs from the (non-empty)
+    # profiles.  Use the sync events found by `read_profiles` if available.
+    known = getattr(profs, 'syncs', dict())
+    syncs = dict()
+
+    for pname, prof in profs.items():
+
+        # profiles can be empty after filtering, but still provide syncs
+        if not len(prof) and not (pname in known and
+                                  (known[pname]['abs'] or known[pname]['rel'])):
+            continue
+
+        if pname in known:
+            sync_abs = list(known[pname]['abs'])
+            sync_rel = list(known[pname]['rel'])
+        else:
+            sync_abs, sync_rel = _sync_events(prof)
+
+        # we can have any number of sync_rel's - but if we find none, we expect
+        # a sync_abs
+        if not sync_rel and not sync_abs:
+            print('unsynced     %s' % pname)
+
+        syncs[pname] = {'rel' : sync_rel,
+                        'abs' : sync_abs}
+
+    return syncs
+
+
+# ------------------------------------------------------------------------------
+#
+def combine_profiles(profs):
+    """
+    We merge all profiles and sort by time.
+
+    This routine expects all profiles to have a synchronization time stamp.
+    Two kinds of sync timestamps are supported: absolute (`sync_abs`) and
+    relative (`sync_rel`).
+
+    Time syncing is done based on 'sync_abs' timestamps.  We expect one such
+    absolute timestamp to be available per host (the first profile entry will
+    contain host information).  All timestamps from the same host will be
+    corrected by the respectively determined NTP offset.  We define an
+    'accuracy' measure which is the maximum difference of clock correction
+    offsets across all hosts.
+
+    The `sync_rel` timestamps are expected to occur in pairs, one for a profile
+    with no other sync timestamp, and one profile which has
+    a `sync_abs`timestamp.  In that case, the time correction from the latter is
+    transfered to the former (the two time stamps are considered to have been
+    written at the exact same time).
+
+    The method returnes the combined profile and accuracy, as tuple.
+
+    If the given profiles are `ProfileColumns` instances (see `read_profiles`),
+    then time corrections are applied as array operations, and the combined
+    profile is returned as `ProfileColumns` instance.
+
+    See `merge_profiles` for a streaming version of this method.
+    """
+
+    p_glob = list()  # global profile
+    c_end  = 0       # counter for profile closing tag
+
+    corr, t_min, accuracy = _sync_offsets(_collect_syncs(profs))
 
-    unsynced = set()
-    # now that we can align clocks for all hosts, apply that correction to all
-    # profiles
+  # for pname, prof in profs.items():
+  #     if prof:
+  #         print('check        %-100s: %s' % (pname, prof[0][TIME:EVENT]))
+
+    # apply the time corrections to all profiles
     for pname, prof in profs.items():
 
         if not len(prof):
           # print('empty prof: %s' % pname)
             continue
 
-        if not syncs[pname]['abs']:
+        if pname not in corr:
             print('no sync_abs event: %s' % prof[0])
             continue
 
-        sync_abs = syncs[pname]['abs'][0]
+        t_rel, offset_event, t_off = corr[pname]
 
-      # print(MSG)
-      # print(sync_abs)
-      # print(sync_abs[MSG])
-      # print(sync_abs[MSG].split(':'))
-        host, ip, _, _, _ = sync_abs[MSG].split(':')
-        host_id = '%s:%s' % (host, ip)
-        if host_id in t_host:
-            t_off = t_host[host_id]
-        else:
-            unsynced.add(host_id)
-            t_off = 0.0
+        _shift(prof, t_rel)
 
-        t_0 = sync_abs[TIME]
-        t_0 -= t_min
+        # if we have an offset event, we append it to the profile.  This
+        # basically transplants an sync_abs event into a sync_rel profile
+        if offset_event:
+            prof.append(offset_event)
 
         # correct profile timestamps
-        for row in prof:
+        _shift(prof, -t_min)
+        _shift(prof, -t_off)
 
-            row[TIME] -= t_min
-            row[TIME] -= t_off
-
-          # print(row[EVENT],)
-            # count closing entries
-            if row[EVENT] == 'END':
-                c_end += 1
+        # count closing entries
+        c_end += _count(prof, 'END')
 
         # add profile to global one
-        p_glob += prof
+        p_glob.append(prof)
 
       # if prof:
       #     print('check        %-100s: %s' % (pname, prof[0][TIME:EVENT]))
@@ -668,13 +1029,110 @@ def combine_profiles(profs):
       #     print('WARNING: profile "%s" closed %d times.' % (pname, c_end))
 
     # sort by time and return
-    p_glob = sorted(p_glob[:], key=lambda k: k[TIME])
+    p_glob = _merge(p_glob)
 
   # print('check        %-100s: %s' % ('t_min', p_glob[0][TIME]))
   # print('check        %-100s: %s' % ('t_max', p_glob[-1][TIME]))
     return p_glob, accuracy
 
 
+# ------------------------------------------------------------------------------
+#
+def _correct(prof, t_rel, offset_event, t_min, t_off):
+
+    # yield time corrected copies of the events of a profile, starting with the
+    # transplanted sync event (if any)
+    if offset_event:
+        row       = list(offset_event)
+        row[TIME] = (row[TIME] - t_min) - t_off
+        yield row
+
+    for row in prof:
+        row       = list(row)
+        row[TIME] = ((row[TIME] + t_rel) - t_min) - t_off
+        yield row
+
+
+def _reorder(rows, window):
+
+    # yield the rows sorted by time, assuming that no row is preceeded by rows
+    # which are more than `window` seconds younger.  Rows are sorted in batches
+    # (which is cheap for almost sorted rows), and all rows which are older
+    # than the youngest row of the batch by more than `window` are released.
+    # Equal time stamps retain their order.
+    pending = list()
+    limit   = _REORDER_BATCH
+
+    for row in rows:
+
+        pending.append(row)
+
+        if len(pending) < limit:
+            continue
+
+        pending.sort(key=_time_key)
+        t_cut = pending[-1][TIME] - window
+        idx   = bisect.bisect_left([row[TIME] for row in pending], t_cut)
+
+        for row in pending[:idx]:
+            yield row
+
+        pending = pending[idx:]
+        limit   = max(_REORDER_BATCH, 2 * len(pending))
+
+    pending.sort(key=_time_key)
+    for row in pending:
+        yield row
+
+
+# ------------------------------------------------------------------------------
+#
+def merge_profiles(profs, syncs=None, window=_MERGE_WINDOW):
+    """
+    A streaming version of `combine_profiles`: return an iterator over the
+    time corrected events of all profiles, ordered by time.  The time
+    corrections are applied lazily on copies of the events (the given profiles
+    are not changed), and the profiles are merged with O(log k) cost per event
+    (for `k` profiles), without materializing the combined profile.
+
+    Events within a single profile are expected to be ordered by time, up to
+    a reorder window of `window` seconds: an event which is preceeded by events
+    with time stamps larger than its own by more than `window` is yielded out of
+    order.  For large values of `window`, each profile is effectively sorted in
+    memory before merging.
+
+    `profs` maps profile names to iterables of events (e.g., the return value of
+    `read_profiles`).  The sync events of the profiles are taken from `syncs`,
+    which maps profile names to dicts of the form
+
+        {'abs': [sync_abs events], 'rel': [sync_rel events]}
+
+    If `syncs` is not given, it is obtained from `read_profiles`, or the
+    profiles are scanned for sync events - in that case, they must be iterable
+    twice.
+    """
+
+    if syncs is None:
+        syncs = _collect_syncs(profs)
+    else:
+        syncs = {pname: {'abs': list(val['abs']), 'rel': list(val['rel'])}
+                 for pname, val in syncs.items()}
+
+    corr, t_min, _ = _sync_offsets(syncs)
+    iters = list()
+
+    for pname, prof in profs.items():
+
+        if pname not in corr:
+            continue
+
+        t_rel, offset_event, t_off = corr[pname]
+        rows = _correct(prof, t_rel, offset_event, t_min, t_off)
+        iters.append(_reorder(rows, window))
+
+    return heapq.merge(*iters, key=_time_key)
+
+
 # ------------------------------------------------------------------------------
 #
 def clean_profile(profile, sid, state_final=None, state_canceled=None):
@@ -687,8 +1145,16 @@ def clean_profile(profile, sid, state_final=None, state_canceled=None):
         is encountered for the same uid
       - assignes the session uid to all events without uid
       - makes sure that state transitions have an `ename` set to `state`
+
+    If the profile is a `ProfileColumns` instance, the same is done with array
+    operations, and a new `ProfileColumns` instance is returned.  The events
+    then remain in the order of the (time sorted) profile, also for equal time
+    stamps.
     """
 
+    if isinstance(profile, ProfileColumns):
+        return _clean_columns(profile, sid, state_final, state_canceled)
+
     entities = dict()  # things which have a uid
 
     if not state_final:
@@ -767,6 +1233,100 @@ def clean_profile(profile, sid, state_final=None, state_canceled=None):
     return ret
 
 
+# ------------------------------------------------------------------------------
+#
+def _clean_columns(prof, sid, state_final, state_canceled):
+
+    # `clean_profile` for columnar profiles.  Duplicate state transitions are
+    # found as repeated (uid, state) pairs.  A final state other than
+    # `state_canceled` allows a later `state_canceled` transition of the same
+    # uid, so those are found as repeated (uid, segment) pairs, where segments
+    # are separated by final states.
+
+    np = prof._np                                        # pylint: disable=W0212
+
+    if not state_final:
+        state_final = []
+    elif not isinstance(state_final, list):
+        state_final = [state_final]
+
+    if np.any(np.diff(prof.time) < 0):
+        prof = prof.sort()
+
+    symbols = prof.symbols
+    codes   = prof.codes
+    n       = len(prof)
+
+    # events without uid belong to the session.  We derive entity types from
+    # the uids, once per distinct uid.
+    uids   = codes[UID].copy()
+    c_uids = np.unique(uids)
+    c_ent  = dict()
+    for c_uid in c_uids:
+        uid = symbols.strings[c_uid]
+        if uid: c_ent[c_uid] = symbols.encode(uid.split('.',1)[0])
+        else  : c_ent[c_uid] = symbols.encode('session')
+
+    lut = np.zeros(len(symbols.strings), dtype=np.int32)
+    lut[list(c_ent.keys())] = list(c_ent.values())
+    entities = lut[codes[UID]]
+
+    for c_uid in c_uids:
+        if not symbols.strings[c_uid]:
+            uids[codes[UID] == c_uid] = symbols.encode(sid)
+
+    # state transitions
+    events  = codes[EVENT].copy()
+    states  = codes[STATE]
+    advance = events == prof.code('advance')
+    keep    = np.ones(n, dtype=bool)
+
+    if np.any(advance):
+
+        events[advance] = symbols.encode('state')
+
+        idx = np.flatnonzero(advance)
+        assert(np.all(states[idx] != prof.code(''))), 'cannot advance w/o state'
+
+        # keep the first transition per (uid, state) pair
+        pairs    = (uids[idx].astype(np.int64) << 32) | states[idx]
+        _, first = np.unique(pairs, return_index=True)
+        keep_adv = np.zeros(len(idx), dtype=bool)
+        keep_adv[first] = True
+
+        c_canceled = prof.code(state_canceled) if state_canceled else -1
+        c_final    = [prof.code(state) for state in state_final
+                                       if  state != state_canceled]
+
+        is_canceled = states[idx] == c_canceled
+        is_final    = np.isin(states[idx], c_final)
+
+        if np.any(is_canceled) and np.any(is_final):
+
+            # order the relevant transitions by uid (stable, so by time within
+            # each uid), and count the final states to get segment numbers
+            sel     = np.flatnonzero(is_canceled | is_final)
+            order   = sel[np.argsort(uids[idx][sel], kind='mergesort')]
+            segment = np.cumsum(is_final[order])
+
+            canceled = order[is_canceled[order]]
+            segs     = segment[is_canceled[order]]
+            pairs    = (uids[idx][canceled].astype(np.int64) << 32) | segs
+            _, first = np.unique(pairs, return_index=True)
+
+            keep_adv[canceled]        = False
+            keep_adv[canceled[first]] = True
+
+        keep[idx] = keep_adv
+
+    new_codes = dict(codes)
+    new_codes[UID]    = uids
+    new_codes[ENTITY] = entities
+    new_codes[EVENT]  = events
+
+    return ProfileColumns(prof.time, new_codes, symbols).select(keep)
+
+
 # ------------------------------------------------------------------------------
 #
 def event_to_label(event):
@@ -0,0 +1,470 @@
+
+import os
+import csv
+import time
+import atexit
+import random
+import struct
+import weakref
+
+import threading as mt
+
+
+# ------------------------------------------------------------------------------
+#
+# Binary profile format
+#
+# A binary profile (`*.bprof`) is a sequence of chunks, each written with
+# a single `write()` call by one profile writer:
+#
+#     chunk : magic (4 bytes), writer id (uint64), payload length (uint32)
+#
+# The payload is a sequence of records.  Each record starts with a one byte
+# tag:
+#
+#     'S'   : symbol id (uint32), length (uint32), utf-8 encoded string
+#     'E'   : time (float64), event, comp, tid, uid, state, msg (uint32 each)
+#
+# All strings in event records are represented by symbol ids, which are
+# defined once per writer (id `0` is the empty string).  Symbols are always
+# written before (or in the same chunk as) the events which use them.  Several
+# writers (e.g. forked processes) can append to the same file: symbol tables
+# are kept per writer id.
+#
+# All values are little endian.
+#
+BPROF_MAGIC  = b'RUPB'
+BPROF_EXT    = 'bprof'
+
+_CHUNK       = struct.Struct('<4sQI')
+_SYMBOL      = struct.Struct('<cII')
+_EVENT       = struct.Struct('<cdIIIIII')
+
+_TAG_SYMBOL  = b'S'
+_TAG_EVENT   = b'E'
+
+_FLUSH_TIME  = 1.0            # seconds between background flushes
+_FLUSH_SIZE  = 1024 * 1024    # per-thread buffer size triggering a flush
+
+
+# ------------------------------------------------------------------------------
+#
+class _Flusher(object):
+    '''
+    One background thread per process flushes all binary profile writers.  The
+    writers are only weakly referenced, so that writers which are not closed
+    explicitly can still be collected (and are then closed by `__del__`).
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self):
+
+        self._lock    = mt.Lock()
+        self._writers = weakref.WeakSet()
+        self._pid     = None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def register(self, writer):
+
+        with self._lock:
+
+            # the thread does not survive a fork
+            if self._pid != os.getpid():
+                self._pid     = os.getpid()
+                self._writers = weakref.WeakSet()
+                thread        = mt.Thread(target=self._work, args=[self._pid])
+                thread.daemon = True
+                thread.start()
+
+            self._writers.add(writer)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def unregister(self, writer):
+
+        with self._lock:
+            self._writers.discard(writer)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _work(self, pid):
+
+        while self._pid == pid:
+
+            now  = time.time()
+            wait = _FLUSH_TIME
+
+            with self._lock:
+                writers = list(self._writers)
+
+            for writer in writers:
+                if writer._t_flush <= now:                # pylint: disable=W0212
+                    writer._t_flush = now + writer._flush_time
+                    try:
+                        writer.flush()
+                    except Exception:
+                        pass
+                wait = min(wait, writer._t_flush - now)   # pylint: disable=W0212
+
+            # do not keep writers alive while waiting
+            writers = None
+            writer  = None
+
+            time.sleep(max(wait, 0.01))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            writers = list(self._writers)
+
+        for writer in writers:
+            try:
+                writer.flush()
+            except Exception:
+                pass
+
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush)
+
+
+# ------------------------------------------------------------------------------
+#
+class BinaryWriter(object):
+    '''
+    Profile writer for the binary format.  Events are packed into fixed-width
+    records and appended to a per-thread buffer, which is written to disk in
+    bulk by a background thread (shared by all writers of the process) every
+    `flush_time` seconds, on `flush()`, or when it grows too large.  Strings
+    are interned: each distinct string is written only once.
+
+    Writers should be closed explicitly, but are also closed when they are
+    garbage collected.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, path, flush_time=_FLUSH_TIME, flush_size=_FLUSH_SIZE):
+
+        self._path       = path
+        self._flush_time = flush_time
+        self._flush_size = flush_size
+        self._pid        = None
+        self._fd         = None
+
+        self._init()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _init(self):
+
+        # (re)initialize all state - this is also used after `fork()`, where
+        # the parent's buffers and symbols must not be written again
+        if self._fd is not None:
+            os.close(self._fd)
+
+        self._pid     = os.getpid()
+        self._wid     = (self._pid << 32) | random.getrandbits(32)
+        self._fd      = os.open(self._path,
+                                os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._lock    = mt.Lock()        # protects symbol table
+        self._flock   = mt.Lock()        # serializes flushes, protects fd
+        self._syms    = {'': 0}          # interned strings
+        self._sym_buf = bytearray()      # symbol records not yet written
+        self._bufs    = list()           # [thread, event buffer] of all threads
+        self._tls     = mt.local()       # event buffer of this thread
+        self._t_flush = time.time() + self._flush_time   # next flush
+
+        if self._flush_time:
+            _flusher.register(self)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _intern(self, val):
+
+        if not isinstance(val, str):
+            val = str(val)
+
+        sid = self._syms.get(val)
+        if sid is not None:
+            return sid
+
+        with self._lock:
+
+            sid = self._syms.get(val)
+            if sid is None:
+                sid  = len(self._syms)
+                data = val.encode('utf-8')
+                self._sym_buf += _SYMBOL.pack(_TAG_SYMBOL, sid, len(data))
+                self._sym_buf += data
+                self._syms[val] = sid
+
+        return sid
+
+
+    # --------------------------------------------------------------------------
+    #
+    def write(self, ts, event, comp, tid, uid, state, msg):
+
+        if self._pid != os.getpid():
+            self._init()
+
+        try:
+            buf = self._tls.buf
+        except AttributeError:
+            buf = self._tls.buf = bytearray()
+            with self._lock:
+                self._bufs.append([mt.current_thread(), buf])
+
+        # fast path: all strings are known
+        syms = self._syms
+        try:
+            rec = _EVENT.pack(_TAG_EVENT, ts, syms[event], syms[comp],
+                              syms[tid], syms[uid], syms[state], syms[msg])
+        except (KeyError, TypeError):
+            intern = self._intern
+            rec    = _EVENT.pack(_TAG_EVENT, ts, intern(event), intern(comp),
+                                 intern(tid), intern(uid), intern(state),
+                                 intern(msg))
+        buf += rec
+
+        if len(buf) > self._flush_size:
+            self.flush()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+
+        if self._pid != os.getpid():
+            return
+
+        with self._flock:
+            self._flush()
+
+
+    def _flush(self):
+
+        # caller holds `self._flock`
+        if self._fd is None:
+            return
+
+        # collect events before symbols: all symbols used by the collected
+        # events are then guaranteed to be collected, too.  Owner threads
+        # may append to their buffers concurrently, so we only remove what
+        # we copied.
+        events = list()
+        with self._lock:
+            bufs = list(self._bufs)
+
+        for _, buf in bufs:
+            data = bytes(buf)
+            del buf[:len(data)]
+            events.append(data)
+
+        # drop the (emptied) buffers of threads which terminated
+        with self._lock:
+            self._bufs = [[thread, buf] for thread, buf in self._bufs
+                                        if buf or thread.is_alive()]
+
+        with self._lock:
+            syms = bytes(self._sym_buf)
+            del self._sym_buf[:]
+
+        payload = syms + b''.join(events)
+        if not payload:
+            return
+
+        os.write(self._fd, _CHUNK.pack(BPROF_MAGIC, self._wid,
+                                       len(payload)) + payload)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def fsync(self):
+
+        with self._flock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        _flusher.unregister(self)
+
+        with self._flock:
+
+            if self._fd is None:
+                return
+
+            if self._pid == os.getpid():
+                self._flush()
+
+            os.close(self._fd)
+            self._fd = None
+
+
+    def __del__(self):
+
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# ------------------------------------------------------------------------------
+#
+def read_bprof(fname, strings=None):
+    '''
+    Read a binary profile and yield its events as lists of the form
+
+        [time, event, comp, tid, uid, state, msg]
+
+    with `time` as float.  A truncated chunk at the end of the file (e.g., from
+    a process which died while writing) is ignored.
+
+    All strings of a writer are shared between the rows.  If a dict `strings`
+    is given, it is used to also share the strings with other profiles.
+    '''
+
+    if strings is None:
+        strings = dict()
+
+    with open(fname, 'rb') as fin:
+        data = fin.read()
+
+    symbols = dict()   # symbol tables per writer id
+
+    for wid, start, end in _bprof_chunks(data, fname):
+        for row in _bprof_rows(data, start, end, symbols, wid, strings, fname):
+            yield row
+
+
+# ------------------------------------------------------------------------------
+#
+def _bprof_chunks(data, fname):
+
+    # yield writer id, start and end offset of the payload of all complete
+    # chunks in `data`
+    size = len(data)
+    off  = 0
+
+    while off + _CHUNK.size <= size:
+
+        magic, wid, length = _CHUNK.unpack_from(data, off)
+        if magic != BPROF_MAGIC:
+            raise ValueError('invalid binary profile %s (offset %d)'
+                             % (fname, off))
+
+        off += _CHUNK.size
+        end  = off + length
+        if end > size:
+            break
+
+        yield wid, off, end
+        off = end
+
+
+# ------------------------------------------------------------------------------
+#
+def _bprof_rows(data, off, end, symbols, wid, strings, fname):
+
+    # yield the events of a chunk payload, and add its symbols to the symbol
+    # table of the writer
+    if wid not in symbols:
+        symbols[wid] = {0: ''}
+    syms = symbols[wid]
+
+    while off < end:
+
+        tag = data[off:off + 1]
+
+        if tag == _TAG_EVENT:
+            _, ts, e, c, t, u, s, m = _EVENT.unpack_from(data, off)
+            off += _EVENT.size
+            yield [ts, syms[e], syms[c], syms[t], syms[u], syms[s], syms[m]]
+
+        elif tag == _TAG_SYMBOL:
+            _, sid, slen = _SYMBOL.unpack_from(data, off)
+            off += _SYMBOL.size
+            sym       = data[off:off + slen].decode('utf-8')
+            syms[sid] = strings.setdefault(sym, sym)
+            off += slen
+
+        else:
+            raise ValueError('invalid record in %s (offset %d)'
+                             % (fname, off))
+
+
+# ------------------------------------------------------------------------------
+#
+def csv_to_bprof(src, tgt=None):
+    '''
+    Convert a CSV profile into the binary profile format.  The target file name
+    defaults to the source name with the extension replaced by `.bprof`.  An
+    existing target file is overwritten.  Return the target file name.
+    '''
+
+    if not tgt:
+        tgt = '%s.%s' % (os.path.splitext(src)[0], BPROF_EXT)
+
+    if os.path.exists(tgt):
+        os.unlink(tgt)
+
+    writer = BinaryWriter(tgt, flush_time=0)
+
+    try:
+        with open(src, 'r') as fin:
+            for row in csv.reader(fin):
+
+                if not row or row[0].startswith('#'):
+                    continue
+
+                row.extend([''] * (7 - len(row)))
+                writer.write(float(row[0]), *row[1:7])
+    finally:
+        writer.close()
+
+    return tgt
+
+
+# ------------------------------------------------------------------------------
+#
+def bprof_to_csv(src, tgt=None):
+    '''
+    Convert a binary profile into the CSV profile format.  The target file name
+    defaults to the source name with the extension replaced by `.prof`.  Return
+    the target file name.
+    '''
+
+    from .profile import Profiler
+
+    if not tgt:
+        tgt = '%s.prof' % os.path.splitext(src)[0]
+
+    with open(tgt, 'w') as fout:
+
+        fout.write('#%s\n' % ','.join(Profiler.fields))
+        for row in read_bprof(src):
+            fout.write('%.7f,%s,%s,%s,%s,%s,%s\n' % tuple(row))
+
+    return tgt
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,205 @@
+
+import os
+import sys
+import array
+import hashlib
+import msgpack
+
+from .misc            import rec_makedir
+from .logger          import Logger
+from .profile         import read_profiles, combine_profiles, clean_profile
+from .profile         import TIME, PROF_KEY_MAX
+from .profile_filter  import ProfileFilter
+from .profile_columns import ProfileColumns, ProfileSymbols, _import_numpy
+
+
+# ------------------------------------------------------------------------------
+#
+# Cache of combined and cleaned session profiles.  A cache file contains the
+# fingerprint of the profiles it was created from (file names, sizes and
+# modification times), the accuracy of the time sync, and the profile in
+# columnar form: a symbol table, the time stamps as float64 array, and the
+# symbol codes of all other fields as uint32 array.
+#
+_CACHE_VERSION = 1
+_FIELDS        = PROF_KEY_MAX - 1         # number of string fields per event
+
+
+# ------------------------------------------------------------------------------
+#
+def _cache_name(cache_dir, profiles, sid, efilter, state_final,
+                state_canceled, columnar):
+
+    # the name of the cache file depends on the parameters, but not on the
+    # state of the files - a changed file will thus replace the cache entry.
+    # Columnar profiles are cached separately, as they can differ in the order
+    # of events with equal time stamps (see `clean_profile`).
+    if efilter:
+        efilter = ProfileFilter.from_dict(efilter)
+
+    key = repr([_CACHE_VERSION, sys.byteorder, sid, efilter, state_final,
+                state_canceled, bool(columnar),
+                [os.path.abspath(p) for p in profiles]])
+
+    return os.path.join(cache_dir, '%s.msgpack'
+                        % hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def _fingerprint(profiles):
+
+    ret = list()
+    for prof in profiles:
+        st = os.stat(prof)
+        ret.append([os.path.abspath(prof), st.st_size, st.st_mtime_ns])
+
+    return ret
+
+
+# ------------------------------------------------------------------------------
+#
+def _encode(profile, accuracy, fingerprint):
+
+    if isinstance(profile, ProfileColumns):
+
+        # the columns are stored as they are, as one row-major code table
+        np      = _import_numpy()
+        strings = profile.symbols.strings
+        times   = profile.time.astype(np.float64).tobytes()
+        codes   = np.stack([profile.codes[field]
+                            for field in range(1, PROF_KEY_MAX)], axis=1)
+        codes   = codes.astype(np.uint32).tobytes()
+
+    else:
+        symbols = ProfileSymbols()
+        encode  = symbols.encode
+        strings = symbols.strings
+        times   = array.array('d', [row[TIME] for row in profile]).tobytes()
+        codes   = array.array('I', [encode(val) for row in profile
+                                    for val in row[1:PROF_KEY_MAX]]).tobytes()
+
+    return msgpack.packb({'version'    : _CACHE_VERSION,
+                          'fingerprint': fingerprint,
+                          'accuracy'   : accuracy,
+                          'symbols'    : strings,
+                          'time'       : times,
+                          'codes'      : codes},
+                         use_bin_type=True)
+
+
+def _decode(data, columnar):
+
+    symbols = ProfileSymbols()
+    for string in data['symbols']:
+        symbols.encode(string)
+
+    if columnar:
+
+        np    = _import_numpy()
+        time  = np.frombuffer(data['time'], dtype=np.float64).copy()
+        table = np.frombuffer(data['codes'], dtype=np.uint32)
+        table = table.astype(np.int32).reshape(len(time), _FIELDS)
+        codes = {field: np.ascontiguousarray(table[:, field - 1])
+                 for field in range(1, PROF_KEY_MAX)}
+
+        return ProfileColumns(time, codes, symbols)
+
+    times = array.array('d')
+    codes = array.array('I')
+    times.frombytes(data['time'])
+    codes.frombytes(data['codes'])
+
+    strings = symbols.strings
+    vals    = [strings[code] for code in codes]
+
+    return [[t] + vals[idx:idx + _FIELDS]
+            for t, idx in zip(times, range(0, len(vals), _FIELDS))]
+
+
+# ------------------------------------------------------------------------------
+#
+def read_session_profile(profiles, sid, efilter=None, state_final=None,
+                         state_canceled=None, columnar=False, workers=None,
+                         cache=False):
+    '''
+    Read, combine and clean the given profiles of a session - this is the same
+    as
+
+        profs        = read_profiles(profiles, sid, efilter)
+        profile, acc = combine_profiles(profs)
+        profile      = clean_profile(profile, sid, state_final, state_canceled)
+
+    and returns `profile, acc`.  If `columnar` is set, the profiles are read,
+    combined and cleaned in columnar form, and the profile is returned as
+    `ProfileColumns` instance (this requires numpy).  `workers` is passed on to
+    `read_profiles`.
+
+    If `cache` is set, the result is cached on disk, and later calls for the
+    same profiles return the cached result, unless any of the profile files
+    changed in size or modification time.  `cache` can be `True` to store the
+    cache next to the profiles (in `.profile_cache/` in the directory which
+    contains all profiles), or the name of a directory to use instead.  Cache
+    entries are not evicted, but are removed along with the session directory
+    when using the default location.  Failing to write the cache is logged,
+    but is otherwise ignored.
+    '''
+
+    profiles = list(profiles)
+    fname    = None
+
+    if cache and profiles:
+
+        if cache is True:
+            cache = os.path.join(os.path.commonpath(
+                                    [os.path.dirname(os.path.abspath(prof))
+                                     for prof in profiles]), '.profile_cache')
+
+        fname  = _cache_name(cache, profiles, sid, efilter, state_final,
+                             state_canceled, columnar)
+        fprint = _fingerprint(profiles)
+
+        try:
+            with open(fname, 'rb') as fin:
+                data = msgpack.unpackb(fin.read(), raw=False)
+
+            if  data['version']     == _CACHE_VERSION and \
+                data['fingerprint'] == fprint:
+                return _decode(data, columnar), data['accuracy']
+
+        except Exception:
+            # no (valid) cache entry
+            pass
+
+    profs        = read_profiles(profiles, sid, efilter, columnar=columnar,
+                                 workers=workers)
+    profile, acc = combine_profiles(profs)
+    profile      = clean_profile(profile, sid, state_final, state_canceled)
+
+    if fname:
+
+        # only cache the result if the profiles did not change while reading
+        if fprint == _fingerprint(profiles):
+
+            data = _encode(profile, acc, fprint)
+            tmp  = '%s.%d.tmp' % (fname, os.getpid())
+
+            # the cache is best effort (the location may be read-only or out
+            # of quota)
+            try:
+                rec_makedir(os.path.dirname(fname))
+                with open(tmp, 'wb') as fout:
+                    fout.write(data)
+                os.rename(tmp, fname)
+
+            except OSError as e:
+                Logger('radical.utils.profile_cache').warning(
+                        'cannot write profile cache %s: %s', fname, e)
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    return profile, acc
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,320 @@
+
+# ------------------------------------------------------------------------------
+#
+# Columnar representation of profiles.  This is only available if numpy is
+# installed.
+#
+# NOTE: the field indexes are the same as in `profile.py` (which imports this
+#       module, so we cannot import them from there).
+#
+_TIME         = 0
+_PROF_KEY_MAX = 8
+_STR_FIELDS   = list(range(1, _PROF_KEY_MAX))   # EVENT ... ENTITY
+
+
+# ------------------------------------------------------------------------------
+#
+def _import_numpy():
+
+    try:
+        import numpy
+    except ImportError as e:
+        msg  = " \n\nnumpy is not available -- columnar profiles require "
+        msg += "numpy.\nInstall it with `pip install numpy`.\n"
+        raise ImportError(msg) from e
+
+    return numpy
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileColumns(object):
+    '''
+    A profile (i.e., a list of events) stored as columns: `time` is a float64
+    array, and all other fields (`EVENT`, `COMP`, `TID`, `UID`, `STATE`, `MSG`,
+    `ENTITY`) are int32 arrays of codes into a symbol table.  The symbol table
+    can be shared between profiles, so that codes can be compared across them.
+
+        cols   = ProfileColumns.from_rows(rows)
+        t      = cols.time                      # array of time stamps
+        events = cols.codes[ru.EVENT]           # array of event codes
+        starts = cols.time[events == cols.code('exec_start')]
+
+    Iterating over a `ProfileColumns` instance, or indexing it with an integer,
+    yields rows in the usual list format.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, time, codes, symbols):
+        '''
+        `time` is a float64 array, `codes` a dict of int32 arrays (of the same
+        length) indexed by field, and `symbols` a `ProfileSymbols` instance.
+        '''
+
+        self._np     = _import_numpy()
+        self.time    = time
+        self.codes   = codes
+        self.symbols = symbols
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def from_rows(rows, symbols=None):
+        '''
+        Create a columnar profile from a list of rows.  If `symbols` is given,
+        it is used (and extended) as symbol table.
+        '''
+
+        np = _import_numpy()
+
+        if symbols is None:
+            symbols = ProfileSymbols()
+
+        n     = len(rows)
+        time  = np.fromiter((row[_TIME] for row in rows), np.float64, n)
+        cmap  = symbols.codes
+
+        # encode all string fields in one pass, registering new symbols first
+        # if needed
+        try:
+            flat = [cmap[val] for row in rows for val in row[1:]]
+
+        except KeyError:
+            for row in rows:
+                for val in row[1:]:
+                    if val not in cmap:
+                        symbols.encode(val)
+            flat = [cmap[val] for row in rows for val in row[1:]]
+
+        table = np.array(flat, dtype=np.int32).reshape(n, len(_STR_FIELDS))
+        codes = {field: np.ascontiguousarray(table[:, idx])
+                 for idx, field in enumerate(_STR_FIELDS)}
+
+        return ProfileColumns(time, codes, symbols)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def concat(profs, symbols=None):
+        '''
+        Concatenate a list of columnar profiles which share a symbol table.
+        '''
+
+        np = _import_numpy()
+
+        if not profs:
+            return ProfileColumns.from_rows([], symbols)
+
+        symbols = profs[0].symbols
+        for prof in profs:
+            assert(prof.symbols is symbols), 'symbol tables differ'
+
+        time  = np.concatenate([prof.time for prof in profs])
+        codes = {field: np.concatenate([prof.codes[field] for prof in profs])
+                 for field in _STR_FIELDS}
+
+        return ProfileColumns(time, codes, symbols)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __getstate__(self):
+
+        # the numpy module reference cannot be pickled
+        state = dict(self.__dict__)
+        del state['_np']
+        return state
+
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._np = _import_numpy()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __len__(self):
+
+        return len(self.time)
+
+
+    def __getitem__(self, idx):
+
+        sym = self.symbols.strings
+        row = [None] * _PROF_KEY_MAX
+
+        row[_TIME] = float(self.time[idx])
+        for field in _STR_FIELDS:
+            row[field] = sym[self.codes[field][idx]]
+
+        return row
+
+
+    def __iter__(self):
+
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def recode(self, symbols):
+        '''
+        Return a new columnar profile with the same events, encoded with the
+        given symbol table (which is extended as needed).
+        '''
+
+        np    = self._np
+        remap = np.array([symbols.encode(string)
+                          for string in self.symbols.strings], dtype=np.int32)
+
+        return ProfileColumns(self.time,
+                              {field: remap[codes]
+                                  for field, codes in self.codes.items()},
+                              symbols)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def code(self, string):
+        '''
+        Return the code for the given string, or `-1` if the string is unknown
+        (and thus does not occur in the profile).
+        '''
+
+        return self.symbols.codes.get(string, -1)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def column(self, field):
+        '''
+        Return the given field as array: floats for `TIME`, strings (numpy
+        object array) otherwise.
+        '''
+
+        if field == _TIME:
+            return self.time
+
+        return self.symbols.array()[self.codes[field]]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def mask(self, field, string):
+        '''
+        Return a boolean array selecting the events where `field` equals
+        `string`.
+        '''
+
+        return self.codes[field] == self.code(string)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def select(self, idx):
+        '''
+        Return a new columnar profile with the events selected by `idx`, which
+        can be a boolean mask or an array of indexes.
+        '''
+
+        return ProfileColumns(self.time[idx],
+                              {field: codes[idx]
+                                  for field, codes in self.codes.items()},
+                              self.symbols)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def sort(self):
+        '''
+        Return a new columnar profile with events sorted by time.  The sort is
+        stable, i.e., events with equal time stamps retain their order.
+        '''
+
+        return self.select(self._np.argsort(self.time, kind='mergesort'))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def append(self, row):
+        '''
+        Append a single event row (this copies all columns).
+        '''
+
+        np   = self._np
+        code = self.symbols.encode
+
+        self.time = np.append(self.time, row[_TIME])
+        for field in _STR_FIELDS:
+            self.codes[field] = np.append(self.codes[field],
+                                          np.int32(code(row[field])))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def to_rows(self):
+        '''
+        Return the profile as a list of rows.
+        '''
+
+        return list(self)
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileSymbols(object):
+    '''
+    The symbol table of columnar profiles: `strings` is the list of symbols,
+    `codes` maps symbols to their index in that list.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self):
+
+        self.strings = list()
+        self.codes   = dict()
+        self._array  = None
+
+
+    def __getstate__(self):
+
+        # the decoding array is a cache and is rebuilt on demand
+        return {'strings': self.strings, 'codes': self.codes, '_array': None}
+
+
+    # --------------------------------------------------------------------------
+    #
+    def encode(self, string):
+
+        code = self.codes.get(string)
+
+        if code is None:
+            code = len(self.strings)
+            self.codes[string] = code
+            self.strings.append(string)
+
+        return code
+
+
+    # --------------------------------------------------------------------------
+    #
+    def array(self):
+        '''
+        Return the symbols as numpy object array (for vectorized decoding).
+        '''
+
+        if self._array is None or len(self._array) != len(self.strings):
+            np = _import_numpy()
+            self._array = np.array(self.strings, dtype=object)
+
+        return self._array
+
+
+# ------------------------------------------------------------------------------
+
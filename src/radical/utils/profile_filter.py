@@ -0,0 +1,229 @@
+
+from .misc import as_list
+
+
+# ------------------------------------------------------------------------------
+#
+# Event filters for profiles.  Fields are given by their index in the event
+# rows (`ru.EVENT` etc.).
+#
+
+# number of match results cached per field: the number of distinct values of
+# most fields is small, but uids can be unique per event
+_CACHE_SIZE   = 100000
+
+
+# ------------------------------------------------------------------------------
+#
+class _Matcher(object):
+    '''
+    Match the values of one field against a set of patterns (see
+    `ProfileFilter`).  Match results are cached per value.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, patterns, legacy=False):
+
+        self.exact    = set()
+        self.prefixes = list()
+        self.regexes  = list()
+        self.legacy   = list()
+        self._cache   = dict()
+
+        if legacy:
+            self.legacy = [str(pat) for pat in as_list(patterns)]
+            patterns    = list()
+
+        for pat in as_list(patterns):
+
+            if hasattr(pat, 'search'):
+                self.regexes.append(pat)
+
+            elif pat.endswith('*'):
+                self.prefixes.append(pat[:-1])
+
+            else:
+                self.exact.add(pat)
+
+        self.prefixes = tuple(self.prefixes)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __repr__(self):
+
+        pats  = sorted(self.exact)
+        pats += ['%s*' % prefix for prefix in self.prefixes]
+        pats += ['re:%s:%d' % (regex.pattern, regex.flags)
+                 for regex in self.regexes]
+        pats += ['in:%s' % pat for pat in self.legacy]
+        return repr(pats)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __call__(self, val):
+
+        try:
+            return self._cache[val]
+
+        except KeyError:
+            pass
+
+        if val is None:
+            return False
+
+        ret = val in self.exact                                          or \
+              bool(self.prefixes and val.startswith(self.prefixes))      or \
+              any(regex.search(val) for regex in self.regexes)          or \
+              any(val in pat for pat in self.legacy)
+
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[val] = ret
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileFilter(object):
+    '''
+    A compiled filter for profile events.  `include` and `exclude` are dicts
+    which map fields to lists of patterns:
+
+        pf = ru.ProfileFilter(include={ru.EVENT : ['exec_start', 'exec_stop'],
+                                       ru.UID   : ['task.*']},
+                              exclude={ru.MSG   : [re.compile('^debug')]})
+
+    Patterns are matched against the complete field value.  A pattern ending
+    in `*` matches a prefix, and a compiled regular expression is matched with
+    `search()`.
+
+    An event is kept if it matches at least one pattern for each field in
+    `include`, and if it does not match any pattern in `exclude`.
+
+    Calling the filter with an event row returns `True` if the event is kept.
+    `mask()` returns the result for all events of a `ProfileColumns` instance.
+
+    If `legacy` is set, all patterns are plain strings, and a field matches
+    a pattern if the field value is a *substring* of the pattern (including
+    empty values).  These are the semantics of the dict filters accepted by
+    `read_profiles` (see `from_dict()`).
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, include=None, exclude=None, legacy=False):
+
+        self._include = [(field, _Matcher(pats, legacy))
+                         for field, pats in (include or dict()).items()]
+        self._exclude = [(field, _Matcher(pats, legacy))
+                         for field, pats in (exclude or dict()).items()]
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def from_dict(efilter):
+        '''
+        Convert a dict filter of the form `{field: [pattern, ...]}`, as used by
+        earlier versions of `read_profiles`, into a `ProfileFilter` which
+        excludes the same events.  A `ProfileFilter` is returned as is.
+        '''
+
+        if isinstance(efilter, ProfileFilter):
+            return efilter
+
+        return ProfileFilter(exclude=efilter, legacy=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __repr__(self):
+
+        return 'ProfileFilter(include={%s}, exclude={%s})' % tuple(
+                    ', '.join('%d: %r' % (field, matcher)
+                              for field, matcher in sorted(matchers))
+                    for matchers in [self._include, self._exclude])
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def fields(self):
+        '''
+        The set of fields the filter inspects.
+        '''
+
+        return set([field for field, _ in self._include + self._exclude])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def split(self, fields):
+        '''
+        Return two filters: one for the given fields, and one for all other
+        fields.  Applying both filters (in any order) is equivalent to applying
+        this filter.  `None` is returned in place of an empty filter.
+        '''
+
+        ret = list()
+        for selected in [True, False]:
+
+            pf = ProfileFilter()
+            pf._include = [(f, m) for f, m in self._include
+                                  if (f in fields) == selected]
+            pf._exclude = [(f, m) for f, m in self._exclude
+                                  if (f in fields) == selected]
+
+            if pf._include or pf._exclude:
+                ret.append(pf)
+            else:
+                ret.append(None)
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __call__(self, row):
+
+        for field, matcher in self._include:
+            if not matcher(row[field]):
+                return False
+
+        for field, matcher in self._exclude:
+            if matcher(row[field]):
+                return False
+
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def mask(self, prof):
+        '''
+        Return a boolean array which selects the events of the `ProfileColumns`
+        instance `prof` which pass the filter.  Each symbol is matched only
+        once.
+        '''
+
+        np      = prof._np                                   # pylint: disable=W0212
+        strings = prof.symbols.strings
+        ret     = np.ones(len(prof), dtype=bool)
+
+        for matchers, keep in [(self._include, True), (self._exclude, False)]:
+            for field, matcher in matchers:
+                lut  = np.fromiter((matcher(s) for s in strings), bool,
+                                   len(strings))
+                hits = lut[prof.codes[field]]
+                if keep: ret &=  hits
+                else   : ret &= ~hits
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+
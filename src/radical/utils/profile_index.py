@@ -0,0 +1,159 @@
+
+import bisect
+
+from .profile import TIME, EVENT, UID, STATE, ENTITY
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileIndex(object):
+    '''
+    Indexes over a (combined) profile, to quickly find the events of an entity,
+    or all events in a time window:
+
+        index  = ru.ProfileIndex(profile)
+        events = index.events(uid='task.000001')
+        states = index.window(t0, t1, event='state')
+        runs   = index.durations('task.000001', 'exec_start', 'exec_stop')
+
+    Events are hashed by `uid`, `entity`, `event` and `state`, and are sorted by
+    time, so that queries cost `O(log n + k)` for `k` results.  All queries
+    return the event rows of the profile (not copies), ordered by time.  The
+    index is not updated when the profile changes.  A `ProfileColumns` profile
+    is indexed as list of rows.
+    '''
+
+    _fields = {'uid'   : UID,
+               'entity': ENTITY,
+               'event' : EVENT,
+               'state' : STATE}
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, profile):
+
+        # `sorted` is stable: events with equal time stamps retain their order
+        self._rows  = sorted(profile, key=lambda row: row[TIME])
+        self._times = [row[TIME] for row in self._rows]
+        self._index = {name: dict() for name in self._fields}
+
+        for name, field in self._fields.items():
+            index = self._index[name]
+            for pos, row in enumerate(self._rows):
+                val = row[field]
+                if val in index: index[val].append(pos)
+                else           : index[val] = [pos]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __len__(self):
+
+        return len(self._rows)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _select(self, lo, hi, criteria):
+
+        # return the positions in [lo, hi) which match all criteria
+        for name in criteria:
+            if name not in self._fields:
+                raise TypeError('invalid query field %s' % name)
+
+        if not criteria:
+            return range(lo, hi)
+
+        # use the smallest index list, and check the other criteria per event
+        cands = list()
+        for name, val in criteria.items():
+            positions = self._index[name].get(val)
+            if not positions:
+                return list()
+            cands.append((len(positions), name, positions))
+
+        _, name, positions = min(cands)
+        checks = [(self._fields[n], v) for n, v in criteria.items()
+                                       if n != name]
+        start  = bisect.bisect_left(positions, lo)
+        stop   = bisect.bisect_left(positions, hi)
+        rows   = self._rows
+
+        return [pos for pos in positions[start:stop]
+                    if all(rows[pos][field] == val for field, val in checks)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def events(self, uid=None, entity=None, event=None, state=None):
+        '''
+        Return all events which match the given `uid`, `entity`, `event` and
+        `state` (criteria which are `None` are ignored).
+        '''
+
+        criteria = {name: val for name, val in [('uid'   , uid   ),
+                                                ('entity', entity),
+                                                ('event' , event ),
+                                                ('state' , state )]
+                              if val is not None}
+
+        return [self._rows[pos]
+                for pos in self._select(0, len(self._rows), criteria)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def window(self, t0=None, t1=None, **criteria):
+        '''
+        Return all events with `t0 <= time <= t1` (open ended if `t0` or `t1` is
+        `None`).  The keyword arguments of `events()` can be used to further
+        select events.
+        '''
+
+        criteria = {k: v for k, v in criteria.items() if v is not None}
+
+        if t0 is None: lo = 0
+        else         : lo = bisect.bisect_left(self._times, t0)
+
+        if t1 is None: hi = len(self._times)
+        else         : hi = bisect.bisect_right(self._times, t1)
+
+        return [self._rows[pos] for pos in self._select(lo, hi, criteria)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def durations(self, uid, ev_a, ev_b):
+        '''
+        Return the list of durations between the events `ev_a` and `ev_b` of
+        the given uid: each `ev_a` is paired with the next `ev_b` (events
+        between such a pair are ignored).  Events are specified either by
+        event name, or as dict of field values, like `{ru.STATE: 'DONE'}`.
+        '''
+
+        def _matcher(ev):
+            if isinstance(ev, dict):
+                items = list(ev.items())
+                return lambda row: all(row[f] == v for f, v in items)
+            return lambda row: row[EVENT] == ev
+
+        match_a = _matcher(ev_a)
+        match_b = _matcher(ev_b)
+        ret     = list()
+        t_a     = None
+
+        for row in self.events(uid=uid):
+
+            if t_a is None:
+                if match_a(row):
+                    t_a = row[TIME]
+
+            elif match_b(row):
+                ret.append(row[TIME] - t_a)
+                t_a = None
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+
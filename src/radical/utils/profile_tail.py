@@ -0,0 +1,169 @@
+
+import io
+import os
+import glob
+
+from .misc           import as_list
+from .profile        import TIME, _time_key
+from .profile        import _read_profile, _split_lines, _sync_offsets, _legacy
+from .profile_bin    import BPROF_EXT, _bprof_chunks, _bprof_rows
+from .profile_filter import ProfileFilter
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileTail(object):
+    '''
+    Follow the profiles of a running session:
+
+        tail = ru.ProfileTail('/path/to/session/**/*.prof', sid=sid)
+        while True:
+            for event in tail.poll():
+                ...
+            time.sleep(1)
+
+    `profiles` is a list of file names or glob patterns, which are evaluated on
+    each `poll()`, so that new profiles are picked up.  The byte offset up to
+    which each file has been parsed is stored, and only newly appended complete
+    lines (or chunks, for binary profiles) are parsed on the next call.  `sid`
+    and `efilter` are used as in `read_profiles`.
+
+    `poll()` returns the new events, with their time stamps corrected by the
+    sync offsets learned so far (see `combine_profiles`), and sorted by time.
+    Events of a profile are held back until it can be synced.  Different from
+    `combine_profiles`, time stamps are not made relative to the session start,
+    as that can still change - it is available as `t_min`.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, profiles, sid=None, efilter=None):
+
+        if efilter:
+            efilter = ProfileFilter.from_dict(efilter)
+
+        self._patterns = as_list(profiles)
+        self._sid      = sid
+        self._efilter  = efilter or None
+        self._legacy   = _legacy()
+        self._strings  = dict()   # interned strings
+        self._files    = dict()   # per file state: offset, bprof symbols
+        self._syncs    = dict()   # sync events per file
+        self._pending  = dict()   # events per file not yet returned
+
+        self.t_min     = None
+        self.accuracy  = 0
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _fnames(self):
+
+        ret = list()
+        for pattern in self._patterns:
+            for fname in sorted(glob.glob(pattern, recursive=True)):
+                if fname not in ret:
+                    ret.append(fname)
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _read(self, fname, state):
+
+        # return the raw rows appended to the file since the last call
+        size = os.path.getsize(fname)
+
+        if size < state['off']:
+            # the file was truncated or replaced: start over
+            state['off']  = 0
+            state['syms'] = dict()
+
+        if size == state['off']:
+            return list()
+
+        with open(fname, 'rb') as fin:
+            fin.seek(state['off'])
+            data = fin.read(size - state['off'])
+
+        if fname.endswith('.%s' % BPROF_EXT):
+
+            rows = list()
+            used = 0
+            for wid, start, end in _bprof_chunks(data, fname):
+                rows.extend(_bprof_rows(data, start, end, state['syms'], wid,
+                                        self._strings, fname))
+                used = end
+
+        else:
+            # only use complete lines
+            used = data.rfind(b'\n') + 1
+            text = data[:used].decode('utf-8')
+            rows = list(_split_lines(io.StringIO(text)))
+
+        state['off'] += used
+
+        return rows
+
+
+    # --------------------------------------------------------------------------
+    #
+    def poll(self):
+        '''
+        Parse all data appended to the profiles since the last call, and return
+        the new events which can be synced.
+        '''
+
+        for fname in self._fnames():
+
+            if fname not in self._files:
+                self._files[fname]   = {'off': 0, 'syms': dict()}
+                self._syncs[fname]   = {'abs': list(), 'rel': list()}
+                self._pending[fname] = list()
+
+            try:
+                raw = self._read(fname, self._files[fname])
+
+            except OSError:
+                # the file may have been removed
+                continue
+
+            if not raw:
+                continue
+
+            rows, sync_abs, sync_rel = _read_profile(fname, self._sid,
+                                                     self._efilter,
+                                                     self._legacy,
+                                                     self._strings, None,
+                                                     reader=iter(raw))
+            # the returned rows are corrected in place: keep the original sync
+            # events
+            self._syncs[fname]['abs'].extend([list(row) for row in sync_abs])
+            self._syncs[fname]['rel'].extend([list(row) for row in sync_rel])
+            self._pending[fname].extend(rows)
+
+        # determine the sync offsets from all sync events seen so far
+        syncs = {fname: {'abs': list(val['abs']), 'rel': list(val['rel'])}
+                 for fname, val in self._syncs.items()}
+        corr, self.t_min, self.accuracy = _sync_offsets(syncs, verbose=False)
+
+        ret = list()
+        for fname, rows in self._pending.items():
+
+            if not rows or fname not in corr:
+                continue
+
+            t_rel, _, t_off = corr[fname]
+            for row in rows:
+                row[TIME] = (row[TIME] + t_rel) - t_off
+
+            ret.extend(rows)
+            self._pending[fname] = list()
+
+        ret.sort(key=_time_key)
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+
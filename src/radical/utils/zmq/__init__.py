@@ -4,9 +4,11 @@ __copyright__ = "Copyright 2018"
 __license__   = "GPL"
 
 
-from .bridge import Bridge
-from .queue  import Queue,  Putter,    Getter
-from .pubsub import PubSub, Publisher, Subscriber
+from .context import get_context, close_context
+from .bridge  import Bridge
+from .queue   import Queue,  Putter,    Getter
+from .pubsub  import PubSub, Publisher, Subscriber
+from .aio     import AsyncPutter, AsyncGetter, AsyncSubscriber
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,383 @@
+
+import os
+import zmq
+import queue
+import asyncio
+import msgpack
+
+import zmq.asyncio
+
+from collections import deque
+
+from .bridge  import MsgTrace, select_endpoint
+from .context import get_context
+from .pubsub  import Subscriber
+
+from ..ids    import generate_id, ID_CUSTOM
+from ..misc   import as_string, as_bytes, as_list
+from ..logger import Logger
+
+
+# ------------------------------------------------------------------------------
+#
+# asyncio versions of the queue and pubsub endpoints.  They use the same wire
+# format as their threaded counterparts and can be mixed with those on the same
+# bridge.  The sockets are created on an asyncio shadow of the shared process
+# context, so no additional IO threads are spawned, and no thread is used per
+# endpoint: any number of endpoints can be served by a single event loop.
+#
+_LINGER_TIMEOUT  =   250  # ms to linger after close
+_HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
+_PUT_HWM         =     0  # number of messages a putter buffers before blocking
+
+
+def _get_context():
+
+    return zmq.asyncio.Context.shadow(get_context().underlying)
+
+
+# ------------------------------------------------------------------------------
+#
+class AsyncPutter(object):
+    '''
+    Push messages into a queue bridge:
+
+        putter = AsyncPutter(channel, url)
+        await putter.put(msg)
+
+    See `Putter` for the meaning of `hwm`.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, channel, url, log=None, hwm=_PUT_HWM):
+
+        self._channel  = channel
+        self._url      = url
+        self._uid      = generate_id('%s.put.%s' % (self._channel,
+                                                   '%(counter)04d'), ID_CUSTOM)
+        self._log      = log
+
+        if not self._log:
+            self._log  = Logger(name=self._uid, ns='radical.utils')
+
+        self._trace    = MsgTrace(self._log, self._channel)
+
+        self._addr     = select_endpoint(self._url)
+        self._log.info('connect put to %s: %s', self._channel, self._addr)
+
+        self._ctx      = _get_context()
+        self._q        = self._ctx.socket(zmq.PUSH)
+        self._q.linger = _LINGER_TIMEOUT
+        self._q.hwm    = hwm
+        self._q.connect(self._addr)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __str__(self):
+        return 'AsyncPutter(%s @ %s)'  % (self.channel, self._url)
+
+    @property
+    def name(self):
+        return self._uid
+
+    @property
+    def uid(self):
+        return self._uid
+
+    @property
+    def channel(self):
+        return self._channel
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def put(self, msg, timeout=None):  # timeout in ms
+        '''
+        Send a message (or a list of messages) to the bridge.  Raise
+        `queue.Full` if the bridge did not accept it within `timeout` ms.
+        '''
+
+        self._trace('->', msg)
+        data = msgpack.packb(msg)
+
+        if timeout is None:
+            await self._q.send(data)
+            return
+
+        if await self._q.poll(timeout=timeout, flags=zmq.POLLOUT):
+            try:
+                await self._q.send(data, flags=zmq.NOBLOCK)
+                return
+            except zmq.Again:
+                pass
+
+        raise queue.Full('%s: bridge does not accept messages' % self._uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        self._q.close()
+
+
+# ------------------------------------------------------------------------------
+#
+class AsyncGetter(object):
+    '''
+    Request messages from a queue bridge:
+
+        getter = AsyncGetter(channel, url)
+        msgs   = await getter.get_bulk()
+
+    The getter keeps `prefetch` requests outstanding with the bridge (see
+    `Getter`), and serves messages from a local buffer.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, channel, url, log=None, prefetch=1):
+
+        self._channel  = channel
+        self._url      = url
+        self._prefetch = max(1, prefetch)
+        self._uid      = generate_id('%s.get.%s' % (self._channel,
+                                                   '%(counter)04d'), ID_CUSTOM)
+        self._log      = log
+
+        if not self._log:
+            self._log  = Logger(name=self._uid, ns='radical.utils')
+
+        self._trace    = MsgTrace(self._log, self._channel)
+
+        self._addr     = select_endpoint(self._url)
+        self._log.info('connect get to %s: %s', self._channel, self._addr)
+
+        self._lock     = None       # created on first use, in the event loop
+        self._credits  = 0          # number of requests in flight
+        self._buf      = deque()    # received messages
+        self._ctx      = _get_context()
+        self._q        = self._ctx.socket(zmq.DEALER)
+        self._q.linger = _LINGER_TIMEOUT
+        self._q.hwm    = _HIGH_WATER_MARK
+        self._q.connect(self._addr)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __str__(self):
+        return 'AsyncGetter(%s @ %s)'  % (self.channel, self._url)
+
+    @property
+    def name(self):
+        return self._uid
+
+    @property
+    def uid(self):
+        return self._uid
+
+    @property
+    def channel(self):
+        return self._channel
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def _request(self):
+
+        # top up the requests in flight.  The empty delimiter frame lets the
+        # DEALER talk to the bridge's REP socket.
+        req = as_bytes('request %s' % os.getpid())
+        while self._credits < self._prefetch:
+            await self._q.send_multipart([b'', req])
+            self._credits += 1
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def _fetch(self, timeout):
+
+        # wait up to `timeout` ms for replies, and buffer all available bulks
+        await self._request()
+
+        if not await self._q.poll(timeout=timeout, flags=zmq.POLLIN):
+            return
+
+        while True:
+
+            try:
+                frames = await self._q.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                break
+
+            msgs = msgpack.unpackb(frames[-1])
+            self._credits -= 1
+            self._buf.extend(as_list(msgs))
+            self._trace('<-', msgs)
+
+        await self._request()
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def get_bulk(self, max_n=None, timeout=None):  # timeout in ms
+        '''
+        Return a list of up to `max_n` messages (all available messages if
+        `max_n` is `None`).  If no messages are available, wait up to `timeout`
+        milliseconds for messages to arrive (forever if `timeout` is `None`),
+        and return an empty list if none arrived in that time.
+        '''
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+
+            if not self._buf:
+                await self._fetch(timeout)
+
+            if max_n is None: n = len(self._buf)
+            else            : n = min(max_n, len(self._buf))
+
+            return [as_string(self._buf.popleft()) for _ in range(n)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def get(self):
+
+        return await self.get_bulk()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+        '''
+        Close the connection to the bridge.  Messages which have been requested
+        from the bridge but not yet been consumed are lost.
+        '''
+
+        self._q.close()
+        self._buf.clear()
+        self._credits = 0
+
+
+# ------------------------------------------------------------------------------
+#
+class AsyncSubscriber(object):
+    '''
+    Receive messages from a pubsub bridge:
+
+        sub = AsyncSubscriber(channel, url, topic='state')
+        async for topic, msg in sub:
+            ...
+
+    Each subscriber owns its socket - no listener thread is used.  Message
+    batches sent by a batching `Publisher` are delivered as individual
+    messages.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, channel, url, topic=None, log=None):
+
+        self._channel  = channel
+        self._url      = url
+        self._uid      = generate_id('%s.sub.%s' % (self._channel,
+                                                   '%(counter)04d'), ID_CUSTOM)
+        self._log      = log
+
+        if not self._log:
+            self._log  = Logger(name=self._uid, ns='radical.utils.zmq')
+
+        self._trace    = MsgTrace(self._log, self._channel)
+
+        self._addr     = select_endpoint(self._url)
+        self._log.info('connect sub to %s: %s', self._channel, self._addr)
+
+        self._buf      = deque()    # received [topic, msg] pairs
+        self._ctx      = _get_context()
+        self._q        = self._ctx.socket(zmq.SUB)
+        self._q.linger = _LINGER_TIMEOUT
+        self._q.hwm    = _HIGH_WATER_MARK
+        self._q.connect(self._addr)
+
+        for t in as_list(topic):
+            self.subscribe(t)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def name(self):
+        return self._uid
+
+    @property
+    def uid(self):
+        return self._uid
+
+    @property
+    def channel(self):
+        return self._channel
+
+
+    # --------------------------------------------------------------------------
+    #
+    def subscribe(self, topic):
+
+        topic = topic.replace(' ', '_')
+        self._trace('~~', topic)
+        self._q.setsockopt(zmq.SUBSCRIBE, as_bytes(topic))
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def get(self, timeout=None):  # timeout in ms
+        '''
+        Return the next message as `[topic, msg]`, or `[None, None]` if no
+        message arrived within `timeout` milliseconds.
+        '''
+
+        if not self._buf:
+
+            if timeout is not None:
+                if not await self._q.poll(timeout=timeout, flags=zmq.POLLIN):
+                    return [None, None]
+
+            frames      = await self._q.recv_multipart(copy=False)
+            topic, data = Subscriber._parse(frames)
+            msgs        = msgpack.unpackb(data)
+
+            self._trace('<-', msgs)
+
+            for msg in as_list(msgs):
+                self._buf.append([topic, as_string(msg)])
+
+        return self._buf.popleft()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+
+        if self._q.closed:
+            raise StopAsyncIteration
+
+        return await self.get()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        self._q.close()
+        self._buf.clear()
+
+
+# ------------------------------------------------------------------------------
+
@@ -1,13 +1,22 @@
 
+import os
 import zmq
+import time
 import errno
-import msgpack
+import socket
+import tempfile
+import netifaces
 
 import threading as mt
 
-from ..logger    import Logger
+from ..url       import Url
+from ..misc      import get_env_ns as ru_get_env_ns
+from ..misc      import get_hostip, as_string
+from ..logger    import Logger, DEBUG
 from ..profile   import Profiler
 
+from .context    import get_context
+
 
 # --------------------------------------------------------------------------
 #
@@ -43,6 +52,137 @@ def no_intr(f, *args, **kwargs):
             raise          # some other error condition, raise it
 
 
+# ------------------------------------------------------------------------------
+#
+# Bridges always listen on TCP endpoints, and by default also on IPC and INPROC
+# endpoints.  Peers on the same host or in the same process use those faster
+# transports if available, and fall back to TCP otherwise.  The IPC and INPROC
+# endpoints are derived from the TCP port of the bridge socket, so that peers
+# only need to know the TCP address (which is what the bridges publish).
+#
+TRANSPORTS = ['tcp', 'ipc', 'inproc']
+
+_inproc_endpoints = dict()  # tcp port: (pid, context) owning inproc endpoint
+_local_hosts      = None    # names and addresses of the local host
+
+
+def _ipc_path(port):
+    return '%s/radical.zmq.%d.ipc' % (tempfile.gettempdir(), port)
+
+
+def _inproc_addr(port):
+    return 'inproc://radical.zmq.%d' % port
+
+
+def _is_local(host):
+
+    global _local_hosts                                  # pylint: disable=W0603
+    if _local_hosts is None:
+
+        hosts = set(['localhost', '127.0.0.1', '0.0.0.0',
+                     socket.gethostname(), get_hostip()])
+        for iface in netifaces.interfaces():
+            for info in netifaces.ifaddresses(iface).get(netifaces.AF_INET, []):
+                if info.get('addr'):
+                    hosts.add(info['addr'])
+
+        _local_hosts = hosts
+
+    return host in _local_hosts
+
+
+# ------------------------------------------------------------------------------
+#
+def bind_endpoint(sock, transports=None, log=None):
+    '''
+    Bind the given socket to a TCP endpoint on a random port, and additionally
+    to IPC and INPROC endpoints derived from that port if those transports are
+    enabled.  Return the TCP address (`ru.Url`) with the host replaced by the
+    local host IP, for publication to peers.
+
+    INPROC endpoints are only reachable for sockets created on the shared
+    context (see `get_context()`).
+    '''
+
+    if transports is None:
+        transports = TRANSPORTS
+
+    sock.bind('tcp://*:*')
+
+    addr      = Url(as_string(sock.getsockopt(zmq.LAST_ENDPOINT)))
+    addr.host = get_hostip()
+    port      = addr.port
+    path      = _ipc_path(port)
+
+    if 'ipc' in transports and zmq.has('ipc'):
+        try:
+            sock.bind('ipc://%s' % path)
+        except Exception:
+            if log:
+                log.exception('cannot bind ipc endpoint %s', path)
+
+    elif os.path.exists(path):
+        # remove stale endpoints so that peers don't pick them up
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    if 'inproc' in transports:
+        sock.bind(_inproc_addr(port))
+        _inproc_endpoints[port] = (os.getpid(), sock.context)
+
+    return addr
+
+
+# ------------------------------------------------------------------------------
+#
+def unbind_endpoint(addr):
+    '''
+    Withdraw the IPC and INPROC endpoints for the given TCP address, so that no
+    new peers will connect to them.
+    '''
+
+    port = Url(addr).port
+
+    _inproc_endpoints.pop(port, None)
+
+    try:
+        os.unlink(_ipc_path(port))
+    except OSError:
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def select_endpoint(url):
+    '''
+    For a given bridge TCP address, select and return the fastest reachable
+    endpoint address.
+    '''
+
+    addr = Url(url)
+
+    if addr.schema != 'tcp' or not _is_local(addr.host):
+        return str(url)
+
+    # inproc endpoints are not inherited by forked processes, and are only
+    # reachable via the (still open) context they were bound on
+    owner = _inproc_endpoints.get(addr.port)
+    if owner and owner[0] == os.getpid() and not owner[1].closed \
+             and owner[1] is get_context():
+        return _inproc_addr(addr.port)
+
+    path = _ipc_path(addr.port)
+    try:
+        if os.stat(path).st_uid == os.getuid():
+            return 'ipc://%s' % path
+    except OSError:
+        pass
+
+    return str(url)
+
+
 # ------------------------------------------------------------------------------
 #
 def log_bulk(log, bulk, token):
@@ -51,8 +191,8 @@ def log_bulk(log, bulk, token):
       # log.debug("%s: None", token)
         return
 
-    if hasattr(bulk, 'read'):
-        bulk = msgpack.unpack(bulk)
+    if not log.isEnabledFor(DEBUG):
+        return
 
     if not isinstance(bulk, list):
         bulk = [bulk]
@@ -65,10 +205,90 @@ def log_bulk(log, bulk, token):
             log.debug("%s: %s [%s]", token, e['uid'], e.get('state'))
     else:
         for e in bulk:
-            log.debug("%s: ?", str(token))
             log.debug("%s: %s", token, str(e)[0:32])
 
 
+# ------------------------------------------------------------------------------
+#
+class MsgTrace(object):
+    '''
+    Message tracing for the zmq hot path.
+
+    A `MsgTrace` instance counts the number of calls and messages per token
+    (like `put` or `get`).  That is cheap enough to stay enabled at all times.
+    The messages themselves are only logged if the logger is enabled for
+    `DEBUG`, and then only on every `sample`'th call per token.  The sampling
+    rate defaults to the value of `RADICAL_UTILS_ZMQ_TRACE_SAMPLE` or
+    `RADICAL_ZMQ_TRACE_SAMPLE` (`1` if neither is set).  A sampling rate of `0`
+    disables message logging altogether.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, log, channel, sample=None):
+
+        if sample is None:
+            sample = ru_get_env_ns('zmq_trace_sample', 'radical.utils', 1)
+
+        self._log     = log
+        self._channel = channel
+        self._sample  = int(sample)
+        self._calls   = dict()  # token: number of calls
+        self._msgs    = dict()  # token: number of messages
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __call__(self, token, bulk, n=None):
+        '''
+        Count (and possibly log) `bulk` for the given token.  Lists count as
+        `len(bulk)` messages, anything else as one message, unless the number
+        of messages is given as `n`.
+        '''
+
+        if n is None:
+            if isinstance(bulk, list): n = len(bulk)
+            else                     : n = 1
+
+        try:
+            self._calls[token] += 1
+            self._msgs[token]  += n
+
+        except KeyError:
+            self._calls[token]  = 1
+            self._msgs[token]   = n
+
+        if not self._sample:
+            return
+
+        if self._calls[token] % self._sample:
+            return
+
+        if not self._log.isEnabledFor(DEBUG):
+            return
+
+        log_bulk(self._log, bulk, '%s %s' % (token, self._channel))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def counters(self):
+        '''
+        return a dict of `{token: {'calls': n_calls, 'msgs': n_msgs}}`
+        '''
+
+        return {token: {'calls': self._calls[token],
+                        'msgs' : self._msgs.get(token, 0)}
+                for token in list(self._calls.keys())}
+
+
+# ------------------------------------------------------------------------------
+#
+# upper bounds (in seconds) of the buckets of the bridge delay histograms
+#
+_DELAY_BINS = [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1e+0, 1e+1, float('inf')]
+
+
 # ------------------------------------------------------------------------------
 #
 class Bridge(object):
@@ -76,6 +296,15 @@ class Bridge(object):
 
     A bridge can be configured to have a finite lifetime: when no messages are
     received in `timeout` seconds, the bridge process will terminate.
+
+    The cfg setting `transports` selects the transports the bridge listens on
+    (default: `['tcp', 'ipc', 'inproc']`, TCP is always used).  Peers on the
+    same host and in the same process will use IPC and INPROC, respectively.
+
+    Each bridge collects statistics about the messages it forwards, which are
+    available via `stats()`.  If the cfg setting `stats_interval` is set to
+    a positive number of seconds, the statistics are also recorded as
+    `bridge_stats` profile events in that interval.
     '''
 
     # --------------------------------------------------------------------------
@@ -86,8 +315,26 @@ class Bridge(object):
         self._channel = self._cfg.channel
         self._uid     = self._cfg.uid
         self._log     = Logger(name=self._uid, ns='radical.utils',
-                               level='DEBUG', path=self._cfg.path)
+                               level=self._cfg.get('log_level', 'DEBUG'),
+                               path=self._cfg.path)
         self._prof    = Profiler(name=self._uid, path=self._cfg.path)
+        self._trace   = MsgTrace(self._log, self._channel)
+
+        self._stats_interval = self._cfg.get('stats_interval', 0)
+        self._stats_last     = time.time()
+        self._stats          = {'msgs_in'   : 0,
+                                'msgs_out'  : 0,
+                                'bytes_in'  : 0,
+                                'bytes_out' : 0,
+                                'buf_size'  : 0,
+                                'buf_hwm'   : 0,
+                                'delay_n'   : 0,
+                                'delay_sum' : 0.0,
+                                'delay_max' : 0.0}
+        self._delay_hist     = [0] * len(_DELAY_BINS)
+
+        self._term          = mt.Event()
+        self._bridge_thread = None
 
         self._prof.prof('init3', uid=self._uid, msg=self._cfg.path)
         self._log.debug('bridge %s init', self._uid)
@@ -102,6 +349,108 @@ class Bridge(object):
         return self._channel
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _stats_in(self, n, nbytes, buf_size=0):
+
+        stats = self._stats
+        stats['msgs_in']  += n
+        stats['bytes_in'] += nbytes
+        stats['buf_size']  = buf_size
+
+        if buf_size > stats['buf_hwm']:
+            stats['buf_hwm'] = buf_size
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stats_out(self, n, nbytes, buf_size=0):
+
+        stats = self._stats
+        stats['msgs_out']  += n
+        stats['bytes_out'] += nbytes
+        stats['buf_size']   = buf_size
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stats_delay(self, delay, n=1):
+
+        # record the time `n` messages spent in the bridge
+        for idx, bound in enumerate(_DELAY_BINS):
+            if delay < bound:
+                self._delay_hist[idx] += n
+                break
+
+        stats = self._stats
+        stats['delay_n']   += n
+        stats['delay_sum'] += delay * n
+
+        if delay > stats['delay_max']:
+            stats['delay_max'] = delay
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stats_emit(self):
+
+        # called regularly by the bridge thread: record stats in the profile
+        if self._stats_interval <= 0:
+            return
+
+        now = time.time()
+        if now - self._stats_last < self._stats_interval:
+            return
+
+        self._stats_last = now
+
+        # NOTE: profile messages must not contain commas
+        stats = self.stats()
+        self._prof.prof('bridge_stats', uid=self._uid,
+                        msg='in=%d:out=%d:bytes_in=%d:bytes_out=%d:'
+                            'buf=%d:buf_hwm=%d:delay_avg=%.6f:delay_max=%.6f'
+                            % (stats['msgs_in'],  stats['msgs_out'],
+                               stats['bytes_in'], stats['bytes_out'],
+                               stats['buf_size'], stats['buf_hwm'],
+                               stats['delay_avg'], stats['delay_max']))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stats(self):
+        '''
+        Return a dict with the bridge's message statistics:
+
+            msgs_in   : number of messages received
+            msgs_out  : number of messages sent
+            bytes_in  : number of bytes received
+            bytes_out : number of bytes sent
+            buf_size  : current number of buffered messages
+            buf_hwm   : max number of buffered messages
+            delay_n   : number of messages with delay information
+            delay_sum : total time (in seconds) messages spent in the bridge
+            delay_avg : average time (in seconds) messages spent in the bridge
+            delay_max : max time (in seconds) a message spent in the bridge
+            delay_hist: list of `[bound, count]` pairs: number of messages which
+                        spent less than `bound` seconds in the bridge (and more
+                        than the previous bound)
+            trace     : message trace counters (see `MsgTrace`)
+        '''
+
+        ret = dict(self._stats)
+
+        if ret['delay_n']: ret['delay_avg'] = ret['delay_sum'] / ret['delay_n']
+        else             : ret['delay_avg'] = 0.0
+
+        ret['uid']        = self._uid
+        ret['channel']    = self._channel
+        ret['delay_hist'] = [[bound, cnt] for bound, cnt
+                                          in zip(_DELAY_BINS, self._delay_hist)]
+        ret['trace']      = self._trace.counters()
+
+        return ret
+
+
     # --------------------------------------------------------------------------
     #
     def start(self):
@@ -149,19 +498,31 @@ class Bridge(object):
     #
     def stop(self, timeout=None):
 
+        # the bridge thread closes its sockets when it notices termination.
+        # If a timeout is given, wait for that to happen.
         self._term.set()
-      # self._bridge_thread.join(timeout=timeout)
+
+        # a bridge which was never started (or failed to initialize) may not
+        # have any addresses to unbind
+        for addr in [getattr(self, 'addr_in',  None),
+                     getattr(self, 'addr_out', None)]:
+            if addr:
+                unbind_endpoint(addr)
+
         self._prof.prof('term', uid=self._uid)
 
-      # if timeout is not None:
-      #     return not self._bridge_thread.is_alive()
+        if timeout is not None:
+            if not self._bridge_thread:
+                return True
+            self._bridge_thread.join(timeout=timeout)
+            return not self._bridge_thread.is_alive()
 
 
     # --------------------------------------------------------------------------
     #
     @property
     def alive(self):
-        return self._bridge_thread.is_alive()
+        return bool(self._bridge_thread and self._bridge_thread.is_alive())
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,103 @@
+
+import os
+import zmq
+
+import threading as mt
+
+from ..atfork import atfork
+from ..misc   import get_env_ns as ru_get_env_ns
+
+
+# ------------------------------------------------------------------------------
+#
+# All zmq endpoints of a process share a single zmq context (and thus a single
+# set of IO threads).  The number of IO threads is configured via
+#
+#     RADICAL_UTILS_ZMQ_IO_THREADS  (default: 1)
+#
+# A context cannot be used across `fork()`: children create a new context on
+# first use.  The parent's context is never terminated in the child, as that
+# may hang on sockets which are only valid in the parent.
+#
+_ctx_lock  = mt.Lock()
+_ctx       = None
+_ctx_pid   = None
+_ctx_stale = list()   # inherited contexts, kept alive to avoid termination
+
+
+# ------------------------------------------------------------------------------
+#
+def _atfork_prepare():
+    pass
+
+
+def _atfork_parent():
+    pass
+
+
+def _atfork_child():
+
+    global _ctx, _ctx_pid, _ctx_lock                     # pylint: disable=W0603
+
+    if _ctx is not None:
+        _ctx_stale.append(_ctx)
+
+    _ctx      = None
+    _ctx_pid  = None
+    _ctx_lock = mt.Lock()
+
+
+atfork(_atfork_prepare, _atfork_parent, _atfork_child)
+
+
+# ------------------------------------------------------------------------------
+#
+def get_context():
+    '''
+    Return the zmq context shared by all zmq endpoints of this process.  The
+    context is created on first use, and re-created after `fork()`.
+    '''
+
+    global _ctx, _ctx_pid                                # pylint: disable=W0603
+
+    pid = os.getpid()
+
+    with _ctx_lock:
+
+        # the pid check covers forks which bypass the atfork hooks
+        if _ctx is not None and _ctx_pid != pid:
+            _ctx_stale.append(_ctx)
+            _ctx = None
+
+        if _ctx is None or _ctx.closed:
+            n_io     = int(ru_get_env_ns('zmq_io_threads', 'radical.utils', 1))
+            _ctx     = zmq.Context(io_threads=max(1, n_io))
+            _ctx_pid = pid
+
+        return _ctx
+
+
+# ------------------------------------------------------------------------------
+#
+def close_context(linger=None):
+    '''
+    Terminate the shared zmq context of this process.  Sockets which are still
+    open will be closed with the given `linger` period (in ms).  A subsequent
+    `get_context()` will create a new context.  INPROC endpoints bound on the
+    terminated context are not selected for new peers anymore (see
+    `select_endpoint()`).
+    '''
+
+    global _ctx, _ctx_pid                                # pylint: disable=W0603
+
+    with _ctx_lock:
+
+        if _ctx is not None and _ctx_pid == os.getpid():
+            _ctx.destroy(linger=linger)
+
+        _ctx     = None
+        _ctx_pid = None
+
+
+# ------------------------------------------------------------------------------
+
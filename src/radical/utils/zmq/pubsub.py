@@ -1,14 +1,16 @@
 
 import zmq
+import struct
 import msgpack
 
 import threading as mt
 
-from .bridge  import Bridge, no_intr, log_bulk
+from .bridge  import Bridge, MsgTrace, no_intr
+from .bridge  import bind_endpoint, select_endpoint
+from .context import get_context
 
 from ..ids    import generate_id, ID_CUSTOM
-from ..url    import Url
-from ..misc   import get_hostip, as_string, as_bytes, as_list
+from ..misc   import as_string, as_bytes, as_list
 from ..logger import Logger
 
 
@@ -19,6 +21,23 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
                           # 0:  infinite
 
 
+# ------------------------------------------------------------------------------
+#
+def _msg_count(data):
+    '''
+    Return the number of messages in the packed data of a pubsub message,
+    without unpacking it: batches are msgpack arrays, single messages are maps.
+    '''
+
+    head = data[0]
+
+    if 0x90 <= head <= 0x9f: return head & 0x0f
+    if head == 0xdc        : return struct.unpack('>H', bytes(data[1:3]))[0]
+    if head == 0xdd        : return struct.unpack('>I', bytes(data[1:5]))[0]
+
+    return 1
+
+
 # ------------------------------------------------------------------------------
 #
 # Notifications between components are based on pubsub channels.  Those channels
@@ -81,34 +100,25 @@ class PubSub(Bridge):
 
         self._log.info('initialize bridge %s', self._uid)
 
-        self._url        = 'tcp://*:*'
         self._lock       = mt.Lock()
+        transports       = self._cfg.get('transports')
 
-        self._ctx        = zmq.Context()  # rely on GC for destruction
+        self._ctx        = get_context()
         self._pub        = self._ctx.socket(zmq.XSUB)
         self._pub.linger = _LINGER_TIMEOUT
         self._pub.hwm    = _HIGH_WATER_MARK
-        self._pub.bind(self._url)
 
         self._sub        = self._ctx.socket(zmq.XPUB)
         self._sub.linger = _LINGER_TIMEOUT
         self._sub.hwm    = _HIGH_WATER_MARK
-        self._sub.bind(self._url)
 
-        # communicate the bridge ports to the parent process
-        _addr_pub = as_string(self._pub.getsockopt(zmq.LAST_ENDPOINT))
-        _addr_sub = as_string(self._sub.getsockopt(zmq.LAST_ENDPOINT))
+        # bind the sockets and communicate the bridge addresses to the parent
+        # process (always as tcp addresses for the local host IP)
+        self._addr_pub = bind_endpoint(self._pub, transports, self._log)
+        self._addr_sub = bind_endpoint(self._sub, transports, self._log)
 
-        # store addresses
-        self._addr_pub = Url(_addr_pub)
-        self._addr_sub = Url(_addr_sub)
-
-        # use the local hostip for bridge addresses
-        self._addr_pub.host = get_hostip()
-        self._addr_sub.host = get_hostip()
-
-        self._log.info('bridge pub on  %s: %s'  % (self._uid, self._addr_pub))
-        self._log.info('       sub on  %s: %s'  % (self._uid, self._addr_sub))
+        self._log.info('bridge pub on  %s: %s', self._uid, self._addr_pub)
+        self._log.info('       sub on  %s: %s', self._uid, self._addr_sub)
 
         # start polling for messages
         self._poll = zmq.Poller()
@@ -129,47 +139,80 @@ class PubSub(Bridge):
         #
         # That's the equivalent of the code below.
 
-        while not self._term.is_set():
+        try:
+            while not self._term.is_set():
+
+                # timeout in ms
+                socks = dict(self._poll.poll(timeout=500))
+
+                if self._sub in socks:
+
+                    # if the sub socket signals a message, it's likely
+                    # a topic subscription.  Forward that to the pub
+                    # channel, so the bridge subscribes for the respective
+                    # message topic.
+                    msg = self._sub.recv_multipart(copy=False)
+                    self._pub.send_multipart(msg, copy=False)
 
-            # timeout in ms
-            socks = dict(self._poll.poll(timeout=500))
+                    self._trace('~~', msg[0].bytes)
 
-            if self._sub in socks:
 
-                # if the sub socket signals a message, it's likely
-                # a topic subscription.  Forward that to the pub
-                # channel, so the bridge subscribes for the respective
-                # message topic.
-                msg = self._sub.recv()
-                self._pub.send(msg)
+                if self._pub in socks:
 
-                self._log.debug('~~ %s: %s', self.channel, msg)
-              # log_bulk(self._log, msg, '~~ %s' % self.channel)
+                    # if the pub socket signals a message, get the message
+                    # and forward it to the sub channel, no questions asked.
+                    # Messages are forwarded frame by frame, without copying
+                    # or unpacking them.
+                    msg = self._pub.recv_multipart(copy=False)
+                    self._sub.send_multipart(msg, copy=False)
 
+                    # count the messages in publisher batches
+                    if len(msg) > 1: n = _msg_count(msg[1].buffer)
+                    else           : n = 1
 
-            if self._pub in socks:
+                    nbytes = sum([len(frame) for frame in msg])
+                    self._stats_in (n, nbytes)
+                    self._stats_out(n, nbytes)
+                    self._trace('<>', msg[0].bytes, n)
 
-                # if the pub socket signals a message, get the message
-                # and forward it to the sub channel, no questions asked.
-                msg = self._pub.recv()
-                self._sub.send(msg)
+                self._stats_emit()
 
-                self._log.debug('<> %s: %s', self.channel, msg)
-              # log_bulk(self._log, msg, '<> %s' % self.channel)
+        finally:
+            self._pub.close()
+            self._sub.close()
 
 
 # ------------------------------------------------------------------------------
 #
 class Publisher(object):
+    '''
+    A Publisher sends messages for a given topic to a pubsub bridge.
+
+    By default, each `put()` sends one message.  If `batch_size` is set to
+    a positive number, messages are instead collected and sent as lists of
+    messages, either when `batch_size` messages are collected, or after at most
+    `batch_time` seconds.  Each list holds a run of consecutive messages for the
+    same topic, so that messages are sent in the order of `put()`, also across
+    topics.  Subscribers unpack such batches transparently for their callbacks
+    (but `Subscriber.get()` and `Subscriber.get_nowait()` will return the
+    message lists as is).  Pending messages can be sent explicitly via
+    `flush()`.
+    '''
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, channel, url, log=None):
+    def __init__(self, channel, url, log=None, batch_size=0,
+                                               batch_time=0.005):
 
-        self._channel  = channel
-        self._url      = url
-        self._log      = log
-        self._lock     = mt.Lock()
+        self._channel    = channel
+        self._url        = url
+        self._log        = log
+        self._lock       = mt.Lock()
+
+        self._batch_size = batch_size  # max number of batched messages
+        self._batch_time = batch_time  # max time (s) messages stay batched
+        self._batch      = list()      # runs of [topic, messages]
+        self._batch_cnt  = 0           # number of batched messages
 
         # FIXME: no uid ns
         self._uid      = generate_id('%s.pub.%s' % (self._channel,
@@ -177,13 +220,24 @@ class Publisher(object):
         if not log:
             self._log  = Logger(name=self._uid, ns='radical.utils')
 
-        self._log.info('connect pub to %s: %s'  % (self._channel, self._url))
+        self._trace = MsgTrace(self._log, self._channel)
+
+        # use the fastest transport available to reach the bridge
+        self._addr = select_endpoint(self._url)
+        self._log.info('connect pub to %s: %s', self._channel, self._addr)
 
-        self._ctx           = zmq.Context()  # rely on GC for destruction
+        self._ctx           = get_context()
         self._socket        = self._ctx.socket(zmq.PUB)
         self._socket.linger = _LINGER_TIMEOUT
         self._socket.hwm    = _HIGH_WATER_MARK
-        self._socket.connect(self._url)
+        self._socket.connect(self._addr)
+
+        # batches are flushed by a separate thread when they grow too old
+        if self._batch_size > 0:
+            self._term   = mt.Event()
+            self._thread = mt.Thread(target=self._flusher)
+            self._thread.daemon = True
+            self._thread.start()
 
 
     # --------------------------------------------------------------------------
@@ -201,6 +255,47 @@ class Publisher(object):
         return self._channel
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _flusher(self):
+
+        try:
+            while not self._term.wait(timeout=self._batch_time):
+                self.flush()
+
+        except Exception:
+            self._log.exception('flusher died')
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _send(self, btopic, msg):
+
+        # topic and message are sent as separate frames, so that neither
+        # needs to be copied into a combined buffer.  Caller holds the lock.
+        bmsg = msgpack.packb(msg)
+        no_intr(self._socket.send_multipart, [btopic, bmsg], copy=False)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def flush(self):
+        '''
+        send all batched messages
+        '''
+
+        with self._lock:
+
+            if not self._batch_cnt:
+                return
+
+            for btopic, msgs in self._batch:
+                self._send(btopic, msgs)
+
+            self._batch     = list()
+            self._batch_cnt = 0
+
+
     # --------------------------------------------------------------------------
     #
     def put(self, topic, msg):
@@ -208,14 +303,42 @@ class Publisher(object):
         assert(isinstance(topic, str )), 'invalid topic type'
         assert(isinstance(msg,   dict)), 'invalid message type'
 
-        self._log.debug('-> %s: %s', self.channel, msg)
-        log_bulk(self._log, msg, '-> %s' % self.channel)
+        self._trace('->', msg)
 
         btopic = as_bytes(topic.replace(' ', '_'))
-        bmsg   = msgpack.packb(msg)
-        data   = btopic + b' ' + bmsg
 
-        self._socket.send(data)
+        if self._batch_size <= 0:
+            with self._lock:
+                self._send(btopic, msg)
+            return
+
+        with self._lock:
+            if self._batch and self._batch[-1][0] == btopic:
+                self._batch[-1][1].append(msg)
+            else:
+                self._batch.append([btopic, [msg]])
+            self._batch_cnt += 1
+            full = self._batch_cnt >= self._batch_size
+
+        if full:
+            self.flush()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+        '''
+        Send all batched messages and close the connection to the bridge.
+        '''
+
+        if self._batch_size > 0:
+            self._term.set()
+            self._thread.join()
+
+        self.flush()
+
+        with self._lock:
+            self._socket.close()
 
 
 # ------------------------------------------------------------------------------
@@ -229,6 +352,40 @@ class Subscriber(object):
     # that all class instances share that information
     _callbacks = dict()
 
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def _recv(socket, flags=0):
+        '''
+        Receive a message and return topic and *packed* message data.  The data
+        are not copied, and not unpacked: that is left to the consumer, so that
+        messages nobody is interested in are never unpacked.
+
+        Messages are expected to be sent as two frames: `[topic, data]`.  The
+        single frame format `topic data` of earlier versions is still accepted.
+        '''
+
+        frames = no_intr(socket.recv_multipart, flags=flags, copy=False)
+
+        return Subscriber._parse(frames)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def _parse(frames):
+        '''
+        Split the (uncopied) frames of a message into topic and packed data.
+        '''
+
+        if len(frames) == 1:
+            topic, data = frames[0].bytes.split(b' ', 1)
+        else:
+            topic, data = frames[0].bytes, frames[1].buffer
+
+        return as_string(topic), data
+
+
     # --------------------------------------------------------------------------
     #
     @staticmethod
@@ -237,12 +394,7 @@ class Subscriber(object):
         # FIXME: add logging
 
         if socket.poll(flags=zmq.POLLIN, timeout=timeout):
-
-            raw         = no_intr(socket.recv, flags=zmq.NOBLOCK)
-            topic, data = raw.split(b' ', 1)
-            msg         = msgpack.unpackb(data)
-
-            return [as_string(topic), as_string(msg)]
+            return Subscriber._recv(socket, flags=zmq.NOBLOCK)
 
         return None, None
 
@@ -252,34 +404,51 @@ class Subscriber(object):
     @staticmethod
     def _listener(url, log):
 
+        # keep a handle on the endpoint entry: it is removed from the class
+        # dict when the last subscriber closes
+        entry = Subscriber._callbacks[url]
+
         try:
-            lock      = Subscriber._callbacks[url]['lock']
-            socket    = Subscriber._callbacks[url]['socket']
-            channel   = Subscriber._callbacks[url]['channel']
+            lock      = entry['lock']
+            socket    = entry['socket']
+            channel   = entry['channel']
+            term      = entry['term']
 
-            while True:
+            while not term.is_set():
 
                 # this list is dynamic
-                callbacks = Subscriber._callbacks[url]['callbacks']
+                callbacks = entry['callbacks']
 
-                topic, msg = Subscriber._get_nowait(socket, lock, 500, channel)
+                topic, data = Subscriber._get_nowait(socket, lock, 500, channel)
                 if topic and channel == 'state_pubsub':
-                    log.debug('get %s [%s]', topic, len(msg))
-
-                if topic:
-                    t = as_string(topic)
-                    for m in as_list(msg):
-                        m = as_string(m)
-                        for cb, _lock in callbacks:
-                          # log.debug('cb  %s [%s] [%s]', cb, len(msg), l)
-                            if _lock:
-                                with _lock:
-                                    cb(t, m)
-                            else:
-                                cb(t, m)
+                    log.debug('get %s [%s]', topic, len(data))
+
+                if not topic:
+                    continue
+
+                # only unpack the message if any callback is interested in the
+                # topic (callback topics match by prefix, like zmq topics)
+                cbs = [[cb, _lock] for cb, _lock, _topic in callbacks
+                                   if topic.startswith(_topic)]
+                if not cbs:
+                    continue
+
+                msg = msgpack.unpackb(data)
+                for m in as_list(msg):
+                    m = as_string(m)
+                    for cb, _lock in cbs:
+                      # log.debug('cb  %s [%s] [%s]', cb, len(msg), l)
+                        if _lock:
+                            with _lock:
+                                cb(topic, m)
+                        else:
+                            cb(topic, m)
         except:
             log.exception('listener died')
 
+        finally:
+            entry['socket'].close()
+
 
     # --------------------------------------------------------------------------
     #
@@ -304,24 +473,34 @@ class Subscriber(object):
         if not self._log:
             self._log = Logger(name=self._uid, ns='radical.utils.zmq')
 
-        self._log.info('connect sub to %s: %s'  % (self._channel, self._url))
+        self._trace = MsgTrace(self._log, self._channel)
+
+        # use the fastest transport available to reach the bridge
+        self._addr = select_endpoint(self._url)
+        self._log.info('connect sub to %s: %s', self._channel, self._addr)
 
         self._lock     = mt.Lock()
-        self._ctx      = zmq.Context()  # rely on GC for destruction
+        self._ctx      = get_context()
+        self._cbs      = list()   # callbacks registered by this instance
+        self._closed   = False
 
         if url not in Subscriber._callbacks:
 
             s        = self._ctx.socket(zmq.SUB)
             s.linger = _LINGER_TIMEOUT
             s.hwm    = _HIGH_WATER_MARK
-            s.connect(self._url)
+            s.connect(self._addr)
 
             Subscriber._callbacks[url] = {'socket'   : s,
                                           'channel'  : channel,
                                           'lock'     : mt.Lock(),
+                                          'term'     : mt.Event(),
                                           'thread'   : None,
+                                          'users'    : 0,
                                           'callbacks': list()}
 
+        Subscriber._callbacks[url]['users'] += 1
+
         # only allow `get()` and `get_nowait()`
         self._interactive = True
 
@@ -374,15 +553,17 @@ class Subscriber(object):
         # The given callback (if any) is used to shield concurrent cb
         # invokations.
 
+        topic = topic.replace(' ', '_')
+
         if cb:
 
             self._interactive = False
             self._start_listener()
-            Subscriber._callbacks[self._url]['callbacks'].append([cb, lock])
+            self._cbs.append([cb, lock, topic])
+            Subscriber._callbacks[self._url]['callbacks'].append(self._cbs[-1])
 
         sock  = Subscriber._callbacks[self._url]['socket']
-        topic = topic.replace(' ', '_')
-        log_bulk(self._log, topic, '~~ %s' % self.channel)
+        self._trace('~~', topic)
 
         with self._lock:
             no_intr(sock.setsockopt, zmq.SUBSCRIBE, as_bytes(topic))
@@ -401,14 +582,13 @@ class Subscriber(object):
         sock = Subscriber._callbacks[self._url]['socket']
 
         with self._lock:
-            raw = no_intr(sock.recv)
+            topic, data = Subscriber._recv(sock)
 
-        topic, data = raw.split(b' ', 1)
         msg = msgpack.unpackb(data)
 
-        log_bulk(self._log, msg, '<- %s' % self.channel)
+        self._trace('<-', msg)
 
-        return [as_string(topic), as_string(msg)]
+        return [topic, as_string(msg)]
 
 
     # --------------------------------------------------------------------------
@@ -424,18 +604,50 @@ class Subscriber(object):
         if no_intr(sock.poll, flags=zmq.POLLIN, timeout=timeout):
 
             with self._lock:
-                raw = no_intr(sock.recv, flags=zmq.NOBLOCK)
+                topic, data = Subscriber._recv(sock, flags=zmq.NOBLOCK)
 
-            topic, data = raw.split(b' ', 1)
             msg = msgpack.unpackb(data)
 
-            log_bulk(self._log, msg, '<- %s' % self.channel)
+            self._trace('<-', msg)
 
-            return [as_string(topic), as_string(msg)]
+            return [topic, as_string(msg)]
 
         else:
             return [None, None]
 
 
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+        '''
+        Unregister the callbacks of this subscriber.  The connection to the
+        bridge is shared by all subscribers on the same bridge in this process,
+        and is closed when the last of those subscribers is closed.
+        '''
+
+        if self._closed:
+            return
+
+        self._closed = True
+        entry        = Subscriber._callbacks[self._url]
+
+        for cb in self._cbs:
+            entry['callbacks'].remove(cb)
+        self._cbs = list()
+
+        entry['users'] -= 1
+        if entry['users'] > 0:
+            return
+
+        del Subscriber._callbacks[self._url]
+
+        # a listener thread closes the socket on termination
+        if entry['thread']:
+            entry['term'].set()
+        else:
+            with self._lock:
+                entry['socket'].close()
+
+
 # ------------------------------------------------------------------------------
 
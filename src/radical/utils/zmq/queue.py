@@ -2,24 +2,27 @@
 import os
 import zmq
 import time
+import queue
 import msgpack
 
 import threading as mt
 
-from .bridge  import Bridge, no_intr, log_bulk
+from collections import deque
+
+from .bridge  import Bridge, MsgTrace, no_intr
+from .bridge  import bind_endpoint, select_endpoint
+from .context import get_context
 
 from ..ids    import generate_id, ID_CUSTOM
-from ..url    import Url
-from ..misc   import get_hostip, as_string, as_bytes
+from ..misc   import as_string, as_bytes, as_list
 from ..logger import Logger
 
 
-# FIXME: the log bulk method is frequently called and slow
-
 # --------------------------------------------------------------------------
 #
 _LINGER_TIMEOUT  =   250  # ms to linger after close
 _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
+_PUT_HWM         =     0  # number of messages a putter buffers before blocking
 
 
 # ------------------------------------------------------------------------------
@@ -49,7 +52,7 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #   qsize
 #   empty
 #   full
-#   put(msg, block, timeout)
+#   put(msg, block)
 #   put_nowait
 #   get(block, timeout)
 #   task_done
@@ -84,15 +87,39 @@ class Queue(Bridge):
         Addresses are of the form 'tcp://host:port'.  Both 'host' and 'port' can
         be wildcards for BRIDGE roles -- the bridge will report the in and out
         addresses as obj.addr_put and obj.addr_get.
+
+        The following `cfg` settings are evaluated by the bridge:
+
+            bulk_size  : max number of messages sent per `get()` request
+            stall_hwm  : max number of bulks buffered in the bridge (default:
+                         `0`, i.e., the buffer is unbounded)
+            stall_spill: path of a file to spill messages to when the buffer
+                         is full (default: no spilling)
+            max_wait   : max time (in seconds) the bridge blocks in a single
+                         poll before checking for termination (default: 0.5)
+
+        If `stall_hwm` is set and the bridge buffer holds `stall_hwm *
+        bulk_size` messages, the bridge stops pulling messages: they queue up
+        in the bridge socket and then in the putters' sockets, until
+        `Putter.put()` blocks (or times out) for putters created with an `hwm`.
+        If `stall_spill` is set, the bridge instead keeps pulling and appends
+        messages to that file, and feeds them back into the buffer as it
+        drains.
+
+        In addition to the `Bridge` statistics, `stats()` reports:
+
+            stalls    : number of times the bridge stopped pulling messages
+            stall_time: total time (in seconds) the bridge stopped pulling
+            spilled   : number of messages spilled to disk
+            spill_size: number of messages currently spilled to disk
         '''
 
         super(Queue, self).__init__(cfg)
 
-        self._stall_hwm  = self._cfg.get('stall_hwm', 1)  # FIXME: use
-        self._bulk_size  = self._cfg.get('bulk_size', 10)
-
-        if self._bulk_size <= 0:
-            self._bulk_size = 1
+        self._stats.update({'stalls'    : 0,
+                            'stall_time': 0.0,
+                            'spilled'   : 0,
+                            'spill_size': 0})
 
 
     # --------------------------------------------------------------------------
@@ -142,118 +169,253 @@ class Queue(Bridge):
 
         self._log.info('start bridge %s', self._uid)
 
-        self._url        = 'tcp://*:*'
+        self._stall_hwm  = self._cfg.get('stall_hwm') or 0
+        self._bulk_size  = self._cfg.get('bulk_size', 10)
+        self._spill_path = self._cfg.get('stall_spill')
+        self._max_wait   = self._cfg.get('max_wait',  0.5)  # seconds
+
+        if self._bulk_size <= 0:
+            self._bulk_size = 1
+
+        # max number of buffered messages (0: unbounded).  The socket queue of
+        # each putter connection is bounded to the same size (0: no limit).
+        self._buf_max    = max(0, self._stall_hwm) * self._bulk_size
+
         self._lock       = mt.Lock()
+        transports       = self._cfg.get('transports')
 
-        self._ctx        = zmq.Context()  # rely on GC for destruction
-        self._put         = self._ctx.socket(zmq.PULL)
-        self._put.linger  = _LINGER_TIMEOUT
-        self._put.hwm     = _HIGH_WATER_MARK
-        self._put.bind(self._url)
+        self._ctx        = get_context()
+        self._put        = self._ctx.socket(zmq.PULL)
+        self._put.linger = _LINGER_TIMEOUT
+        self._put.hwm    = self._buf_max
 
         self._get        = self._ctx.socket(zmq.REP)
         self._get.linger = _LINGER_TIMEOUT
         self._get.hwm    = _HIGH_WATER_MARK
-        self._get.bind(self._url)
-
-        # communicate the bridge ports to the parent process
-        _addr_put = as_string(self._put.getsockopt (zmq.LAST_ENDPOINT))
-        _addr_get = as_string(self._get.getsockopt(zmq.LAST_ENDPOINT))
-
-        # store addresses
-        self._addr_put = Url(_addr_put)
-        self._addr_get = Url(_addr_get)
-
-        # use the local hostip for bridge addresses
-        self._addr_put.host = get_hostip()
-        self._addr_get.host = get_hostip()
 
-        self._log.info('bridge in  %s: %s'  % (self._uid, self._addr_put))
-        self._log.info('       out %s: %s'  % (self._uid, self._addr_get))
+        # bind the sockets and communicate the bridge addresses to the parent
+        # process (always as tcp addresses for the local host IP)
+        self._addr_put = bind_endpoint(self._put, transports, self._log)
+        self._addr_get = bind_endpoint(self._get, transports, self._log)
 
-        # start polling senders
-        self._poll_put = zmq.Poller()
-        self._poll_put.register(self._put, zmq.POLLIN)
+        self._log.info('bridge in  %s: %s', self._uid, self._addr_put)
+        self._log.info('       out %s: %s', self._uid, self._addr_get)
 
-        # start polling receivers
-        self._poll_get = zmq.Poller()
-        self._poll_get.register(self._get, zmq.POLLIN)
+        # we use a single poller on both sockets, so that the bridge thread
+        # only wakes up when there is actually something to do
+        self._poll = zmq.Poller()
+        self._poll.register(self._put, zmq.POLLIN)
+        self._poll.register(self._get, zmq.POLLIN)
 
 
     # --------------------------------------------------------------------------
     #
     def _bridge_work(self):
 
-        # TODO: *always* pull for messages and buffer them.  Serve requests from
-        #       that buffer.
+        # We pull for messages and buffer them, and serve requests from that
+        # buffer.  A request which arrives while the buffer is empty is kept
+        # pending until messages arrive.  Note that the REP socket will not
+        # signal POLLIN while a reply is pending, so we will not spin on that
+        # socket.  The poll timeout (`max_wait`) only limits how long it takes
+        # for the bridge to notice termination - it does not add latency to
+        # message delivery.
+        #
+        # While the buffer is full, we stop polling the PULL socket (or spill
+        # to disk), which eventually blocks the putters.
+
+        timeout = int(self._max_wait * 1000)  # poll timeout is in ms
+        stats   = self._stats
+        spill   = None
+        stalled = None  # time when the bridge stopped pulling
 
         try:
 
-            buf = list()
+            if self._spill_path:
+                spill = _Spill(self._spill_path)
+
+            buf = deque()
+            arr = deque()  # arrival time and size of buffered bulks
+            req = None     # pending request
             while not self._term.is_set():
 
-                # check for incoming messages, and buffer them
-                ev_put = dict(no_intr(self._poll_put.poll, timeout=0))
-                active = False
+                full = self._buf_max and len(buf) >= self._buf_max
+
+                if full and spill is None:
+                    if stalled is None:
+                        stalled = time.time()
+                        stats['stalls'] += 1
+                        self._poll.modify(self._put, 0)
+
+                elif stalled is not None:
+                    stats['stall_time'] += time.time() - stalled
+                    stalled = None
+                    self._poll.modify(self._put, zmq.POLLIN)
 
-                if self._put in ev_put:
+                events = dict(no_intr(self._poll.poll, timeout=timeout))
+
+                # check for incoming messages, and buffer them
+                if self._put in events:
 
                     with self._lock:
                         data = no_intr(self._put.recv)
 
                     msgs = msgpack.unpackb(data)
 
-                    if isinstance(msgs, list): buf += msgs
-                    else                     : buf.append(msgs)
+                    if not isinstance(msgs, list):
+                        msgs = [msgs]
 
-                    active = True
-                    log_bulk(self._log, msgs, '>< %s [%d]'
-                                              % (self._uid, len(buf)))
+                    # keep the order: once spilling, all messages go to disk
+                    # until the spill file is drained
+                    if spill is not None and (full or len(spill)):
+                        spill.put(time.time(), msgs)
+                        stats['spilled'] += len(msgs)
 
+                    else:
+                        buf.extend(msgs)
+                        arr.append([time.time(), len(msgs)])
 
-                # if we don't have any data in the buffer, there is no point in
-                # checking for receivers
-                if buf:
+                    self._stats_in(len(msgs), len(data), len(buf))
+                    self._trace('><', msgs)
 
-                    # check if somebody wants our messages
-                    ev_get = dict(no_intr(self._poll_get.poll,
-                                                   timeout=0))
-                    if self._get in ev_get:
+                # refill the buffer from the spill file
+                if spill is not None:
+                    while len(spill) and len(buf) < self._buf_max:
+                        t_in, msgs = spill.get()
+                        buf.extend(msgs)
+                        arr.append([t_in, len(msgs)])
+                    stats['spill_size'] = len(spill)
 
-                        # send up to `bulk_size` messages from the buffer
-                        # NOTE: this sends partial bulks on buffer underrun
-                        with self._lock:
-                            req = no_intr(self._get.recv)
+                # check if somebody wants our messages
+                if req is None and self._get in events:
+
+                    with self._lock:
+                        req = no_intr(self._get.recv)
 
-                        bulk   = buf[:self._bulk_size]
-                        data   = msgpack.packb(bulk)
-                        active = True
+                # serve a pending request if we have data to send
+                if req is not None and buf:
 
-                        no_intr(self._get.send, data)
-                        log_bulk(self._log, bulk, '<> %s [%s]'
-                                                % (self._uid, req))
+                    # send up to `bulk_size` messages from the buffer
+                    # NOTE: this sends partial bulks on buffer underrun
+                    bulk = [buf.popleft()
+                            for _ in range(min(self._bulk_size, len(buf)))]
+                    data = msgpack.packb(bulk)
 
-                        # remove sent messages from buffer
-                        del(buf[:self._bulk_size])
+                    no_intr(self._get.send, data)
+                    self._dequeued(arr, len(bulk))
+                    self._stats_out(len(bulk), len(data), len(buf))
+                    self._trace('<>', bulk)
+                    req = None
 
-                if not active:
-                    # let CPU sleep a bit when there is nothing to do
-                    # We don't want to use poll timouts since we use two
-                    # competing polls and don't want the idle channel slow down
-                    # the busy one.
-                    time.sleep(0.01)
+                self._stats_emit()
 
         except  Exception:
             self._log.exception('bridge failed')
 
+        finally:
+            self._put.close()
+            self._get.close()
+
+            if spill is not None:
+                spill.close()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _dequeued(self, arr, n):
+
+        # `n` messages left the buffer: record their delay and update the
+        # arrival records accordingly
+        now = time.time()
+        while n:
+            entry = arr[0]
+            cnt   = min(n, entry[1])
+            self._stats_delay(now - entry[0], cnt)
+            entry[1] -= cnt
+            n        -= cnt
+            if not entry[1]:
+                arr.popleft()
+
+
+# ------------------------------------------------------------------------------
+#
+class _Spill(object):
+    '''
+    A file based FIFO of message bulks, used by the queue bridge to hold
+    messages which exceed its buffer limit.  The file is truncated whenever it
+    has been drained, and removed on `close()`.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, path):
+
+        self._path = path
+        self._fout = open(path, 'wb')
+        self._fin  = open(path, 'rb')
+        self._unp  = msgpack.Unpacker(self._fin)
+        self._size = 0  # number of spilled messages
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __len__(self):
+        return self._size
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put(self, t_in, msgs):
+
+        self._fout.write(msgpack.packb([t_in, msgs]))
+        self._size += len(msgs)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get(self):
+
+        # only complete records are ever flushed, so the unpacker never sees
+        # partial data
+        self._fout.flush()
+
+        t_in, msgs  = self._unp.unpack()
+        self._size -= len(msgs)
+
+        if not self._size:
+            self._fout.seek(0)
+            self._fout.truncate()
+            self._fin.seek(0)
+            self._unp = msgpack.Unpacker(self._fin)
+
+        return t_in, msgs
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        self._fout.close()
+        self._fin.close()
+
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
 
 # ------------------------------------------------------------------------------
 #
 class Putter(object):
+    '''
+    A Putter pushes messages to a queue bridge.  If `hwm` is set, at most `hwm`
+    messages are queued in the putter while the bridge does not accept messages
+    (see the `stall_hwm` setting of the `Queue`), after which `put()` blocks.
+    By default, the putter queue is unbounded.
+    '''
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, channel, url):
+    def __init__(self, channel, url, hwm=_PUT_HWM):
 
         self._channel  = channel
         self._url      = url
@@ -262,13 +424,17 @@ class Putter(object):
         self._uid      = generate_id('%s.put.%s' % (self._channel,
                                                    '%(counter)04d'), ID_CUSTOM)
         self._log      = Logger(name=self._uid, ns='radical.utils')
-        self._log.info('connect put to %s: %s'  % (self._channel, self._url))
+        self._trace    = MsgTrace(self._log, self._channel)
 
-        self._ctx      = zmq.Context()  # rely on GC for destruction
+        # use the fastest transport available to reach the bridge
+        self._addr     = select_endpoint(self._url)
+        self._log.info('connect put to %s: %s', self._channel, self._addr)
+
+        self._ctx      = get_context()
         self._q        = self._ctx.socket(zmq.PUSH)
         self._q.linger = _LINGER_TIMEOUT
-        self._q.hwm    = _HIGH_WATER_MARK
-        self._q.connect(self._url)
+        self._q.hwm    = hwm
+        self._q.connect(self._addr)
 
 
     # --------------------------------------------------------------------------
@@ -291,26 +457,68 @@ class Putter(object):
 
     # --------------------------------------------------------------------------
     #
-    def put(self, msg):
+    def put(self, msg, timeout=None):  # timeout in ms
+        '''
+        Send a message (or a list of messages) to the bridge.  If the bridge
+        does not accept messages, block for up to `timeout` milliseconds
+        (forever if `timeout` is `None`), and raise `queue.Full` on timeout.
+        '''
 
-        log_bulk(self._log, msg, '-> %s' % self._channel)
+        self._trace('->', msg)
         data = msgpack.packb(msg)
 
         with self._lock:
-            no_intr(self._q.send, data)
+
+            if timeout is None:
+                no_intr(self._q.send, data)
+                return
+
+            try:
+                if no_intr(self._q.poll, flags=zmq.POLLOUT, timeout=timeout):
+                    no_intr(self._q.send, data, flags=zmq.NOBLOCK)
+                    return
+            except zmq.Again:
+                pass
+
+        raise queue.Full('%s: bridge does not accept messages' % self._uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+        '''
+        Close the connection to the bridge.  Messages which are not yet sent
+        are delivered within the socket's linger period.
+        '''
+
+        with self._lock:
+            self._q.close()
 
 
 # ------------------------------------------------------------------------------
 #
 class Getter(object):
+    '''
+    A Getter requests messages from a queue bridge.  By default, the getter
+    uses a REQ socket and sends one request per `get()` call, and the bridge
+    will respond with a bulk of at most `bulk_size` messages.
+
+    If `prefetch` is set to a positive number `n`, the getter will instead use
+    a DEALER socket and keep `n` requests outstanding with the bridge at any
+    point in time.  Delivered bulks are buffered locally and served from that
+    buffer, so that consumers do not need to wait for a full round trip on each
+    call.  Note that a prefetching getter will claim messages from the bridge
+    which are then not available to other getters anymore.
+    '''
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, channel, url,  log=None):
+    def __init__(self, channel, url,  log=None, prefetch=0):
 
         self._channel   = channel
         self._url       = url
         self._lock      = mt.Lock()
+        self._prefetch  = prefetch       # number of requests to keep in flight
 
         self._uid       = generate_id('%s.get.%s' % (self._channel,
                                                     '%(counter)04d'), ID_CUSTOM)
@@ -319,14 +527,23 @@ class Getter(object):
         if not self._log:
             self._log   = Logger(name=self._uid, ns='radical.utils')
 
-        self._log.info('connect get to %s: %s'  % (self._channel, self._url))
+        self._trace     = MsgTrace(self._log, self._channel)
+
+        # use the fastest transport available to reach the bridge
+        self._addr      = select_endpoint(self._url)
+        self._log.info('connect get to %s: %s', self._channel, self._addr)
+
+        if self._prefetch > 0: stype = zmq.DEALER
+        else                 : stype = zmq.REQ
 
         self._requested = False          # send/recv sync
-        self._ctx       = zmq.Context()  # rely on GC for destruction
-        self._q         = self._ctx.socket(zmq.REQ)
+        self._credits   = 0              # number of requests in flight
+        self._buf       = deque()        # prefetched messages
+        self._ctx       = get_context()
+        self._q         = self._ctx.socket(stype)
         self._q.linger  = _LINGER_TIMEOUT
         self._q.hwm     = _HIGH_WATER_MARK
-        self._q.connect(self._url)
+        self._q.connect(self._addr)
 
 
     # --------------------------------------------------------------------------
@@ -347,10 +564,91 @@ class Getter(object):
         return self._channel
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _request(self):
+
+        # top up the requests in flight (caller must hold the lock).  The empty
+        # delimiter frame lets the DEALER talk to the bridge's REP socket.
+        req = as_bytes('request %s' % os.getpid())
+        while self._credits < self._prefetch:
+            no_intr(self._q.send_multipart, [b'', req])
+            self._credits += 1
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _fetch(self, timeout):
+
+        # wait up to `timeout` ms for replies, and buffer all bulks which are
+        # available (caller must hold the lock).  Returns `True` if any reply
+        # was received.
+        self._request()
+
+        if not no_intr(self._q.poll, flags=zmq.POLLIN, timeout=timeout):
+            return False
+
+        while True:
+
+            try:
+                frames = no_intr(self._q.recv_multipart, flags=zmq.NOBLOCK)
+            except zmq.Again:
+                break
+
+            msgs = msgpack.unpackb(frames[-1])
+            self._credits -= 1
+            self._buf.extend(as_list(msgs))
+            self._trace('<-', msgs)
+
+        self._request()
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _drain(self, max_n=None):
+
+        # return up to `max_n` buffered messages (caller must hold the lock)
+        if max_n is None: n = len(self._buf)
+        else            : n = min(max_n, len(self._buf))
+
+        return [self._buf.popleft() for _ in range(n)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get_bulk(self, max_n=None, timeout=None):  # timeout in ms
+        '''
+        Return a list of up to `max_n` messages (all available messages if
+        `max_n` is `None`).  If no messages are available, wait up to `timeout`
+        milliseconds for messages to arrive (forever if `timeout` is `None`),
+        and return an empty list if none arrived in that time.
+        '''
+
+        if self._prefetch > 0:
+
+            with self._lock:
+                if not self._buf:
+                    self._fetch(timeout)
+                return self._drain(max_n)
+
+        if not self._buf:
+            if timeout is None: msgs = self.get()
+            else              : msgs = self.get_nowait(timeout)
+            with self._lock:
+                self._buf.extend(as_list(msgs))
+
+        with self._lock:
+            return self._drain(max_n)
+
+
     # --------------------------------------------------------------------------
     #
     def get(self):
 
+        if self._prefetch > 0 or self._buf:
+            return self.get_bulk()
+
         if not self._requested:
             req = 'Request %s' % os.getpid()
 
@@ -358,16 +656,14 @@ class Getter(object):
                 no_intr(self._q.send_string, req)
 
             self._requested = True
-            log_bulk(self._log, req, '>> %s [%-5s]'
-                                   % (self._channel, self._requested))
+            self._trace('>>', req)
 
         with self._lock:
             data = no_intr(self._q.recv)
 
         msg = msgpack.unpackb(data)
         self._requested = False
-        log_bulk(self._log, msg, '-- %s [%-5s]'
-                               % (self._channel, self._requested))
+        self._trace('<-', msg)
 
         return msg
 
@@ -376,6 +672,9 @@ class Getter(object):
     #
     def get_nowait(self, timeout=None):  # timeout in ms
 
+        if self._prefetch > 0 or self._buf:
+            return self.get_bulk(timeout=timeout) or None
+
         with self._lock:  # need to protect self._requested
 
             if not self._requested:
@@ -385,8 +684,7 @@ class Getter(object):
                 no_intr(self._q.send, as_bytes(req))
 
                 self._requested = True
-                log_bulk(self._log, req, '-> %s [%-5s]'
-                                         % (self._channel, self._requested))
+                self._trace('>>', req)
 
         if no_intr(self._q.poll, flags=zmq.POLLIN, timeout=timeout):
 
@@ -395,15 +693,26 @@ class Getter(object):
 
             msg = msgpack.unpackb(data)
             self._requested = False
-            log_bulk(self._log, msg, '<- %s [%-5s]'
-                                     % (self._channel, self._requested))
+            self._trace('<-', msg)
             return as_string(msg)
 
         else:
-            log_bulk(self._log, None, '-- %s [%-5s]'
-                                      % (self._channel, self._requested))
             return None
 
 
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+        '''
+        Close the connection to the bridge.  Messages which have been requested
+        or prefetched from the bridge but not yet been consumed are lost.
+        '''
+
+        with self._lock:
+            self._q.close()
+            self._buf.clear()
+            self._credits = 0
+
+
 # ------------------------------------------------------------------------------
 
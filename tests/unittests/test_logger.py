@@ -5,6 +5,14 @@ __copyright__ = "Copyright 2012-2013, The SAGA Project"
 __license__   = "MIT"
 
 
+import os
+import glob
+import gzip
+import time
+import shutil
+import logging
+import tempfile
+
 import radical.utils as ru
 
 
@@ -44,12 +52,317 @@ def test_env():
     tmp.fatal('fatal')
 
 
+# ------------------------------------------------------------------------------
+#
+def test_async():
+    '''
+    Log records are written by the writer thread, in order, and also by forked
+    child processes
+    '''
+
+    path = tempfile.mkdtemp()
+    os.environ['RADICAL_TEST_ASYNC_LOG_ASYNC'] = 'True'
+
+    try:
+        log = ru.Logger('test_async', ns='radical.test_async', path=path,
+                        targets='.', level='DEBUG')
+        fname = '%s/test_async.log' % path
+
+        assert(isinstance(log.handlers[0], ru.logger._AsyncHandler))
+
+        args = ['arg']
+        for i in range(100):
+            log.debug('msg %d %s', i, args)
+        args.append('changed')       # messages are rendered when logged
+
+        try:
+            raise ValueError('oops')
+        except ValueError:
+            log.exception('failed')
+
+        # records are written after a short while
+        for _ in range(50):
+            with open(fname) as fin:
+                lines = fin.readlines()
+            if len(lines) > 100:
+                break
+            time.sleep(0.1)
+
+        assert(lines[0].endswith(": msg 0 ['arg']\n"))
+        assert(lines[99].endswith(": msg 99 ['arg']\n"))
+        assert(lines[100].endswith(': failed\n'))
+        assert('ValueError: oops' in ''.join(lines[101:]))
+
+        # records of a forked child are written by the child
+        pid = os.fork()
+        if not pid:
+            log.info('child %d', os.getpid())
+            log.close()
+            os._exit(0)
+
+        os.waitpid(pid, 0)
+        log.info('parent')
+        log.close()
+
+        with open(fname) as fin:
+            lines = fin.readlines()
+
+        assert(lines[-2].endswith(': child %d\n' % pid))
+        assert(lines[-1].endswith(': parent\n'))
+
+    finally:
+        del os.environ['RADICAL_TEST_ASYNC_LOG_ASYNC']
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_levels():
+    '''
+    Log methods of disabled levels are no-ops, and are rebound on level changes
+    '''
+
+    class Arg(object):
+        count = 0
+        def __str__(self):
+            Arg.count += 1
+            return 'arg'
+
+    path = tempfile.mkdtemp()
+
+    try:
+        log_1 = ru.Logger('test_levels', path=path, targets='.', level='INFO')
+        log_2 = ru.Logger('test_levels')
+
+        for log in [log_1, log_2]:
+            assert(log.debug is ru.logger._log_noop)
+            assert(log.info  is not ru.logger._log_noop)
+            assert(not log.isEnabledFor(ru.DEBUG))
+            assert(log.isEnabledFor(ru.INFO))
+
+        log_1.debug('debug %s', Arg())
+        assert(Arg.count == 0)
+
+        log_2.setLevel('DEBUG')
+
+        for log in [log_1, log_2]:
+            assert(log.debug is not ru.logger._log_noop)
+            assert(log.isEnabledFor(ru.DEBUG))
+            assert(log.level == 'DEBUG')
+
+        log_1.debug('debug %s', Arg())
+        assert(Arg.count == 1)
+
+        # `warn` is an alias for `warning`
+        assert(log_2.warn == log_2.warning)
+
+        log_1.setLevel('ERROR')
+        assert(log_2.warn    is ru.logger._log_noop)
+        assert(log_2.warning is ru.logger._log_noop)
+        assert(log_2.error   is not ru.logger._log_noop)
+
+        log_1.close()
+
+        with open('%s/test_levels.log' % path) as fin:
+            lines = fin.readlines()
+
+        assert(len(lines) == 1)
+        assert(lines[0].endswith(': debug arg\n'))
+
+    finally:
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_struct():
+    '''
+    Structured logs render like text logs, and can be filtered
+    '''
+
+    path = tempfile.mkdtemp()
+
+    try:
+        log = ru.Logger('test_struct', path=path, level='DEBUG',
+                        targets=['.', 'bin:', 'jsonl:/%s/struct.jsonl' % path])
+
+        for i in range(3):
+            log.debug('debug %d: %s %5.2f %r', i, 'foo', i / 3, None)
+            log.info('info %s', [i, 'list'])
+        log.warning('no args %s')
+
+        try:
+            raise ValueError('oops')
+        except ValueError:
+            log.exception('failed %s', 'bar')
+
+        child = ru.Logger('test_struct.child', path=path, level='INFO',
+                          targets='bin:%s/test_struct.log.bin' % path)
+        child.info('child')
+
+        log.close()
+        child.close()
+
+        with open('%s/test_struct.log' % path) as fin:
+            text = fin.read()
+
+        fbin  = '%s/test_struct.log.bin' % path
+        fjson = '%s/struct.jsonl' % path
+
+        recs = list(ru.read_log(fbin))
+        assert(len(recs) == 9)
+        assert(recs[0]['msg']  == 'debug %d: %s %5.2f %r')
+        assert(recs[0]['args'] == [0, 'foo', 0.0, None])
+        assert(recs[1]['msg']  == "info [0, 'list']")
+        assert(recs[1]['args'] == [])
+        assert('ValueError: oops' in recs[7]['exc'])
+        assert(recs[8]['name'] == 'test_struct.child')
+
+        for fname in [fbin, fjson]:
+            rendered = ''.join([ru.render_log(rec) + '\n'
+                                for rec in ru.read_log(fname,
+                                                       name='test_struct')])
+            assert(rendered.startswith(text))
+
+        assert(len(list(ru.read_log(fjson))) == 8)
+        assert(len(list(ru.read_log(fbin, level='INFO'))) == 6)
+        assert(len(list(ru.read_log(fbin, level=ru.WARNING))) == 2)
+        assert(len(list(ru.read_log(fbin, name='test_struct.child'))) == 1)
+        assert(len(list(ru.read_log(fbin, name='test_struc'))) == 0)
+
+        t = recs[2]['time']
+        assert(all([rec['time'] >= t
+                    for rec in ru.read_log(fbin, t0=t)]))
+        assert(len(list(ru.read_log(fbin, t1=t))) >= 3)
+
+        # an incomplete last record is ignored
+        with open(fbin, 'ab') as fout:
+            fout.write(b'\x99\x01')
+        assert(len(list(ru.read_log(fbin))) == 9)
+
+    finally:
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_rotation():
+    '''
+    Log files are rotated by size and age, and compressed
+    '''
+
+    path = tempfile.mkdtemp()
+    env  = {'RADICAL_TEST_ROTATE_LOG_MAX_SIZE': '4k',
+            'RADICAL_TEST_ROTATE_LOG_COMPRESS': 'gzip',
+            'RADICAL_TEST_ROTATE_LOG_KEEP'    : '3'}
+
+    try:
+        os.environ.update(env)
+
+        log   = ru.Logger('test_rotate', ns='radical.test_rotate', path=path,
+                          targets='.', level='DEBUG')
+        fname = '%s/test_rotate.log' % path
+
+        for i in range(1000):
+            log.debug('message %04d', i)
+        log.close()
+
+        # the log file only holds the last messages, older segments are
+        # compressed, and only 3 of them are kept
+        segs = sorted(glob.glob('%s.*' % fname))
+        assert(len(segs) == 3)
+        assert(all([seg.endswith('.gz') for seg in segs]))
+
+        lines = list()
+        for seg in segs:
+            with gzip.open(seg, 'rt') as fin:
+                lines += fin.readlines()
+        with open(fname) as fin:
+            lines += fin.readlines()
+
+        assert(os.path.getsize(fname) < 4096 + 100)
+        assert(lines[-1].endswith(': message 0999\n'))
+        nums = [int(line.split()[-1]) for line in lines]
+        assert(nums == list(range(nums[0], 1000)))
+
+        # rotate by age, without compression
+        shutil.rmtree(path)
+        del os.environ['RADICAL_TEST_ROTATE_LOG_MAX_SIZE']
+        os.environ['RADICAL_TEST_ROTATE_LOG_MAX_AGE']  = '0.2'
+        os.environ['RADICAL_TEST_ROTATE_LOG_COMPRESS'] = 'none'
+
+        log = ru.Logger('test_rotate_age', ns='radical.test_rotate', path=path,
+                        targets='rotate.log', level='DEBUG')
+        log.debug('one')
+        time.sleep(0.3)
+        log.debug('two')
+        log.close()
+
+        segs = glob.glob('%s/rotate.log.*' % path)
+        assert(len(segs) == 1)
+        with open(segs[0]) as fin:
+            assert(fin.read().endswith(': one\n'))
+        with open('%s/rotate.log' % path) as fin:
+            assert(fin.read().endswith(': two\n'))
+
+    finally:
+        for key in list(env) + ['RADICAL_TEST_ROTATE_LOG_MAX_AGE']:
+            os.environ.pop(key, None)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_rotation_checks():
+    '''
+    The log file is not checked for every record, and compression does not
+    block the process exit
+    '''
+
+    path  = tempfile.mkdtemp()
+    fname = '%s/checks.log' % path
+    stats = list()
+    stat  = os.stat
+
+    def _stat(name, *args, **kwargs):
+        stats.append(name)
+        return stat(name, *args, **kwargs)
+
+    try:
+        handler = ru.logger.FSHandler(fname, max_size=4096, compress='gzip')
+        os.stat = _stat
+
+        for i in range(1000):
+            handler.emit(logging.LogRecord('test', logging.DEBUG, __file__, 0,
+                                           'message %04d', (i,), None))
+
+        os.stat = stat
+
+        # 3 rotations, with one check each
+        assert(len(stats) < 10)
+        assert(os.path.getsize(fname) < 4096 + 100)
+        assert(handler._threads)
+        assert(all([thread.daemon for thread in handler._threads]))
+
+        handler.close()
+        assert(len(glob.glob('%s.*.gz' % fname)) == 3)
+
+    finally:
+        os.stat = stat
+        shutil.rmtree(path, ignore_errors=True)
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
 
     test_logger()
     test_env()
+    test_async()
+    test_levels()
+    test_struct()
+    test_rotation()
+    test_rotation_checks()
 
 
 # ------------------------------------------------------------------------------
@@ -117,6 +117,42 @@ def test_get_env_ns():
         assert(ru.get_env_ns('LOG_TGT', ns) == '/dev/null')
         assert(ru.get_env_ns('TGT_LOG', ns) is None)
 
+    # lookups are cached, but env changes are observed
+    ns = 'radical.utils.test.uid_0001'
+    assert(ru.misc._env_ns_cache('log.lvl', ns) == (
+                                          'RADICAL_UTILS_TEST_UID_0001_LOG_LVL',
+                                          'RADICAL_UTILS_TEST_UID_LOG_LVL',
+                                          'RADICAL_UTILS_TEST_LOG_LVL',
+                                          'RADICAL_UTILS_LOG_LVL',
+                                          'RADICAL_LOG_LVL'))
+    assert(ru.get_env_ns('log_lvl', ns) == 'DEBUG')
+
+    os.environ['RADICAL_UTILS_TEST_LOG_LVL'] = 'INFO'
+    assert(ru.get_env_ns('log_lvl', ns) == 'INFO')
+
+    os.environ['RADICAL_UTILS_TEST_LOG_LVL'] = ''
+    assert(ru.get_env_ns('log_lvl', ns) == '')
+
+    del os.environ['RADICAL_UTILS_TEST_LOG_LVL']
+    assert(ru.get_env_ns('log_lvl', ns) == 'DEBUG')
+
+    del os.environ['RADICAL_UTILS_LOG_LVL']
+    assert(ru.get_env_ns('log_lvl', ns) is None)
+    assert(ru.get_env_ns('log_lvl', ns, default='ERROR') == 'ERROR')
+
+    # replacing one variable by another is observed
+    os.environ['RADICAL_UTILS_TEST_LOG_LVL'] = 'INFO'
+    assert(ru.get_env_ns('log_lvl', ns) == 'INFO')
+
+    del os.environ['RADICAL_UTILS_TEST_LOG_LVL']
+    os.environ['RADICAL_UTILS_LOG_LVL'] = 'WARNING'
+    assert(ru.get_env_ns('log_lvl', ns) == 'WARNING')
+
+    assert(ru.get_env_ns('log.tgt', ns) == '/dev/null')
+
+    del os.environ['RADICAL_UTILS_LOG_LVL']
+    del os.environ['RADICAL_LOG_TGT']
+
 
 # ------------------------------------------------------------------------------
 #
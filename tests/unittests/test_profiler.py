@@ -5,9 +5,15 @@ __copyright__ = "Copyright 2012-2013, The SAGA Project"
 __license__   = "MIT"
 
 
+import gc
 import os
+import re
 import copy
 import time
+import shutil
+import pytest
+
+import threading     as mt
 
 import radical.utils as ru
 
@@ -62,6 +68,692 @@ def test_profiler():
         except: pass
 
 
+# ------------------------------------------------------------------------------
+#
+def test_profiler_bin():
+    '''
+    write a binary profile and convert it to CSV
+    '''
+
+    pname = 'ru.bin.%d'     % os.getpid()
+    bname = '/tmp/%s.bprof' % pname
+    fname = '/tmp/%s.prof'  % pname
+    now   = time.time()
+
+    try:
+        os.environ['RADICAL_PROFILE']     = 'True'
+        os.environ['RADICAL_PROFILE_FMT'] = 'bin'
+        prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/')
+
+        prof.prof('foo')
+        prof.prof('bar', uid='baz')
+        prof.prof('buz', ts=now)
+
+        t = mt.Thread(target=prof.prof, args=['thr'], name='worker')
+        t.start()
+        t.join()
+
+        # events from forked processes are appended to the same file
+        pid = os.fork()
+        if not pid:
+            prof.prof('child', uid='baz')
+            prof.close()
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        prof.close()
+
+        assert(os.path.isfile(bname))
+        assert(not os.path.isfile(fname))
+
+        rows   = list(ru.read_bprof(bname))
+        events = [row[1] for row in rows]
+        assert(events.count('sync_abs') == 1)
+        assert(events.count('END')      == 2)
+        for e in ['foo', 'bar', 'buz', 'thr', 'child']:
+            assert(e in events), e
+        assert([now, 'buz', pname, 'MainThread', '', '', ''] in rows)
+        assert(rows[events.index('thr')][3] == 'worker')
+
+        profs = ru.read_profiles([bname], sid='sid')
+        assert(len(profs[bname]) == len(rows))
+
+        assert(ru.bprof_to_csv(bname) == fname)
+
+        # strings are shared between rows
+        profs = ru.read_profiles([fname], sid='sid')
+        comps = set([id(row[ru.COMP]) for row in profs[fname]])
+        assert(len(profs[fname]) == len(rows))
+        assert(len(comps) == 1)
+
+        # converting back yields the same events (with 7 digit time precision)
+        os.unlink(bname)
+        assert(ru.csv_to_bprof(fname) == bname)
+        assert([row[1:] for row in ru.read_bprof(bname)] ==
+               [row[1:] for row in rows])
+
+        def _grep(pat):
+            return _cmd('grep -e "%s" %s' % (pat, fname))
+
+        assert(_grep('^[0-9\\.]*,foo,%s,MainThread,,,$'    %       pname ))
+        assert(_grep('^[0-9\\.]*,bar,%s,MainThread,baz,,$' %       pname ))
+        assert(_grep('^%.7f,buz,%s,MainThread,,,$'         % (now, pname)))
+        assert(_grep('^[0-9\\.]*,thr,%s,worker,,,$'        %       pname ))
+
+    finally:
+        for key in ['RADICAL_PROFILE', 'RADICAL_PROFILE_FMT']:
+            try   : del(os.environ[key])
+            except: pass
+        for name in [bname, fname]:
+            try   : os.unlink(name)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profiler_fmt_invalid():
+    '''
+    an invalid profile format falls back to CSV, with a warning
+    '''
+
+    pname = 'ru.fmt.%d'    % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    try:
+        os.environ['RADICAL_PROFILE']     = 'True'
+        os.environ['RADICAL_PROFILE_FMT'] = 'xml'
+
+        with pytest.warns(RuntimeWarning):
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/')
+
+        prof.prof('foo')
+        prof.close()
+
+        assert(_cmd('grep -e "^[0-9\\.]*,foo,%s," %s' % (pname, fname)))
+
+    finally:
+        for key in ['RADICAL_PROFILE', 'RADICAL_PROFILE_FMT']:
+            try   : del(os.environ[key])
+            except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profiler_bin_threads():
+    '''
+    the event buffers of terminated threads are released on flush
+    '''
+
+    bname = '/tmp/ru.bin.threads.%d.bprof' % os.getpid()
+
+    try:
+        writer = ru.profile_bin.BinaryWriter(bname, flush_time=0)
+
+        for idx in range(10):
+            t = mt.Thread(target=writer.write,
+                          args=[idx, 'thr', 'comp', 'tid', '', '', ''])
+            t.start()
+            t.join()
+
+        writer.write(10, 'main', 'comp', 'tid', '', '', '')
+        assert(len(writer._bufs) == 11)
+
+        writer.flush()
+        assert(len(writer._bufs) == 1)
+
+        writer.close()
+
+        events = [row[1] for row in ru.read_bprof(bname)]
+        assert(events == ['thr'] * 10 + ['main'])
+
+    finally:
+        try   : os.unlink(bname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profiler_bin_unclosed():
+    '''
+    binary writers share one flusher thread, and writers which are not closed
+    are flushed and closed when collected
+    '''
+
+    bname = '/tmp/ru.bin.unclosed.%d.%%d.bprof' % os.getpid()
+
+    try:
+        ru.profile_bin.BinaryWriter(bname % 0).close()
+
+        n_fds     = len(os.listdir('/proc/self/fd'))
+        n_threads = mt.active_count()
+
+        for idx in range(100):
+            writer = ru.profile_bin.BinaryWriter(bname % idx)
+            writer.write(idx, 'evt', 'comp', 'tid', '', '', '')
+
+        del writer
+        gc.collect()
+
+        assert(mt.active_count() == n_threads)
+        assert(len(os.listdir('/proc/self/fd')) == n_fds)
+
+        for idx in range(100):
+            rows = list(ru.read_bprof(bname % idx))
+            assert(rows == [[idx, 'evt', 'comp', 'tid', '', '', '']])
+
+        # a closed writer is not flushed anymore
+        writer = ru.profile_bin.BinaryWriter(bname % 0)
+        writer.close()
+        writer.write(0, 'late', 'comp', 'tid', '', '', '')
+        writer.flush()
+
+    finally:
+        for idx in range(100):
+            try   : os.unlink(bname % idx)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def _write_profiles(n=100):
+    '''
+    write two CSV profiles of a fake session (one synced by `sync_abs`, one by
+    `sync_rel`), and return their file names
+    '''
+
+    base   = '/tmp/ru.combine.%d' % os.getpid()
+    fnames = ['%s.0.prof' % base, '%s.1.prof' % base]
+
+    with open(fnames[0], 'w') as fout:
+        fout.write('#time,event,comp,thread,uid,state,msg\n')
+        fout.write('100.0,sync_abs,c0,MainThread,,,host:1.2.3.4:100:105:ntp\n')
+        fout.write('100.5,sync_rel,c0,MainThread,,,pilot.0000\n')
+        for i in range(n):
+            fout.write('%.7f,advance,c0,T0,task.%04d,NEW,\n'
+                       % (101.0 + i * 0.01, i))
+        fout.write('110.0,END,c0,MainThread,,,\n')
+
+    with open(fnames[1], 'w') as fout:
+        fout.write('#time,event,comp,thread,uid,state,msg\n')
+        fout.write('200.5,sync_rel,c1,MainThread,,,pilot.0000\n')
+        for i in range(n):
+            fout.write('%.7f,exec_start,c1,T1,task.%04d,,\n'
+                       % (201.0 + i * 0.02, i))
+        fout.write('210.0,END,c1,MainThread,,,\n')
+
+    return fnames
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profile_columnar():
+    '''
+    combine profiles in row and columnar representation
+    '''
+
+    try:
+        import numpy as np
+    except ImportError:
+        return
+
+    fnames = _write_profiles()
+
+    try:
+        rows = ru.read_profiles(fnames, sid='sid')
+        cols = ru.read_profiles(fnames, sid='sid', columnar=True)
+
+        for fname in fnames:
+            assert(isinstance(cols[fname], ru.ProfileColumns))
+            assert(cols[fname].to_rows() == rows[fname])
+
+        p_rows, acc_rows = ru.combine_profiles(rows)
+        p_cols, acc_cols = ru.combine_profiles(cols)
+
+        assert(acc_rows == acc_cols)
+        assert(isinstance(p_cols, ru.ProfileColumns))
+        assert(len(p_cols) == len(p_rows))
+        assert(np.all(np.diff(p_cols.time) >= 0))
+
+        # the transplanted `sync_abs` event is shifted twice in the row based
+        # version, so we compare all other events
+        def _strip(prof):
+            return [row for row in prof if row[ru.EVENT] != 'sync_abs']
+
+        assert(_strip(p_cols) == _strip(p_rows))
+
+        starts = p_cols.time[p_cols.mask(ru.EVENT, 'exec_start')]
+        assert(len(starts) == 100)
+        assert(list(p_cols.column(ru.ENTITY)).count('task') == 200)
+        assert(p_cols.code('no_such_event') == -1)
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profile_workers():
+    '''
+    read profiles in parallel
+    '''
+
+    fnames = _write_profiles()
+
+    try:
+        serial   = ru.read_profiles(fnames, sid='sid')
+        parallel = ru.read_profiles(fnames, sid='sid', workers=2)
+
+        assert(list(parallel.keys()) == fnames)
+        for fname in fnames:
+            assert(parallel[fname] == serial[fname])
+
+        # sync events are collected by the workers
+        assert(len(parallel.syncs[fnames[0]]['abs']) == 1)
+        assert(len(parallel.syncs[fnames[1]]['rel']) == 1)
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            cols = ru.read_profiles(fnames, sid='sid', columnar=True,
+                                    workers=2)
+            assert(cols[fnames[0]].symbols is cols[fnames[1]].symbols)
+            for fname in fnames:
+                assert(isinstance(cols[fname].time, np.ndarray))
+                assert(cols[fname].to_rows() == serial[fname])
+
+        # ... and are dropped when a profile is replaced
+        parallel[fnames[0]] = list(parallel[fnames[0]])
+        assert(fnames[0] not in parallel.syncs)
+
+        assert(ru.combine_profiles(parallel) == ru.combine_profiles(serial))
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_merge_profiles():
+    '''
+    streaming merge of profiles
+    '''
+
+    fnames = _write_profiles()
+
+    try:
+        profs  = ru.read_profiles(fnames, sid='sid')
+        copies = {pname: [list(row) for row in prof]
+                                    for pname, prof in profs.items()}
+        merged = list(ru.merge_profiles(profs))
+
+        # the given profiles are not changed
+        assert(profs == copies)
+
+        # same result as `combine_profiles`, apart from the `sync_abs` events
+        # (see `test_profile_columnar`)
+        def _strip(prof):
+            return [row for row in prof if row[ru.EVENT] != 'sync_abs']
+
+        combined, _ = ru.combine_profiles(profs)
+        assert(len(merged) == len(combined))
+        assert(_strip(merged) == _strip(combined))
+
+        # slightly out of order events are sorted within the reorder window,
+        # and profiles can be given as iterators if sync events are given
+        rows  = copies[fnames[1]]
+        rows[10], rows[20] = rows[20], rows[10]
+        syncs = {fnames[0]: {'abs': [copies[fnames[0]][0]],
+                             'rel': [copies[fnames[0]][1]]},
+                 fnames[1]: {'abs': [],
+                             'rel': [rows[0]]}}
+        iters = {pname: iter(prof) for pname, prof in copies.items()}
+        times = [row[ru.TIME] for row in
+                 ru.merge_profiles(iters, syncs=syncs, window=0.5)]
+
+        assert(len(times) == len(merged))
+        assert(times == sorted(times))
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profile_filter():
+    '''
+    filter events while reading profiles
+    '''
+
+    row = [1.0, 'exec_start', 'c0', 'T0', 'task.0000', 'NEW', 'foo bar', 'task']
+
+    assert(ru.ProfileFilter()(row))
+    assert(ru.ProfileFilter(include={ru.EVENT: 'exec_start'})(row))
+    assert(ru.ProfileFilter(include={ru.EVENT: ['exec_*']})(row))
+    assert(ru.ProfileFilter(include={ru.MSG: re.compile('bar$')})(row))
+    assert(not ru.ProfileFilter(include={ru.EVENT: ['exec']})(row))
+    assert(not ru.ProfileFilter(include={ru.EVENT: ['exec_*'],
+                                         ru.UID  : ['pilot.*']})(row))
+    assert(not ru.ProfileFilter(exclude={ru.ENTITY: ['task']})(row))
+    assert(not ru.ProfileFilter(include={ru.EVENT : ['exec_*']},
+                                exclude={ru.STATE : ['NEW']})(row))
+    assert(not ru.ProfileFilter.from_dict({ru.EVENT: ['exec_start_0']})(row))
+    assert(ru.ProfileFilter.from_dict({ru.EVENT: ['exec']})(row))
+
+    fnames = _write_profiles()
+
+    # quoted fields are parsed as before
+    with open(fnames[1], 'a') as fout:
+        fout.write('211.0,quoted,c1,T1,task.0000,,"a,b"\n')
+
+    try:
+        # sync events are filtered out, but still used to combine profiles
+        pf    = ru.ProfileFilter(include={ru.EVENT : ['exec_start', 'quoted'],
+                                          ru.UID   : ['task.00*']})
+        profs = ru.read_profiles(fnames, sid='sid', efilter=pf)
+
+        assert(profs[fnames[0]] == [])
+        assert(len(profs[fnames[1]]) == 101)
+        assert(profs[fnames[1]][-1][ru.MSG] == 'a,b')
+        assert(len(profs.syncs[fnames[1]]['rel']) == 1)
+
+        combined, _ = ru.combine_profiles(profs)
+        full,     _ = ru.combine_profiles(ru.read_profiles(fnames, sid='sid'))
+
+        # the transplanted `sync_abs` event is added by `combine_profiles`
+        assert(combined[0][ru.EVENT] == 'sync_abs')
+        assert(combined[1:] == [row for row in full if pf(row)])
+
+        # legacy filters exclude events
+        profs = ru.read_profiles(fnames, sid='sid',
+                                 efilter={ru.EVENT: ['advance', 'exec_start']})
+        assert(len(profs[fnames[0]]) == 3)
+        assert(len(profs[fnames[1]]) == 3)
+
+        # ... if the field value is a substring of a pattern (this includes
+        # empty values)
+        profs = ru.read_profiles(fnames, sid='sid',
+                                 efilter={ru.EVENT: ['exec_start_x'],
+                                          ru.MSG  : ['xx']})
+        assert([row[ru.EVENT] for row in profs[fnames[0]]]
+               == ['sync_abs', 'sync_rel'])
+        assert([row[ru.EVENT] for row in profs[fnames[1]]]
+               == ['sync_rel', 'quoted'])
+
+        try:
+            import numpy as np
+        except ImportError:
+            return
+
+        cols = ru.read_profiles(fnames, sid='sid', columnar=True)
+        mask = pf.mask(cols[fnames[1]])
+        assert(isinstance(mask, np.ndarray))
+        assert(cols[fnames[1]].select(mask).to_rows()
+               == ru.read_profiles(fnames, sid='sid', efilter=pf)[fnames[1]])
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_read_session_profile():
+    '''
+    cache combined session profiles
+    '''
+
+    fnames = _write_profiles()
+    cache  = '/tmp/ru.cache.%d' % os.getpid()
+
+    try:
+        profs        = ru.read_profiles(fnames, sid='sid')
+        p_ref, a_ref = ru.combine_profiles(profs)
+        p_ref        = ru.clean_profile(p_ref, sid='sid')
+
+        p_1, a_1 = ru.read_session_profile(fnames, 'sid', cache=cache)
+        assert(len(os.listdir(cache)) == 1)
+
+        p_2, a_2 = ru.read_session_profile(fnames, 'sid', cache=cache)
+        assert(p_1 == p_2 == p_ref)
+        assert(a_1 == a_2 == a_ref)
+
+        # the cache is used: a broken cache entry is ignored and replaced
+        fcache = '%s/%s' % (cache, os.listdir(cache)[0])
+        with open(fcache, 'wb') as fout:
+            fout.write(b'invalid')
+        p_3, _ = ru.read_session_profile(fnames, 'sid', cache=cache)
+        assert(p_3 == p_ref)
+        assert(os.path.getsize(fcache) > 7)
+
+        # changed profiles invalidate the cache
+        with open(fnames[1], 'a') as fout:
+            fout.write('211.0,exec_stop,c1,T1,task.0000,,\n')
+
+        p_4, _ = ru.read_session_profile(fnames, 'sid', cache=cache)
+        assert(len(p_4) == len(p_ref) + 1)
+        assert(len(os.listdir(cache)) == 1)
+
+        # failing to write the cache is not an error
+        p_x, _ = ru.read_session_profile(fnames, 'sid', cache='/dev/null/x')
+        assert(p_x == p_4)
+
+        # the default cache location is next to the profiles
+        local = '%s/.profile_cache' % os.path.dirname(fnames[0])
+        p_x, _ = ru.read_session_profile(fnames, 'sid', cache=True)
+        assert(p_x == p_4)
+        assert(len(os.listdir(local)) == 1)
+        shutil.rmtree(local)
+
+        try:
+            import numpy as np
+        except ImportError:
+            return
+
+        # columnar profiles are read, combined and cleaned in columnar form,
+        # and are cached separately
+        profs        = ru.read_profiles(fnames, sid='sid', columnar=True)
+        c_ref, _     = ru.combine_profiles(profs)
+        c_ref        = ru.clean_profile(c_ref, sid='sid').to_rows()
+
+        p_5, a_5 = ru.read_session_profile(fnames, 'sid', cache=cache,
+                                           columnar=True)
+        assert(isinstance(p_5, ru.ProfileColumns))
+        assert(isinstance(p_5.time, np.ndarray))
+        assert(p_5.to_rows() == c_ref)
+        assert(len(os.listdir(cache)) == 2)
+
+        p_6, a_6 = ru.read_session_profile(fnames, 'sid', cache=cache,
+                                           columnar=True)
+        assert(isinstance(p_6, ru.ProfileColumns))
+        assert(p_6.to_rows() == c_ref)
+        assert(a_5 == a_6)
+        assert(sorted(p_6.to_rows()) == sorted(p_4))
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profile_index():
+    '''
+    query a profile by uid, event and time window
+    '''
+
+    prof = [[3.0, 'exec_stop' , 'c', 't', 'task.0', '',      '', 'task'],
+            [1.0, 'exec_start', 'c', 't', 'task.0', '',      '', 'task'],
+            [2.0, 'state'     , 'c', 't', 'task.1', 'NEW',   '', 'task'],
+            [4.0, 'exec_start', 'c', 't', 'task.0', '',      '', 'task'],
+            [4.5, 'state'     , 'c', 't', 'task.0', 'DONE',  '', 'task'],
+            [6.0, 'exec_stop' , 'c', 't', 'task.0', '',      '', 'task'],
+            [5.0, 'state'     , 'c', 't', 'pilot.0', 'NEW',  '', 'pilot']]
+
+    index = ru.ProfileIndex(prof)
+
+    assert(len(index) == len(prof))
+    assert(index.events(uid='task.0') ==
+           sorted([row for row in prof if row[ru.UID] == 'task.0']))
+    assert(index.events(uid='task.0', event='state') == [prof[4]])
+    assert(index.events(entity='pilot') == [prof[6]])
+    assert(index.events(state='NEW') == [prof[2], prof[6]])
+    assert(index.events(uid='task.9') == [])
+    assert(len(index.events()) == len(prof))
+
+    assert(index.window(2.0, 4.5) == [prof[2], prof[0], prof[3], prof[4]])
+    assert(index.window(2.0, 4.5, event='state') == [prof[2], prof[4]])
+    assert(index.window(t0=5.0) == [prof[6], prof[5]])
+    assert(index.window(t1=1.5) == [prof[1]])
+
+    assert(index.durations('task.0', 'exec_start', 'exec_stop') == [2.0, 2.0])
+    assert(index.durations('task.0', 'exec_start',
+                           {ru.STATE: 'DONE'}) == [3.5])
+    assert(index.durations('task.1', 'exec_start', 'exec_stop') == [])
+
+    try:
+        index.events(foo='bar')
+        assert(False), 'expected TypeError'
+    except TypeError:
+        pass
+
+    try:
+        index.window(foo='bar')
+        assert(False), 'expected TypeError'
+    except TypeError:
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_profile_tail():
+    '''
+    follow growing profiles
+    '''
+
+    fnames = _write_profiles()
+
+    try:
+        with open(fnames[0]) as fin: lines_0 = fin.readlines()
+        with open(fnames[1]) as fin: lines_1 = fin.readlines()
+
+        full = dict()
+        for row in ru.combine_profiles(ru.read_profiles(fnames, sid='sid'))[0]:
+            full[(row[ru.EVENT], row[ru.UID])] = row[ru.TIME]
+
+        # (the `sync_abs` event is shifted twice by `combine_profiles`, see
+        # `test_profile_columnar`)
+        def _check(rows):
+            for row in rows:
+                if row[ru.EVENT] == 'sync_abs':
+                    continue
+                key = (row[ru.EVENT], row[ru.UID])
+                assert(abs(row[ru.TIME] - tail.t_min - full[key]) < 1e-6)
+
+        # start with the header and sync events of the first profile, and the
+        # events of the second profile without its `sync_rel` event
+        with open(fnames[0], 'w') as fout:
+            fout.writelines(lines_0[:3])
+            fout.write(lines_0[3][:10])        # partial line
+
+        with open(fnames[1], 'w') as fout:
+            fout.writelines(lines_1[:1] + lines_1[2:52])
+
+        tail = ru.ProfileTail(fnames, sid='sid')
+        rows = tail.poll()
+        assert([row[ru.EVENT] for row in rows] == ['sync_abs', 'sync_rel'])
+        _check(rows)
+
+        assert(tail.poll() == [])
+
+        # complete the partial line
+        with open(fnames[0], 'a') as fout:
+            fout.write(lines_0[3][10:])
+        rows = tail.poll()
+        assert(len(rows) == 1)
+        assert(rows[0][ru.UID] == 'task.0000')
+        _check(rows)
+
+        # the second profile can be synced once its `sync_rel` appears
+        with open(fnames[1], 'a') as fout:
+            fout.writelines(lines_1[1:2] + lines_1[52:])
+        with open(fnames[0], 'a') as fout:
+            fout.writelines(lines_0[4:])
+
+        rows = tail.poll()
+        assert(len(rows) == len(lines_1) - 1 + len(lines_0) - 4)
+        assert([row[ru.TIME] for row in rows] ==
+               sorted([row[ru.TIME] for row in rows]))
+        _check(rows)
+
+    finally:
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_clean_profile_columnar():
+    '''
+    clean columnar profiles like row based profiles
+    '''
+
+    try:
+        import numpy as np
+    except ImportError:
+        return
+
+    events = [('advance', 'task.0', 'NEW'),
+              ('advance', 'task.0', 'NEW'),         # duplicate
+              ('exec',    'task.0', ''),
+              ('advance', 'task.1', 'CANCELED'),
+              ('advance', 'task.1', 'CANCELED'),    # duplicate
+              ('advance', 'task.1', 'DONE'),        # final: allows CANCELED
+              ('advance', 'task.1', 'CANCELED'),
+              ('advance', 'task.1', 'CANCELED'),    # duplicate
+              ('advance', 'task.1', 'DONE'),        # duplicate, but final
+              ('advance', 'task.1', 'CANCELED'),
+              ('advance', 'task.2', 'CANCELED'),
+              ('sync',    '',       ''),            # session event
+              ('advance', 'task.2', 'FAILED')]
+
+    def _rows():
+        return [[float(i), e, 'comp', 'tid', u, s, '', 'x']
+                for i, (e, u, s) in enumerate(events)]
+
+    kwargs = {'sid'           : 'rp.session.0',
+              'state_final'   : ['DONE', 'FAILED', 'CANCELED'],
+              'state_canceled': 'CANCELED'}
+
+    rows = ru.clean_profile(_rows(), **kwargs)
+    cols = ru.clean_profile(ru.ProfileColumns.from_rows(_rows()), **kwargs)
+
+    assert(isinstance(cols, ru.ProfileColumns))
+    assert(isinstance(cols.time, np.ndarray))
+    assert(cols.to_rows() == rows)
+    assert(len(rows) == 9)
+
+    # without CANCELED reconciliation, only duplicates are removed
+    rows = ru.clean_profile(_rows(), sid='sid')
+    cols = ru.clean_profile(ru.ProfileColumns.from_rows(_rows()), sid='sid')
+    assert(cols.to_rows() == rows)
+    assert(len(rows) == 7)
+
+
 # ------------------------------------------------------------------------------
 #
 def test_env():
@@ -130,6 +822,18 @@ def test_env():
 if __name__ == '__main__':
 
     test_profiler()
+    test_profiler_bin()
+    test_profiler_fmt_invalid()
+    test_profiler_bin_threads()
+    test_profiler_bin_unclosed()
+    test_profile_columnar()
+    test_profile_workers()
+    test_merge_profiles()
+    test_profile_filter()
+    test_read_session_profile()
+    test_profile_index()
+    test_profile_tail()
+    test_clean_profile_columnar()
     test_env()
 
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2020, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+import time
+import asyncio
+
+import radical.utils as ru
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_aio_queue():
+    '''
+    exchange messages between async and threaded queue endpoints
+    '''
+
+    cfg = ru.Config(cfg={'uid'       : 'test_aio_queue',
+                         'channel'   : 'test',
+                         'kind'      : 'queue',
+                         'log_level' : 'error',
+                         'path'      : '/tmp/',
+                         'sid'       : 'test_sid',
+                         'bulk_size' : 10})
+    b = ru.zmq.Queue(cfg)
+    b.start()
+
+    n = 100
+
+    async def main():
+
+        P = ru.zmq.AsyncPutter(channel=cfg['channel'], url=str(b.addr_put))
+        G = ru.zmq.AsyncGetter(channel=cfg['channel'], url=str(b.addr_get),
+                               prefetch=2)
+
+        assert(await G.get_bulk(timeout=10) == [])
+
+        for i in range(n):
+            await P.put({'idx': i})
+
+        res = list()
+        while len(res) < n:
+            res += await G.get_bulk(timeout=1000)
+
+        assert([msg['idx'] for msg in res] == list(range(n)))
+
+        # threaded putter, async getter
+        T = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+        T.put({'idx': n})
+        assert(await G.get_bulk(max_n=1) == [{'idx': n}])
+
+        T.close()
+        P.close()
+        G.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_aio_pubsub():
+    '''
+    receive messages from a threaded (and batching) publisher via `async for`
+    '''
+
+    cfg = ru.Config(cfg={'uid'       : 'test_aio_pubsub',
+                         'channel'   : 'test',
+                         'kind'      : 'pubsub',
+                         'log_level' : 'error',
+                         'path'      : '/tmp/',
+                         'sid'       : 'test_sid'})
+    b = ru.zmq.PubSub(cfg)
+    b.start()
+
+    n = 10
+
+    async def main():
+
+        S = ru.zmq.AsyncSubscriber(channel=cfg['channel'],
+                                   url=str(b.addr_sub), topic='foo')
+        P = ru.zmq.Publisher(channel=cfg['channel'], url=str(b.addr_pub),
+                             batch_size=4)
+        time.sleep(0.1)
+
+        assert(await S.get(timeout=10) == [None, None])
+
+        for i in range(n):
+            P.put('bar', {'idx': -1})
+            P.put('foo', {'idx':  i})
+        P.flush()
+
+        res = list()
+        async for topic, msg in S:
+            assert(topic == 'foo')
+            res.append(msg['idx'])
+            if len(res) == n:
+                break
+
+        assert(res == list(range(n)))
+
+        P.close()
+        S.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    b.stop()
+
+
+# ------------------------------------------------------------------------------
+# run tests if called directly
+if __name__ == '__main__':
+
+    test_zmq_aio_queue()
+    test_zmq_aio_pubsub()
+
+
+# ------------------------------------------------------------------------------
+
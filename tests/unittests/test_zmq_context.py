@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2020, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+import os
+import zmq
+import time
+
+import radical.utils as ru
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_context():
+    '''
+    all zmq endpoints of a process share one context, forked children use their
+    own, and endpoints can be closed explicitly
+    '''
+
+    ctx = ru.zmq.get_context()
+    assert(ctx is ru.zmq.get_context())
+
+    # a forked child must not reuse the parent's context
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        try:
+            child = ru.zmq.get_context()
+            ret   = b'1' if (child is not ctx and child is
+                             ru.zmq.get_context()) else b'0'
+            os.write(wfd, ret)
+        finally:
+            os._exit(0)
+
+    os.waitpid(pid, 0)
+    assert(os.read(rfd, 1) == b'1')
+    os.close(rfd)
+    os.close(wfd)
+
+    cfg = ru.Config(cfg={'uid'       : 'test_context',
+                         'channel'   : 'test',
+                         'kind'      : 'queue',
+                         'log_level' : 'error',
+                         'path'      : '/tmp/',
+                         'sid'       : 'test_sid'})
+    b = ru.zmq.Queue(cfg)
+    b.start()
+
+    P = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+    G = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get))
+
+    P.put({'foo': 'bar'})
+    assert(G.get() == [{'foo': 'bar'}])
+
+    P.close()
+    G.close()
+    assert(b.stop(timeout=5))
+
+    # closing the context will create a new one on next use
+    ru.zmq.close_context()
+    assert(ru.zmq.get_context() is not ctx)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_subscriber_close():
+    '''
+    subscribers on the same bridge share a socket, which is closed when the
+    last subscriber is closed
+    '''
+
+    cfg = ru.Config(cfg={'uid'       : 'test_sub_close',
+                         'channel'   : 'test',
+                         'kind'      : 'pubsub',
+                         'log_level' : 'error',
+                         'path'      : '/tmp/',
+                         'sid'       : 'test_sid'})
+    b = ru.zmq.PubSub(cfg)
+    b.start()
+
+    url = str(b.addr_sub)
+    res = list()
+
+    def cb(topic, msg):
+        res.append(msg)
+
+    S1 = ru.zmq.Subscriber(channel=cfg['channel'], url=url, topic='t', cb=cb)
+    S2 = ru.zmq.Subscriber(channel=cfg['channel'], url=url)
+    P  = ru.zmq.Publisher(channel=cfg['channel'], url=str(b.addr_pub))
+
+    time.sleep(0.1)
+    P.put('t', {'idx': 0})
+    time.sleep(0.1)
+    assert(res == [{'idx': 0}])
+
+    S1.close()
+    assert(url in ru.zmq.Subscriber._callbacks)
+
+    P.put('t', {'idx': 1})
+    time.sleep(0.1)
+    assert(res == [{'idx': 0}])
+
+    S2.close()
+    assert(url not in ru.zmq.Subscriber._callbacks)
+
+    P.close()
+    assert(b.stop(timeout=5))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_context_inproc():
+    '''
+    inproc endpoints of a closed context are not selected anymore, and peers
+    connect again after the context is re-created
+    '''
+
+    ctx  = ru.zmq.get_context()
+    sock = ctx.socket(zmq.PULL)
+    addr = ru.zmq.bridge.bind_endpoint(sock, ['tcp', 'inproc'])
+
+    assert(ru.zmq.bridge.select_endpoint(addr).startswith('inproc://'))
+
+    ru.zmq.close_context()
+
+    assert(ru.zmq.bridge.select_endpoint(addr).startswith('tcp://'))
+
+    cfg = ru.Config(cfg={'uid'       : 'test_context_inproc',
+                         'channel'   : 'test',
+                         'kind'      : 'queue',
+                         'log_level' : 'error',
+                         'path'      : '/tmp/',
+                         'sid'       : 'test_sid'})
+    b = ru.zmq.Queue(cfg)
+    b.start()
+
+    assert(ru.zmq.bridge.select_endpoint(b.addr_put).startswith('inproc://'))
+
+    P = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+    G = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get))
+
+    P.put({'foo': 'bar'})
+    assert(G.get() == [{'foo': 'bar'}])
+
+    P.close()
+    G.close()
+    assert(b.stop(timeout=5))
+
+
+# ------------------------------------------------------------------------------
+# run tests if called directly
+if __name__ == '__main__':
+
+    test_zmq_context()
+    test_zmq_context_inproc()
+    test_zmq_subscriber_close()
+
+
+# ------------------------------------------------------------------------------
+
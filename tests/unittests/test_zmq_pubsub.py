@@ -104,11 +104,109 @@ def test_zmq_pubsub():
            data['D']['A'] + data['D']['B'] == 2 * (c_a + c_b))
 
 
+# ------------------------------------------------------------------------------
+#
+def test_zmq_pubsub_topics():
+    '''
+    Ensure that callbacks only see messages for the topics they subscribed
+    for, even if they share the same endpoint.
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_pubsub_topics',
+                         'channel'  : 'test_topics',
+                         'kind'     : 'pubsub',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'sid'      : 'test_sid',
+                        })
+
+    b = ru.zmq.PubSub(cfg)
+    b.start()
+
+    data = {'foo': list(),
+            'bar': list()}
+
+    def cb(topic, msg):
+        data[msg['cb']].append(topic)
+
+    ru.zmq.Subscriber(channel=cfg['channel'], url=str(b.addr_sub),
+                      topic='foo', cb=lambda t, m: cb(t, dict(m, cb='foo')))
+    ru.zmq.Subscriber(channel=cfg['channel'], url=str(b.addr_sub),
+                      topic='bar', cb=lambda t, m: cb(t, dict(m, cb='bar')))
+    time.sleep(0.1)
+
+    pub = ru.zmq.Publisher(channel=cfg['channel'], url=str(b.addr_pub))
+    time.sleep(0.1)
+
+    for _ in range(10):
+        pub.put('foo', {'idx': 1})
+        pub.put('bar', {'idx': 2})
+
+    time.sleep(0.5)
+    b.stop()
+
+    assert(data['foo'] == ['foo'] * 10)
+    assert(data['bar'] == ['bar'] * 10)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_pubsub_batch():
+    '''
+    Ensure that batched messages are all delivered, in order (also across
+    topics), both on batch size and on batch timeout, and that the bridge
+    counts the batched messages.
+    '''
+
+    n   = 250
+    cfg = ru.Config(cfg={'uid'      : 'test_pubsub_batch',
+                         'channel'  : 'test_batch',
+                         'kind'     : 'pubsub',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'sid'      : 'test_sid',
+                        })
+
+    b = ru.zmq.PubSub(cfg)
+    b.start()
+
+    data = list()
+
+    def cb(topic, msg):
+        data.append([topic, msg['idx']])
+
+    ru.zmq.Subscriber(channel=cfg['channel'], url=str(b.addr_sub),
+                      topic='batch', cb=cb)
+    ru.zmq.Subscriber(channel=cfg['channel'], url=str(b.addr_sub),
+                      topic='other', cb=cb)
+    time.sleep(0.1)
+
+    pub = ru.zmq.Publisher(channel=cfg['channel'], url=str(b.addr_pub),
+                           batch_size=100, batch_time=0.01)
+    time.sleep(0.1)
+
+    # topics alternate in runs of 20 messages
+    sent = [['batch' if (idx // 20) % 2 else 'other', idx]
+            for idx in range(n)]
+    for topic, idx in sent:
+        pub.put(topic, {'idx': idx})
+
+    # the first two batches are sent on size, the remainder on timeout
+    time.sleep(0.5)
+    b.stop()
+
+    assert(data == sent)
+    assert(b.stats()['msgs_in']  == n)
+    assert(b.stats()['msgs_out'] == n)
+
+
 # ------------------------------------------------------------------------------
 # run tests if called directly
 if __name__ == '__main__':
 
     test_zmq_pubsub()
+    test_zmq_pubsub_topics()
+    test_zmq_pubsub_batch()
 
 
 # ------------------------------------------------------------------------------
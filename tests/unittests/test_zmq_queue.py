@@ -5,7 +5,9 @@ __copyright__ = 'Copyright 2019, RADICAL@Rutgers'
 __license__   = 'MIT'
 
 
+import os
 import time
+import queue
 import threading     as mt
 
 import radical.utils as ru
@@ -125,11 +127,239 @@ def test_zmq_queue():
     assert(avg - 5 < data['D'].count('A') + data['D'].count('B') < avg + 5)
 
 
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_prefetch():
+    '''
+    create a bridge, one producer and one prefetching consumer.  Ensure that
+      - all messages are received exactly once and in order
+      - `get_bulk()` respects `max_n`
+      - `get_bulk()` returns an empty list on timeout
+    '''
+
+    n   = 1000
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_prefetch',
+                         'channel'  : 'test_prefetch',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'sid'      : 'test_sid',
+                         'bulk_size': 10,
+                         'stall_hwm': 1,
+                        })
+
+    b = ru.zmq.Queue(cfg)
+    b.start()
+
+    put = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+    get = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get),
+                        prefetch=4)
+
+    assert(get.get_bulk(timeout=100) == [])
+
+    for idx in range(n):
+        put.put({'idx': idx})
+
+    msgs = list()
+    while len(msgs) < n:
+        bulk = get.get_bulk(max_n=7, timeout=1000)
+        assert(bulk)
+        assert(len(bulk) <= 7)
+        msgs += bulk
+
+    assert([msg['idx'] for msg in msgs] == list(range(n)))
+    assert(get.get_bulk(timeout=100) == [])
+
+    stats = b.stats()
+    assert(stats['msgs_in']  == n)
+    assert(stats['msgs_out'] == n)
+    assert(stats['buf_size'] == 0)
+    assert(stats['buf_hwm']  >= 1)
+    assert(sum([cnt for _, cnt in stats['delay_hist']]) == n)
+
+    b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_transports():
+    '''
+    peers in the same process should pick the inproc endpoint of a bridge, and
+    fall back to TCP if the bridge does not offer faster transports
+    '''
+
+    for transports, schema in [[None,    'inproc'],
+                               [['tcp'], 'tcp'   ]]:
+
+        cfg = ru.Config(cfg={'uid'       : 'test_queue_transports',
+                             'channel'   : 'test',
+                             'kind'      : 'queue',
+                             'log_level' : 'error',
+                             'path'      : '/tmp/',
+                             'sid'       : 'test_sid',
+                             'transports': transports,
+                            })
+
+        b = ru.zmq.Queue(cfg)
+        b.start()
+
+        assert(str(b.addr_put).startswith('tcp://'))
+        assert(str(b.addr_get).startswith('tcp://'))
+
+        addr = ru.zmq.bridge.select_endpoint(b.addr_put)
+        assert(addr.startswith(schema + '://')), addr
+
+        P = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+        G = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get))
+
+        for i in range(10):
+            P.put({'idx': i})
+
+        res = list()
+        while len(res) < 10:
+            res += G.get()
+
+        assert([msg['idx'] for msg in res] == list(range(10)))
+
+        b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_backpressure():
+    '''
+    a full bridge blocks putters, or spills messages to disk
+    '''
+
+    for spill in [None, '/tmp/test_queue_spill.%d' % os.getpid()]:
+
+        cfg = ru.Config(cfg={'uid'        : 'test_queue_hwm',
+                             'channel'    : 'test',
+                             'kind'       : 'queue',
+                             'log_level'  : 'error',
+                             'path'       : '/tmp/',
+                             'sid'        : 'test_sid',
+                             'bulk_size'  : 2,
+                             'stall_hwm'  : 1,
+                             'stall_spill': spill,
+                            })
+
+        b = ru.zmq.Queue(cfg)
+        b.start()
+
+        P = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put), hwm=2)
+
+        n    = 0
+        full = False
+        while n < 200:
+            try:
+                P.put({'idx': n}, timeout=100)
+                n += 1
+            except queue.Full:
+                full = True
+                break
+
+        stats = b.stats()
+        if spill:
+            assert(not full)
+            assert(n == 200)
+            assert(stats['spilled'] > 0)
+            assert(os.path.isfile(spill))
+        else:
+            assert(full)
+            assert(n < 200)
+            assert(stats['stalls'] > 0)
+            assert(stats['buf_hwm'] <= 2)
+
+        G   = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get))
+        res = list()
+        while len(res) < n:
+            res += G.get()
+
+        assert([msg['idx'] for msg in res] == list(range(n)))
+        assert(G.get_nowait(timeout=100) is None)
+
+        P.close()
+        G.close()
+        assert(b.stop(timeout=5))
+
+        if spill:
+            assert(b.stats()['spill_size'] == 0)
+            assert(not os.path.exists(spill))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_unbounded():
+    '''
+    without `stall_hwm`, the bridge buffer and putters are not bounded
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_unbounded',
+                         'channel'  : 'test',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'sid'      : 'test_sid',
+                         'bulk_size': 2,
+                        })
+
+    b = ru.zmq.Queue(cfg)
+    b.start()
+
+    P = ru.zmq.Putter(channel=cfg['channel'], url=str(b.addr_put))
+
+    for n in range(200):
+        P.put({'idx': n}, timeout=100)
+
+    G   = ru.zmq.Getter(channel=cfg['channel'], url=str(b.addr_get))
+    res = list()
+    while len(res) < 200:
+        res += G.get()
+
+    assert([msg['idx'] for msg in res] == list(range(200)))
+    assert(b.stats()['stalls'] == 0)
+
+    P.close()
+    G.close()
+    assert(b.stop(timeout=5))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_stop_unstarted():
+    '''
+    a bridge which was never started can be stopped
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_unstarted',
+                         'channel'  : 'test',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'sid'      : 'test_sid',
+                        })
+
+    b = ru.zmq.Queue(cfg)
+    assert(not b.alive)
+    assert(b.stop(timeout=1))
+
+    # the addresses of a bridge which failed to initialize are not set
+    del b._addr_put
+    del b._addr_get
+    assert(b.stop(timeout=1))
+
+
 # ------------------------------------------------------------------------------
 # run tests if called directly
 if __name__ == '__main__':
 
     test_zmq_queue()
+    test_zmq_queue_prefetch()
+    test_zmq_queue_transports()
+    test_zmq_queue_backpressure()
+    test_zmq_queue_unbounded()
+    test_zmq_queue_stop_unstarted()
 
 
 # ------------------------------------------------------------------------------